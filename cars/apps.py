@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
 
 
 class CarsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cars'
+
+    def ready(self):
+        from .catalog import invalidate_vehicle_catalog
+        from .models import Vehicle
+
+        # Keep the in-process vehicle catalog in step with the table
+        post_save.connect(invalidate_vehicle_catalog, sender=Vehicle, dispatch_uid='vehicle_catalog_save')
+        post_delete.connect(invalidate_vehicle_catalog, sender=Vehicle, dispatch_uid='vehicle_catalog_delete')
@@ -0,0 +1,168 @@
+# cars/catalog.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from services.vehicle_matcher import VehicleNameIndex
+from .models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+# Fields kept for each vehicle in the catalog snapshot
+CATALOG_FIELDS = ['id', 'name', 'drivetrain', 'car_type', 'lever_ratio_front', 'lever_ratio_rear']
+
+# Defaults, overridden with the VEHICLE_CATALOG_* settings
+DEFAULT_CATALOG_TTL = 300
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+
+class VehicleCatalog:
+    """In-process snapshot of the vehicle table, ordered by name
+
+    The snapshot is loaded with one query on first use and reused until a
+    Vehicle is saved or deleted in this process (see the signal handlers
+    connected in CarsConfig.ready) or it is older than
+    VEHICLE_CATALOG_TTL seconds, which bounds how stale other processes
+    can be. QuerySet.update() and bulk_create() send no signals; call
+    invalidate() after using them.
+
+    Entries are plain dicts shared between requests and must not be modified.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CATALOG_TTL):
+        """Initialize an empty catalog
+
+        Args:
+            ttl: Seconds before a snapshot is reloaded even without a signal
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    @property
+    def vehicles(self) -> List[Dict[str, Any]]:
+        """Every vehicle, ordered by name"""
+        return self._get_snapshot()['vehicles']
+
+    @property
+    def etag(self) -> str:
+        """Hash of the snapshot's contents, identical in every process that loaded the same rows"""
+        return self._get_snapshot()['etag']
+
+    @property
+    def name_index(self) -> VehicleNameIndex:
+        """Trigram index of vehicle names keyed by vehicle id, for fuzzy matching OCR text"""
+        return self._get_snapshot()['name_index']
+
+    def get(self, vehicle_id: Any) -> Optional[Dict[str, Any]]:
+        """Look up a vehicle by id"""
+        try:
+            return self._get_snapshot()['by_id'].get(int(vehicle_id))
+        except (TypeError, ValueError):
+            return None
+
+    def choices(self) -> List[tuple]:
+        """(id, name) pairs for a vehicle select"""
+        return self._get_snapshot()['choices']
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """Find vehicles for a typeahead
+
+        Names starting with the query come first, then names with a word
+        starting with it, then names containing it anywhere; each group
+        keeps the catalog's name order. Matching ignores case and extra
+        whitespace.
+
+        Args:
+            query: Text typed so far
+            limit: Most vehicles to return
+
+        Returns:
+            Matching catalog entries
+        """
+        query = ' '.join(query.lower().split())
+        snapshot = self._get_snapshot()
+        if not query:
+            return snapshot['vehicles'][:limit]
+
+        prefix_matches = []
+        word_matches = []
+        substring_matches = []
+        word_query = ' ' + query
+        for vehicle, search_name in zip(snapshot['vehicles'], snapshot['search_names']):
+            if search_name.startswith(word_query):
+                prefix_matches.append(vehicle)
+                if len(prefix_matches) >= limit:
+                    break
+            elif word_query in search_name:
+                word_matches.append(vehicle)
+            elif query in search_name:
+                substring_matches.append(vehicle)
+
+        return (prefix_matches + word_matches + substring_matches)[:limit]
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next read reloads it"""
+        with self._lock:
+            self._snapshot = None
+        logger.debug("Vehicle catalog invalidated")
+
+    def _get_snapshot(self) -> Dict[str, Any]:
+        """Return the current snapshot, loading it if missing or expired"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot['loaded_at'] < self.ttl:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot['loaded_at'] >= self.ttl:
+                snapshot = self._load()
+                self._snapshot = snapshot
+        return snapshot
+
+    def _load(self) -> Dict[str, Any]:
+        """Load every vehicle in one query and build the lookup structures"""
+        vehicles = list(Vehicle.objects.order_by('name', 'id').values(*CATALOG_FIELDS))
+        digest = hashlib.sha1(json.dumps(vehicles, sort_keys=True).encode()).hexdigest()
+
+        logger.debug(f"Loaded vehicle catalog with {len(vehicles)} vehicles")
+        return {
+            'vehicles': vehicles,
+            'by_id': {vehicle['id']: vehicle for vehicle in vehicles},
+            'choices': [(vehicle['id'], vehicle['name']) for vehicle in vehicles],
+            # Leading space so ' ' + query finds word starts anywhere in the name
+            'search_names': [' ' + ' '.join(vehicle['name'].lower().split()) for vehicle in vehicles],
+            'name_index': VehicleNameIndex((vehicle['id'], vehicle['name']) for vehicle in vehicles),
+            'etag': digest[:20],
+            'loaded_at': time.monotonic(),
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_vehicle_catalog() -> VehicleCatalog:
+    """Get the process-wide vehicle catalog, configured from VEHICLE_CATALOG_TTL"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = VehicleCatalog(ttl=getattr(settings, 'VEHICLE_CATALOG_TTL', DEFAULT_CATALOG_TTL))
+    return _catalog
+
+
+def invalidate_vehicle_catalog(**kwargs) -> None:
+    """Signal receiver dropping the catalog snapshot when a Vehicle changes
+
+    Deferred until the transaction commits, so a reload can't pick the old
+    rows back up in between.
+    """
+    transaction.on_commit(get_vehicle_catalog().invalidate)
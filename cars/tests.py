@@ -1,3 +1,82 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from cars.catalog import get_vehicle_catalog
+from cars.models import Vehicle
+
+
+class VehicleCatalogTests(TestCase):
+    """The in-process vehicle catalog and its typeahead search"""
+
+    NAMES = ['Mazda RX-7', 'Nissan GT-R', 'RX Vision', 'RX-500', 'Sparx Roadster', 'Toyota GR86']
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in cls.NAMES:
+            cls.create_vehicle(name)
+
+    @staticmethod
+    def create_vehicle(name):
+        return Vehicle.objects.create(
+            name=name, drivetrain='FR', car_type='ROAD',
+            base_weight=1300, base_power=400, base_pp=500,
+            lever_ratio_front=0.8, lever_ratio_rear=0.8
+        )
+
+    def setUp(self):
+        self.catalog = get_vehicle_catalog()
+        # Test data is written inside the test transaction, which never commits
+        self.catalog.invalidate()
+
+    def search(self, query, limit=10):
+        return [vehicle['name'] for vehicle in self.catalog.search(query, limit=limit)]
+
+    def test_search_orders_prefix_then_word_then_substring_matches(self):
+        self.assertEqual(self.search('rx'), ['RX Vision', 'RX-500', 'Mazda RX-7', 'Sparx Roadster'])
+        self.assertEqual(self.search('rx', limit=3), ['RX Vision', 'RX-500', 'Mazda RX-7'])
+        self.assertEqual(self.search('rx', limit=1), ['RX Vision'])
+
+    def test_search_ignores_case_and_whitespace(self):
+        self.assertEqual(self.search('  MAZDA   rx '), ['Mazda RX-7'])
+        self.assertEqual(self.search('gt'), ['Nissan GT-R'])
+        self.assertEqual(self.search(''), sorted(self.NAMES))
+        self.assertEqual(self.search('zonda'), [])
+
+    def test_lookups_share_one_query(self):
+        with self.assertNumQueries(1):
+            vehicle = self.catalog.get(self.catalog.choices()[0][0])
+            self.assertEqual(vehicle['name'], 'Mazda RX-7')
+            self.assertEqual(self.catalog.get(str(vehicle['id'])), vehicle)
+            self.assertIsNone(self.catalog.get('not an id'))
+            self.search('rx')
+
+    def test_save_and_delete_invalidate_the_snapshot(self):
+        etag = self.catalog.etag
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle = self.create_vehicle('RX Concept')
+        self.assertEqual(self.search('rx', limit=1), ['RX Concept'])
+        self.assertNotEqual(self.catalog.etag, etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle.name = 'Lotus Evora'
+            vehicle.save()
+        self.assertEqual(self.search('rx', limit=1), ['RX Vision'])
+        self.assertEqual(self.search('evora'), ['Lotus Evora'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle.delete()
+        self.assertEqual(self.search('evora'), [])
+        self.assertEqual(self.catalog.etag, etag)
+
+    def test_search_endpoint_revalidates_with_the_catalog_etag(self):
+        response = self.client.get(reverse('vehicle_search'), {'q': 'rx', 'limit': 2})
+        self.assertEqual([vehicle['name'] for vehicle in response.json()['vehicles']], ['RX Vision', 'RX-500'])
+
+        response = self.client.get(reverse('vehicle_search'), {'q': 'rx'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_vehicle('RX Concept')
+        response = self.client.get(reverse('vehicle_search'), {'q': 'rx'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
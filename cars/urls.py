@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.vehicle_list, name='vehicle_list'),
-]
\ No newline at end of file
+    path('search/', views.vehicle_search, name='vehicle_search'),
+]
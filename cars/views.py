@@ -1,6 +1,34 @@
 from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, etag
 from cars.models import Vehicle
+from cars.catalog import get_vehicle_catalog, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
 
 def vehicle_list(request):
     vehicles = Vehicle.objects.all()
-    return render(request, 'cars/vehicle_list.html', {'vehicles': vehicles})
\ No newline at end of file
+    return render(request, 'cars/vehicle_list.html', {'vehicles': vehicles})
+
+def catalog_etag(request):
+    """ETag for responses built only from the vehicle catalog"""
+    return get_vehicle_catalog().etag
+
+@require_GET
+@etag(catalog_etag)
+def vehicle_search(request):
+    """
+    Typeahead search over the vehicle catalog
+    
+    Query parameters: q (text typed so far) and limit. Answers with 304 Not
+    Modified while the catalog is unchanged and the client sends the ETag.
+    """
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    
+    vehicles = get_vehicle_catalog().search(request.GET.get('q', ''), limit=limit)
+    response = JsonResponse({'success': True, 'vehicles': vehicles})
+    # Revalidate with the ETag on every use rather than serve a stale catalog
+    response['Cache-Control'] = 'no-cache'
+    return response
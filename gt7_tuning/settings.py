@@ -29,6 +29,17 @@ DEBUG = True
 
 DEBUG_OCR = True
 
+# Worker threads for background screenshot OCR, and how long finished jobs are kept
+OCR_JOB_WORKERS = 2
+OCR_JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+# OCR debug capture: fraction of screenshots captured, queue and size limits, retention
+DEBUG_OCR_SAMPLE_RATE = 1.0
+DEBUG_OCR_QUEUE_SIZE = 256
+DEBUG_OCR_MAX_ARTIFACT_BYTES = 5 * 1024 * 1024
+DEBUG_OCR_MAX_TOTAL_BYTES = 500 * 1024 * 1024
+DEBUG_OCR_RETENTION_DAYS = 7
+
 ALLOWED_HOSTS = [ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='https://phillie11.pythonanywhere.com', cast=Csv())]
 
 
@@ -0,0 +1,427 @@
+# services/batch_calculation_service.py
+import math
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.calculation_service import (
+    TIRE_SPRING_MULTIPLIER_TABLE,
+    DAMPER_ROLLBAR_CAMBER_MULTIPLIER_TABLE,
+    TOE_MULTIPLIER_TABLE,
+    UNSPRUNG_WEIGHT_TABLE,
+    CAR_TYPE_MULTIPLIER_TABLE,
+    SPRING_FREQUENCY_OFFSET_TABLE,
+    OU_MULTIPLIER_TABLE,
+    CORNER_ENTRY_ADJUSTMENT_TABLE,
+    CORNER_EXIT_ADJUSTMENT_TABLE
+)
+
+logger = logging.getLogger(__name__)
+
+# Camber multipliers per drivetrain and track type (as in calculate_alignment_settings)
+FRONT_CAMBER_DRIVETRAIN_TABLE = {'4WD': 2.5, 'FF': 1.5, 'FR': 3.0, 'MR': 2.0, 'RR': 2.0}
+REAR_CAMBER_DRIVETRAIN_TABLE = {'4WD': 2.5, 'FF': 3.0, 'FR': 1.5, 'MR': 2.5, 'RR': 2.5}
+TRACK_LOOKUP_TABLE = {'Fast': 0.9, 'Technical': 1.1}
+
+# Most gears a batch row can ask for - gear ratio matrices have this many columns
+MAX_GEARS = 9
+GEAR_NAMES = ['1st', '2nd', '3rd'] + [f"{gear}th" for gear in range(4, MAX_GEARS + 1)]
+
+# Fallback results, matching the scalar functions' error defaults
+DEFAULT_GEAR_RATIOS = [3.545, 2.053, 1.395, 1.052, 0.851, 0.709]
+DEFAULT_FINAL_DRIVE = 3.700
+
+
+def validate_columns(records: List[Dict[str, Any]], fields: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], List[Dict[str, List[str]]]]:
+    """Convert a list of input records into validated columns
+
+    Each field spec is a dict with 'kind' ('int', 'float' or 'choice'),
+    'required', 'default', 'min', 'max' and 'choices'. Values are coerced
+    one column at a time and the range and choice checks run on whole
+    arrays, so validating thousands of records costs little more than
+    reading them.
+
+    Args:
+        records: Input dicts, one per setup
+        fields: Field specs keyed by field name
+
+    Returns:
+        Tuple of (columns keyed by field name, per-record error dicts - empty for valid records)
+    """
+    records = [record if isinstance(record, dict) else {} for record in records]
+    columns = {}
+    errors: List[Dict[str, List[str]]] = [{} for _ in records]
+
+    for name, spec in fields.items():
+        values = [record.get(name) for record in records]
+        missing = np.array([value is None or value == '' for value in values], dtype=bool)
+
+        # Missing values take the field's default, or are required errors
+        default = spec.get('default')
+        if default is not None:
+            values = [default if is_missing else value for value, is_missing in zip(values, missing)]
+            missing[:] = False
+        elif spec.get('required'):
+            for index in np.flatnonzero(missing):
+                errors[index].setdefault(name, []).append("This field is required.")
+
+        if spec['kind'] == 'choice':
+            column = np.array(['' if value is None else str(value) for value in values], dtype=object)
+            invalid = ~missing & ~np.isin(column, [str(choice) for choice in spec['choices']])
+            for index in np.flatnonzero(invalid):
+                errors[index].setdefault(name, []).append(
+                    f"Select a valid choice. {column[index]} is not one of the available choices."
+                )
+            columns[name] = column
+            continue
+
+        column = np.array([_to_float(value) for value in values], dtype=np.float64)
+        not_number = ~missing & np.isnan(column)
+        message = "Enter a whole number." if spec['kind'] == 'int' else "Enter a number."
+        for index in np.flatnonzero(not_number):
+            errors[index].setdefault(name, []).append(message)
+
+        # Range and integer checks on the whole column at once
+        checked = ~missing & ~not_number
+        if spec['kind'] == 'int':
+            for index in np.flatnonzero(checked & (column != np.trunc(column))):
+                errors[index].setdefault(name, []).append("Enter a whole number.")
+        if spec.get('min') is not None:
+            for index in np.flatnonzero(checked & (column < spec['min'])):
+                errors[index].setdefault(name, []).append(
+                    f"Ensure this value is greater than or equal to {spec['min']}."
+                )
+        if spec.get('max') is not None:
+            for index in np.flatnonzero(checked & (column > spec['max'])):
+                errors[index].setdefault(name, []).append(
+                    f"Ensure this value is less than or equal to {spec['max']}."
+                )
+
+        columns[name] = column
+
+    return columns, errors
+
+
+def apply_row_rules(columns: Dict[str, np.ndarray], errors: List[Dict[str, List[str]]],
+                    rules: List[Dict[str, Any]]) -> None:
+    """Run cross-field checks (a form's clean()) on validated columns
+
+    Each rule is a dict with 'fields' (the inputs it compares), 'invalid'
+    (a function taking the columns and returning a boolean array of
+    failing rows), 'field' (the field the error is reported on, or None
+    for a non-field error) and 'message'. Like clean(), a rule only
+    applies to rows where all of its fields are valid and non-zero, and a
+    row stops at its first failing rule.
+
+    Args:
+        columns: Columns returned by validate_columns()
+        errors: Per-record error dicts (updated in place)
+        rules: Rules in the order clean() checks them
+    """
+    # Rows whose vehicle is invalid never reach the form's field comparisons
+    stopped = np.array(['vehicle' in row_errors for row_errors in errors], dtype=bool)
+
+    with np.errstate(invalid='ignore'):
+        for rule in rules:
+            applies = ~stopped
+            for name in rule['fields']:
+                column = columns[name]
+                valid = np.array([name not in row_errors for row_errors in errors], dtype=bool)
+                applies = applies & valid & np.isfinite(column) & (column != 0)
+            failing = applies & np.asarray(rule['invalid'](columns), dtype=bool)
+            for index in np.flatnonzero(failing):
+                errors[index].setdefault(rule['field'] or '__all__', []).append(rule['message'])
+            stopped |= failing
+
+
+def calculate_suspension_batch(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Calculate suspension settings for many setups at once
+
+    Array versions of calculate_spring_rates, calculate_spring_frequencies,
+    calculate_damper_settings, calculate_roll_bar_stiffness and
+    calculate_alignment_settings. Rows where a scalar function would have
+    failed (e.g. zero high speed stability in the toe formula) get that
+    function's default values.
+
+    Args:
+        columns: Validated input columns plus the vehicle columns
+            'front_lever_ratio', 'rear_lever_ratio', 'drivetrain' and 'car_type'
+
+    Returns:
+        Dict of result arrays keyed by result name
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        front_tires = columns['front_tires']
+        rear_tires = columns['rear_tires']
+        drivetrain = columns['drivetrain']
+        front_weight_distribution = columns['front_weight_distribution']
+        vehicle_weight = columns['vehicle_weight']
+
+        # Mass distribution shared by springs, frequencies and dampers
+        front_weight_ratio = front_weight_distribution / 100.0
+        front_mass = vehicle_weight * front_weight_ratio
+        rear_mass = vehicle_weight * (1 - front_weight_ratio)
+
+        # Spring rates
+        unsprung_weight = _lookup(UNSPRUNG_WEIGHT_TABLE, drivetrain, 45)
+        front_load = (front_mass + (columns['front_downforce'] / 2) - unsprung_weight) / columns['front_lever_ratio']
+        rear_load = (rear_mass + (columns['rear_downforce'] / 2) - unsprung_weight) / columns['rear_lever_ratio']
+        front_spring_rate_nm = (front_load * 9.81) / (np.maximum(1, columns['front_ride_height']) / 1000)
+        rear_spring_rate_nm = (rear_load * 9.81) / (np.maximum(1, columns['rear_ride_height']) / 1000)
+
+        stiffness_multiplier = columns['stiffness_multiplier']
+        front_spring_rate = _round_spring_rate(
+            front_spring_rate_nm * stiffness_multiplier * _lookup(TIRE_SPRING_MULTIPLIER_TABLE, front_tires, 1.0) / 1000
+        )
+        rear_spring_rate = _round_spring_rate(
+            rear_spring_rate_nm * stiffness_multiplier * _lookup(TIRE_SPRING_MULTIPLIER_TABLE, rear_tires, 1.0) / 1000
+        )
+        failed = ~np.isfinite(front_spring_rate) | ~np.isfinite(rear_spring_rate)
+        front_spring_rate[failed] = 7.0
+        rear_spring_rate[failed] = 7.0
+
+        # Spring frequencies
+        car_type_multiplier = _lookup(CAR_TYPE_MULTIPLIER_TABLE, columns['car_type'], 1.333)
+        offset_multiplier = _lookup(SPRING_FREQUENCY_OFFSET_TABLE, columns['spring_frequency_offset'].astype(int), 1.0)
+        front_frequency = _round(
+            (1 / (2 * math.pi)) * np.sqrt(front_spring_rate * 1000 / front_mass) * car_type_multiplier * offset_multiplier, 2
+        )
+        rear_frequency = _round(
+            (1 / (2 * math.pi)) * np.sqrt(rear_spring_rate * 1000 / rear_mass) * car_type_multiplier * offset_multiplier, 2
+        )
+        failed = ~np.isfinite(front_frequency) | ~np.isfinite(rear_frequency)
+        front_frequency[failed] = 2.50
+        rear_frequency[failed] = 2.50
+
+        # Dampers - half of critical damping as the baseline
+        front_damping = 2 * np.sqrt(front_spring_rate * 1000 * front_mass) * 0.5
+        rear_damping = 2 * np.sqrt(rear_spring_rate * 1000 * rear_mass) * 0.5
+        front_damper_multiplier = _lookup(DAMPER_ROLLBAR_CAMBER_MULTIPLIER_TABLE, front_tires, 1.0)
+        rear_damper_multiplier = _lookup(DAMPER_ROLLBAR_CAMBER_MULTIPLIER_TABLE, rear_tires, 1.0)
+        entry = columns['corner_entry_adjustment'].astype(int)
+        exit_ = columns['corner_exit_adjustment'].astype(int)
+
+        dampers = {}
+        for name, base, divisor, damping, multiplier, key in (
+            ('front_compression', 20, 1000, front_damping, front_damper_multiplier, 'front_compression'),
+            ('rear_compression', 20, 1000, rear_damping, rear_damper_multiplier, 'rear_compression'),
+            ('front_extension', 30, 800, front_damping, front_damper_multiplier, 'front_rebound'),
+            ('rear_extension', 30, 800, rear_damping, rear_damper_multiplier, 'rear_rebound'),
+        ):
+            baseline = (base + damping / divisor) * multiplier
+            entry_value = np.trunc(baseline * _lookup_adjustment(CORNER_ENTRY_ADJUSTMENT_TABLE, entry, key))
+            exit_value = np.trunc(baseline * _lookup_adjustment(CORNER_EXIT_ADJUSTMENT_TABLE, exit_, key))
+            dampers[name] = np.clip(np.trunc((entry_value + exit_value) / 2), base, base + 20)
+
+        failed = np.zeros(len(vehicle_weight), dtype=bool)
+        for value in dampers.values():
+            failed |= ~np.isfinite(value)
+        for name, default in (('front_compression', 30), ('front_extension', 40),
+                              ('rear_compression', 30), ('rear_extension', 40)):
+            dampers[name][failed] = default
+
+        # Roll bars
+        low_speed_stability = columns['low_speed_stability']
+        high_speed_stability = columns['high_speed_stability']
+        rotational_g_sum = columns['rotational_g_40mph'] + columns['rotational_g_75mph'] + columns['rotational_g_150mph']
+        ou_adjustment = columns['ou_adjustment'].astype(int)
+        arb_stiffness_multiplier = columns['arb_stiffness_multiplier']
+        front_roll_bar = np.clip(
+            rotational_g_sum * -high_speed_stability * arb_stiffness_multiplier *
+            _lookup(OU_MULTIPLIER_TABLE, ou_adjustment, [1.0, 1.0], index=0),
+            1, 10
+        )
+        rear_roll_bar = np.clip(
+            rotational_g_sum * -(low_speed_stability + high_speed_stability) * arb_stiffness_multiplier *
+            _lookup(OU_MULTIPLIER_TABLE, ou_adjustment, [1.0, 1.0], index=1),
+            1, 10
+        )
+
+        # Alignment
+        tire_wear_multiplier = columns['tire_wear_multiplier']
+        alignment_factor = np.where(
+            (tire_wear_multiplier >= 1) & (tire_wear_multiplier <= 50),
+            1.0 - (0.3 * tire_wear_multiplier / 50),
+            1.0
+        )
+        front_drivetrain_multiplier = _lookup(FRONT_CAMBER_DRIVETRAIN_TABLE, drivetrain, 1.0)
+        rear_drivetrain_multiplier = _lookup(REAR_CAMBER_DRIVETRAIN_TABLE, drivetrain, 1.0)
+        track_multiplier = _lookup(TRACK_LOOKUP_TABLE, columns['track_type'], 1.0)
+        half_g = columns['rotational_g_75mph'] / 2
+
+        front_camber = _round(
+            ((half_g * front_drivetrain_multiplier * track_multiplier * alignment_factor * 1) + front_weight_ratio) *
+            1.2 * _lookup(DAMPER_ROLLBAR_CAMBER_MULTIPLIER_TABLE, front_tires, 1.0), 1
+        )
+        rear_camber = _round(
+            (((half_g * rear_drivetrain_multiplier * track_multiplier * alignment_factor * 1) - front_weight_ratio + 1) * 1.2) *
+            _lookup(DAMPER_ROLLBAR_CAMBER_MULTIPLIER_TABLE, rear_tires, 1.0), 1
+        )
+        front_toe = _round(
+            (low_speed_stability / -(high_speed_stability * 40)) * front_drivetrain_multiplier *
+            alignment_factor * (track_multiplier * 3) * _lookup(TOE_MULTIPLIER_TABLE, front_tires, 1.0), 2
+        )
+        rear_toe = _round(
+            (-(high_speed_stability * low_speed_stability * 0.05) * rear_drivetrain_multiplier *
+             alignment_factor * (track_multiplier * 3) + 0.2) * _lookup(TOE_MULTIPLIER_TABLE, rear_tires, 1.0), 2
+        )
+
+        # The scalar toe formula divides by high speed stability and falls back on zero
+        failed = (high_speed_stability == 0) | ~np.isfinite(front_toe) | ~np.isfinite(front_camber)
+        front_camber[failed] = -3.0
+        rear_camber[failed] = -2.0
+        front_toe[failed] = 0.05
+        rear_toe[failed] = 0.20
+
+    results = {
+        'front_spring_rate': front_spring_rate,
+        'rear_spring_rate': rear_spring_rate,
+        'front_spring_frequency': front_frequency,
+        'rear_spring_frequency': rear_frequency,
+        'front_roll_bar': front_roll_bar,
+        'rear_roll_bar': rear_roll_bar,
+        'front_camber': front_camber,
+        'rear_camber': rear_camber,
+        'front_toe': front_toe,
+        'rear_toe': rear_toe,
+    }
+    results.update({name: value.astype(int) for name, value in dampers.items()})
+    return results
+
+
+def calculate_gearing_batch(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Calculate gear ratios, gear speeds, top speed and acceleration for many setups at once
+
+    Array versions of calculate_optimal_gear_ratios, generate_gear_speeds,
+    calculate_speed_at_rpm and estimate_acceleration. Gear ratios and
+    speeds are (setups x MAX_GEARS) matrices with NaN past each setup's
+    num_gears.
+
+    Args:
+        columns: Validated input columns plus the vehicle column 'weight_kg'
+
+    Returns:
+        Dict of result arrays keyed by result name
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        num_gears = columns['num_gears'].astype(int)
+        power_hp = columns['power_hp']
+        min_rpm = columns['min_rpm']
+        max_rpm = columns['max_rpm']
+        max_power_rpm = columns['max_power_rpm']
+        tire_diameter_meters = np.where(np.isnan(columns['tire_diameter_inches']), 26.0,
+                                        columns['tire_diameter_inches']) * 0.0254
+
+        # Final drive from power, top gear for top speed at max RPM
+        final_drive = np.clip(4.5 - (0.0015 * power_hp), 3.0, 5.0)
+        top_gear_ratio = (max_rpm * math.pi * tire_diameter_meters) / (60 * (columns['top_speed_mph'] * 0.44704) * final_drive)
+
+        # First gear for the corner speed at 40% of the way into the power band
+        target_corner_rpm = min_rpm + (max_power_rpm - min_rpm) * 0.4
+        first_gear_ratio = np.minimum(
+            (target_corner_rpm * math.pi * tire_diameter_meters) /
+            (60 * (columns['min_corner_speed_mph'] * 0.44704 / 2) * final_drive),
+            5.0
+        )
+
+        # Geometric progression between first and top gear
+        ratio_step = np.power(first_gear_ratio / top_gear_ratio, 1 / (num_gears - 1))
+        gears = np.arange(MAX_GEARS)
+        gear_ratios = first_gear_ratio[:, None] / np.power(ratio_step[:, None], gears)
+        gear_ratios[:, 0] = first_gear_ratio
+        top = num_gears - 1
+        gear_ratios[np.arange(len(num_gears)), top] = top_gear_ratio
+        gear_ratios = _round(gear_ratios, 3)
+        gear_ratios[gears[None, :] >= num_gears[:, None]] = np.nan
+        final_drive = _round(final_drive, 3)
+
+        failed = ~np.isfinite(final_drive) | ~np.isfinite(first_gear_ratio) | ~np.isfinite(top_gear_ratio)
+        failed |= ~(ratio_step > 0)
+        if failed.any():
+            gear_ratios[failed] = np.nan
+            gear_ratios[failed, :len(DEFAULT_GEAR_RATIOS)] = DEFAULT_GEAR_RATIOS
+            final_drive[failed] = DEFAULT_FINAL_DRIVE
+            num_gears = np.where(failed, len(DEFAULT_GEAR_RATIOS), num_gears)
+
+        # Speed at max power in every gear, and top speed at max RPM in top gear
+        tire_circumference = math.pi * tire_diameter_meters
+        gear_speeds = _round(
+            (max_power_rpm[:, None] * tire_circumference[:, None]) /
+            (gear_ratios * final_drive[:, None] * 60) * 3.6 / 1.60934, 1
+        )
+        top_speed_mph = (max_rpm * tire_circumference) / (
+            gear_ratios[np.arange(len(num_gears)), num_gears - 1] * final_drive * 60
+        ) * 3.6 / 1.60934
+
+        # 0-60 estimate from power to weight, first/second gear spacing and launch gear
+        first_gear = gear_ratios[:, 0]
+        spacing = first_gear / gear_ratios[:, 1]
+        gear_factor = np.where(spacing < 1.5, 0.9 + (spacing - 1.0) * 0.1,
+                               np.where(spacing > 2.0, 0.9 + (2.5 - spacing) * 0.1, 1.0))
+        launch_factor = np.where(first_gear > 3.5, 1.0 + (first_gear - 3.5) * 0.03,
+                                 np.where(first_gear < 2.5, 1.0 + (2.5 - first_gear) * 0.05, 1.0))
+        acceleration = _round(5.0 / ((power_hp / columns['weight_kg']) * gear_factor) * 2.5 * launch_factor, 1)
+        acceleration[~np.isfinite(acceleration)] = 9.9
+
+    return {
+        'gear_ratios': gear_ratios,
+        'final_drive': final_drive,
+        'gear_speeds': gear_speeds,
+        'top_speed_mph': top_speed_mph,
+        'acceleration_estimate': acceleration,
+    }
+
+
+def _to_float(value: Any) -> float:
+    """Coerce an input value to float, NaN if it isn't a number"""
+    if isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _lookup(table: Dict[Any, Any], keys: np.ndarray, default: Any, index: Optional[int] = None) -> np.ndarray:
+    """Map an array of table keys to a float array of table values
+
+    Only the distinct keys are looked up in Python; the values are then
+    broadcast back with the inverse index.
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    values = [table.get(key.item() if hasattr(key, 'item') else key, default) for key in unique]
+    if index is not None:
+        values = [value[index] for value in values]
+    return np.asarray(values, dtype=np.float64)[inverse.reshape(-1)]
+
+
+def _lookup_adjustment(table: Dict[int, Dict[str, float]], keys: np.ndarray, name: str) -> np.ndarray:
+    """Look up one multiplier from a corner adjustment table, neutral for unknown keys"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    values = [table.get(int(key), table[0])[name] for key in unique]
+    return np.asarray(values, dtype=np.float64)[inverse.reshape(-1)]
+
+
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    """Round like the built-in round(value, digits)
+
+    np.round scales by 10**digits first, which rounds values such as
+    3.4725 the other way from round(); the few values that land on a tie
+    after scaling are rounded with round() itself.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 10 ** digits
+    rounded = np.round(scaled) / 10 ** digits
+    ties = np.flatnonzero(np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6)
+    if len(ties):
+        flat = rounded.reshape(-1)
+        source = values.reshape(-1)
+        flat[ties] = [round(value, digits) for value in source[ties].tolist()]
+    return rounded
+
+
+def _round_spring_rate(rate: np.ndarray) -> np.ndarray:
+    """Round spring rates (N/mm) to GT7's increments: 0.1 below 10, 0.5 below 30, then whole numbers"""
+    return np.where(rate < 10, np.round(rate * 10) / 10,
+                    np.where(rate < 30, np.round(rate * 2) / 2, np.round(rate)))
@@ -0,0 +1,270 @@
+# services/debug_writer.py
+import os
+import json
+import time
+import queue
+import random
+import shutil
+import atexit
+import logging
+import threading
+from typing import Any, Optional, Union
+
+import numpy as np
+import cv2
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden with DebugArtifactWriter.configure()
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_MAX_ARTIFACT_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 500 * 1024 * 1024
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+# How often the worker prunes the debug root
+CLEANUP_INTERVAL_SECONDS = 300
+
+
+class DebugArtifactWriter:
+    """Background writer for OCR debug artifacts
+
+    Debug images and JSON are queued and encoded/written on a single daemon
+    thread, so capturing them adds no disk I/O to the request. The queue is
+    bounded: when it is full new artifacts are dropped rather than blocking.
+    Oversized artifacts are skipped, and the debug root is pruned by age and
+    total size on the worker thread.
+    """
+
+    def __init__(self):
+        self.root: Optional[str] = None
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.max_artifact_bytes = DEFAULT_MAX_ARTIFACT_BYTES
+        self.max_total_bytes = DEFAULT_MAX_TOTAL_BYTES
+        self.retention_seconds = DEFAULT_RETENTION_SECONDS
+
+        self.dropped = 0
+        self.skipped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._bytes_since_cleanup = 0
+        self._last_cleanup = 0.0
+
+    def configure(self, root: Optional[str] = None, sample_rate: Optional[float] = None,
+                  queue_size: Optional[int] = None, max_artifact_bytes: Optional[int] = None,
+                  max_total_bytes: Optional[int] = None, retention_seconds: Optional[int] = None) -> None:
+        """Update the writer settings
+
+        Args:
+            root: Directory that retention and the size cap apply to
+            sample_rate: Fraction of screenshots to capture debug output for (0-1)
+            queue_size: Maximum number of pending artifacts
+            max_artifact_bytes: Artifacts larger than this are skipped
+            max_total_bytes: Oldest capture directories are removed above this total
+            retention_seconds: Capture directories older than this are removed
+        """
+        with self._lock:
+            if root is not None:
+                self.root = root
+            if sample_rate is not None:
+                self.sample_rate = max(0.0, min(1.0, sample_rate))
+            if max_artifact_bytes is not None:
+                self.max_artifact_bytes = max_artifact_bytes
+            if max_total_bytes is not None:
+                self.max_total_bytes = max_total_bytes
+            if retention_seconds is not None:
+                self.retention_seconds = retention_seconds
+            if queue_size is not None and queue_size != self._queue.maxsize and self._thread is None:
+                self._queue = queue.Queue(maxsize=queue_size)
+
+    def should_sample(self) -> bool:
+        """Decide whether to capture debug output for the next screenshot"""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ------------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------------
+
+    def write_image(self, path: str, image: Union[np.ndarray, Image.Image]) -> bool:
+        """Queue an image to be encoded and written
+
+        The image must not be modified after it is queued.
+
+        Args:
+            path: Destination file path (the extension picks the format)
+            image: OpenCV array or PIL image
+
+        Returns:
+            True if the artifact was queued
+        """
+        return self._enqueue('image', path, image)
+
+    def write_json(self, path: str, data: Any) -> bool:
+        """Queue data to be written as indented JSON"""
+        return self._enqueue('json', path, data)
+
+    def write_bytes(self, path: str, data: Union[bytes, memoryview]) -> bool:
+        """Queue raw bytes to be written"""
+        return self._enqueue('bytes', path, data)
+
+    def _enqueue(self, kind: str, path: str, payload: Any) -> bool:
+        """Put an artifact on the queue, dropping it if the queue is full"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((kind, path, payload))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Debug artifact queue full, dropped {os.path.basename(path)}")
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued artifacts to be written
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the queue drained
+        """
+        if self._thread is None:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread on first use"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='ocr-debug-writer', daemon=True)
+                    self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        """Write queued artifacts until the process exits"""
+        while True:
+            kind, path, payload = self._queue.get()
+            try:
+                self._write(kind, path, payload)
+            except Exception as e:
+                logger.error(f"Error writing debug artifact {path}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+            try:
+                if (time.monotonic() - self._last_cleanup > CLEANUP_INTERVAL_SECONDS or
+                        self._bytes_since_cleanup > self.max_total_bytes // 10):
+                    self.cleanup()
+            except Exception as e:
+                logger.error(f"Error cleaning up debug artifacts: {str(e)}")
+
+    def _write(self, kind: str, path: str, payload: Any) -> None:
+        """Encode and write a single artifact"""
+        if kind == 'image':
+            data = self._encode_image(path, payload)
+        elif kind == 'json':
+            data = json.dumps(payload, indent=2, default=str).encode('utf-8')
+        else:
+            data = payload
+
+        if data is None:
+            return
+
+        if len(data) > self.max_artifact_bytes:
+            self.skipped += 1
+            logger.debug(f"Skipped {len(data)} byte debug artifact {path}")
+            return
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._bytes_since_cleanup += len(data)
+
+    @staticmethod
+    def _encode_image(path: str, image: Union[np.ndarray, Image.Image]) -> Optional[bytes]:
+        """Encode an image in the format given by the path's extension"""
+        if isinstance(image, Image.Image):
+            image = np.array(image.convert('RGB'))[:, :, ::-1]
+
+        extension = os.path.splitext(path)[1] or '.jpg'
+        ok, encoded = cv2.imencode(extension, image)
+        return encoded.tobytes() if ok else None
+
+    def cleanup(self) -> None:
+        """Remove expired capture directories and enforce the total size cap
+
+        Every entry directly under the root is treated as one capture.
+        """
+        self._last_cleanup = time.monotonic()
+        self._bytes_since_cleanup = 0
+
+        if not self.root or not os.path.isdir(self.root):
+            return
+
+        now = time.time()
+        captures = []
+        for entry in os.scandir(self.root):
+            modified = entry.stat().st_mtime
+            if now - modified > self.retention_seconds:
+                self._remove(entry.path)
+                continue
+            captures.append((modified, entry.path, self._size_of(entry.path)))
+
+        # Remove the oldest captures until the root fits under the cap
+        total = sum(size for _, _, size in captures)
+        for _, path, size in sorted(captures):
+            if total <= self.max_total_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _size_of(path: str) -> int:
+        """Total size of a file or directory tree in bytes"""
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+
+        size = 0
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Remove a capture directory or file"""
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        logger.debug(f"Removed debug capture {path}")
+
+
+_writer = DebugArtifactWriter()
+
+
+def get_debug_writer() -> DebugArtifactWriter:
+    """Get the process-wide debug artifact writer"""
+    return _writer
+
+
+# Give pending artifacts a moment to reach disk on a clean shutdown
+atexit.register(_writer.flush, 5.0)
@@ -0,0 +1,430 @@
+# services/digit_recognizer.py
+import os
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Size every glyph is normalised to before matching (width, height)
+GLYPH_WIDTH = 16
+GLYPH_HEIGHT = 24
+
+# Characters the classifier can return
+DIGIT_CHARS = '0123456789'
+
+# Directory of labelled crops ("<label>_<anything>.png" or "<label>/<anything>.png"),
+# shipped with digits cut from static/images/suspension_example.JPG
+DEFAULT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'glyph_templates')
+
+# File names can't contain some characters, so labelled crops use names for them
+LABEL_ALIASES = {
+    'dot': '.',
+    'period': '.',
+    'minus': '-',
+    'dash': '-',
+    'comma': ',',
+    'colon': ':',
+}
+
+# Minimum gap between the best and second best class before confidence is discounted
+MIN_CLASS_MARGIN = 0.08
+
+# Crops with more glyphs than this are not short numeric fields
+MAX_GLYPHS = 12
+
+
+class GlyphClassifier:
+    """Nearest-neighbour classifier for the short numbers in GT7's UI font
+
+    Glyphs are segmented with connected components, normalised to a fixed
+    size and compared against a template matrix with a single dot product,
+    so reading a field takes microseconds instead of a Tesseract round trip.
+    """
+
+    def __init__(self):
+        self._labels: List[str] = []
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._label_array: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+
+    def add_template(self, label: str, glyph: np.ndarray) -> None:
+        """Add a single labelled glyph
+
+        Args:
+            label: Character the glyph represents
+            glyph: Binary or grayscale image with the glyph as the bright foreground
+        """
+        vector = self._vectorize(glyph)
+        if vector is None:
+            return
+        self._labels.append(label)
+        self._vectors.append(vector)
+        self._matrix = None
+
+    def load_labelled_crops(self, directory: str) -> int:
+        """Load labelled glyph crops from a directory
+
+        Crops are either named ``<label>_<anything>.png`` or stored in a
+        ``<label>/`` sub-directory, and should be cut from real GT7
+        screenshots - generic fonts are too far from GT7's (a rendered "1"
+        matches its "4" best).
+
+        Args:
+            directory: Directory containing the crops
+
+        Returns:
+            Number of crops loaded
+        """
+        loaded = 0
+        if not directory or not os.path.isdir(directory):
+            return loaded
+
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if not file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                    continue
+
+                # Label comes from the sub-directory name or the file name prefix
+                if os.path.abspath(root) != os.path.abspath(directory):
+                    label = os.path.basename(root)
+                else:
+                    label = file_name.split('_', 1)[0]
+                label = LABEL_ALIASES.get(label.lower(), label)
+
+                if len(label) != 1:
+                    logger.debug(f"Skipping glyph crop with unusable label: {file_name}")
+                    continue
+
+                crop = cv2.imread(os.path.join(root, file_name), cv2.IMREAD_GRAYSCALE)
+                if crop is None:
+                    continue
+
+                self.add_template(label, binarize_text(crop))
+                loaded += 1
+
+        logger.debug(f"Loaded {loaded} labelled glyph crops from {directory}")
+        return loaded
+
+    # ------------------------------------------------------------------
+    # Recognition
+    # ------------------------------------------------------------------
+
+    def read(self, image: np.ndarray) -> Tuple[str, float]:
+        """Read a short number from an image crop
+
+        Args:
+            image: BGR, RGB or grayscale crop of a single text line
+
+        Returns:
+            Tuple of (text, confidence) where confidence is in the range 0-1
+        """
+        try:
+            if image is None or image.size == 0 or not self._vectors:
+                return "", 0.0
+
+            binary = binarize_text(image)
+            boxes = segment_glyphs(binary)
+
+            if not boxes or len(boxes) > MAX_GLYPHS:
+                return "", 0.0
+
+            # Measure the line from the tallest glyphs so punctuation doesn't skew it
+            tallest = max(h for _, _, _, h in boxes)
+            full_height = [b for b in boxes if b[3] >= tallest * 0.6]
+            line_top = min(y for _, y, _, _ in full_height)
+            baseline = max(y + h for _, y, _, h in full_height)
+            line_height = max(1, baseline - line_top)
+
+            chars = []
+            confidences = []
+            for box in boxes:
+                char, confidence = self._classify_box(binary, box, line_top, line_height, baseline)
+                chars.append(char)
+                confidences.append(confidence)
+
+            return "".join(chars), float(min(confidences))
+
+        except Exception as e:
+            logger.error(f"Error reading glyphs: {str(e)}")
+            return "", 0.0
+
+    def read_words(self, image: np.ndarray) -> List[Tuple[Tuple[int, int, int, int], str, float]]:
+        """Segment a multi-line crop into words and read each one
+
+        Args:
+            image: BGR, RGB or grayscale crop of a block of text
+
+        Returns:
+            List of ((x, y, w, h), text, confidence) in crop pixel coordinates
+        """
+        try:
+            if image is None or image.size == 0 or not self._vectors:
+                return []
+
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+            words = []
+            for x, y, w, h in segment_words(binarize_text(gray, upscale=False)):
+                # Read each word from a slightly padded crop so its glyphs aren't clipped
+                pad = max(1, h // 4)
+                crop = gray[max(0, y - pad):y + h + pad, max(0, x - pad):x + w + pad]
+                text, confidence = self.read(crop)
+                if text:
+                    words.append(((x, y, w, h), text, confidence))
+            return words
+
+        except Exception as e:
+            logger.error(f"Error reading words: {str(e)}")
+            return []
+
+    def classify(self, glyph: np.ndarray) -> Tuple[str, float]:
+        """Classify a single segmented glyph against the templates
+
+        Args:
+            glyph: Binary glyph image with the glyph as the bright foreground
+
+        Returns:
+            Tuple of (character, confidence)
+        """
+        vector = self._vectorize(glyph)
+        if vector is None or not self._vectors:
+            return "", 0.0
+
+        if self._matrix is None:
+            self._matrix = np.vstack(self._vectors)
+            self._label_array = np.array(self._labels)
+
+        # Cosine similarity against every template in one pass
+        scores = self._matrix @ vector
+        best_index = int(np.argmax(scores))
+        best_label = self._labels[best_index]
+        best_score = float(scores[best_index])
+
+        # Best score of any other class, used to discount ambiguous matches
+        other = scores[self._label_array != best_label]
+        second_score = float(other.max()) if other.size else -1.0
+
+        confidence = max(0.0, best_score)
+        margin = best_score - second_score
+        if margin < MIN_CLASS_MARGIN:
+            confidence *= max(0.0, margin) / MIN_CLASS_MARGIN
+
+        return best_label, confidence
+
+    def _classify_box(self, binary: np.ndarray, box: Tuple[int, int, int, int],
+                      line_top: int, line_height: int, baseline: int) -> Tuple[str, float]:
+        """Classify a glyph box, handling punctuation by its geometry"""
+        x, y, w, h = box
+
+        # Punctuation is much shorter than the digits on the line
+        if h < line_height * 0.45:
+            center_y = (y + h / 2 - line_top) / line_height
+            if w > h * 1.5 and 0.25 < center_y < 0.75:
+                return '-', 0.95
+            if center_y > 0.6:
+                # Commas hang below the baseline, decimal points sit on it
+                descender = (y + h - baseline) / line_height
+                return (',' if descender > 0.08 else '.'), 0.95
+            return "", 0.0
+
+        # Colons are two stacked dots merged into a single box
+        glyph = binary[y:y + h, x:x + w]
+        if w < line_height * 0.35:
+            count, _ = cv2.connectedComponents(glyph)
+            if count - 1 == 2:
+                return ':', 0.95
+
+        return self.classify(glyph)
+
+    @staticmethod
+    def _vectorize(glyph: np.ndarray) -> Optional[np.ndarray]:
+        """Normalise a glyph into a zero-mean unit-length feature vector"""
+        if glyph is None or glyph.size == 0:
+            return None
+
+        if glyph.ndim == 3:
+            glyph = cv2.cvtColor(glyph, cv2.COLOR_BGR2GRAY)
+
+        # Crop to the glyph's bounding box
+        ys, xs = np.nonzero(glyph > 127)
+        if len(xs) == 0:
+            return None
+        glyph = glyph[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+        # Scale to the target height, keeping the aspect ratio so narrow glyphs stay narrow
+        h, w = glyph.shape
+        scale = GLYPH_HEIGHT / h
+        new_w = max(1, min(GLYPH_WIDTH, int(round(w * scale))))
+        resized = cv2.resize(glyph, (new_w, GLYPH_HEIGHT), interpolation=cv2.INTER_AREA)
+
+        canvas = np.zeros((GLYPH_HEIGHT, GLYPH_WIDTH), dtype=np.float32)
+        offset = (GLYPH_WIDTH - new_w) // 2
+        canvas[:, offset:offset + new_w] = resized
+
+        vector = canvas.ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+
+def binarize_text(image: np.ndarray, upscale: bool = True) -> np.ndarray:
+    """Binarize a text crop so the text is white on a black background
+
+    Args:
+        image: BGR, RGB or grayscale crop
+        upscale: Whether to upscale crops shorter than a text line
+
+    Returns:
+        Binary uint8 image
+    """
+    if image.ndim == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+
+    # Small crops threshold badly, upscale them first
+    if upscale and gray.shape[0] < 32:
+        scale = 32.0 / gray.shape[0]
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # GT7 uses light text on a dark background, but make sure either way
+    if binary.mean() > 127:
+        binary = cv2.bitwise_not(binary)
+
+    return binary
+
+
+def segment_glyphs(binary: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Segment a binary text line into glyph boxes ordered left to right
+
+    Args:
+        binary: Binary image with white text on black
+
+    Returns:
+        List of (x, y, w, h) boxes
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return []
+
+    # Skip the background label and drop specks of noise
+    stats = stats[1:]
+    max_height = stats[:, cv2.CC_STAT_HEIGHT].max()
+    min_area = max(2, int(max_height * max_height * 0.01))
+
+    boxes = []
+    for x, y, w, h, area in stats:
+        if area < min_area:
+            continue
+        # Components touching the full crop height are usually UI borders
+        if h >= binary.shape[0] - 1 and w < 3:
+            continue
+        boxes.append([int(x), int(y), int(w), int(h)])
+
+    boxes.sort(key=lambda b: b[0])
+
+    # Merge boxes that overlap horizontally (colons, broken strokes)
+    merged = []
+    for box in boxes:
+        if merged:
+            last = merged[-1]
+            overlap = (last[0] + last[2]) - box[0]
+            if overlap > min(last[2], box[2]) * 0.5:
+                x1 = min(last[0], box[0])
+                y1 = min(last[1], box[1])
+                x2 = max(last[0] + last[2], box[0] + box[2])
+                y2 = max(last[1] + last[3], box[1] + box[3])
+                merged[-1] = [x1, y1, x2 - x1, y2 - y1]
+                continue
+        merged.append(box)
+
+    return [tuple(b) for b in merged]
+
+
+def segment_words(binary: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Segment a binary block of text into word boxes
+
+    Glyphs are merged horizontally with a dilation sized to the typical glyph
+    height, so characters in a word join while table columns stay apart.
+    Boxes on the same line that still overlap are merged into one word.
+
+    Args:
+        binary: Binary image with white text on black
+
+    Returns:
+        List of (x, y, w, h) boxes ordered top to bottom, left to right
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return []
+
+    # Typical glyph height, ignoring specks
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    heights = heights[heights >= 4]
+    if heights.size == 0:
+        return []
+    glyph_height = int(np.median(heights))
+
+    kernel = np.ones((1, max(3, int(glyph_height * 0.6))), np.uint8)
+    dilated = cv2.dilate(binary, kernel)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(dilated, connectivity=8)
+    boxes = []
+    for x, y, w, h, area in stats[1:]:
+        # Skip specks and rules/slider tracks that are much wider than they are tall
+        if h < glyph_height * 0.5 or h > glyph_height * 3 or w > h * 25:
+            continue
+        boxes.append((int(x), int(y), int(w), int(h)))
+
+    # A glyph that didn't join its word in the dilation (a decimal point and the digits after it)
+    # still overlaps the word's box; boxes on the same line that overlap are one word
+    boxes.sort(key=lambda b: b[0])
+    merged: List[Tuple[int, int, int, int]] = []
+    for box in boxes:
+        for index, (x, y, w, h) in enumerate(merged):
+            vertical_overlap = min(y + h, box[1] + box[3]) - max(y, box[1])
+            if box[0] < x + w and vertical_overlap >= min(h, box[3]) * 0.5:
+                left, top = min(x, box[0]), min(y, box[1])
+                right, bottom = max(x + w, box[0] + box[2]), max(y + h, box[1] + box[3])
+                merged[index] = (left, top, right - left, bottom - top)
+                break
+        else:
+            merged.append(box)
+
+    merged.sort(key=lambda b: (b[1], b[0]))
+    return merged
+
+
+_default_classifier = None
+_default_classifier_lock = threading.Lock()
+
+
+def get_glyph_classifier() -> GlyphClassifier:
+    """Get the shared classifier, building it on first use
+
+    Without labelled crops the classifier has no templates and reads
+    nothing, so every field falls back to Tesseract.
+
+    Returns:
+        GlyphClassifier trained on the labelled crops in DEFAULT_TEMPLATE_DIR
+    """
+    global _default_classifier
+    if _default_classifier is None:
+        with _default_classifier_lock:
+            if _default_classifier is None:
+                classifier = GlyphClassifier()
+                if not classifier.load_labelled_crops(DEFAULT_TEMPLATE_DIR):
+                    logger.warning(f"No glyph templates in {DEFAULT_TEMPLATE_DIR}, numeric fields will use Tesseract")
+                _default_classifier = classifier
+    return _default_classifier
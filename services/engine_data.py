@@ -0,0 +1,235 @@
+# services/engine_data.py
+import os
+import logging
+from typing import Dict, Any, Optional, List, Tuple, Union
+
+import numpy as np
+import cv2
+
+from services.screenshot_context import ScreenshotContext
+from services.debug_writer import get_debug_writer
+
+logger = logging.getLogger(__name__)
+
+# Where the power/torque graph sits on the power screenshot (left, top, right, bottom) as percentages
+POWER_GRAPH_REGION = (0.585, 0.095, 0.77, 0.32)
+
+# The power curve is cyan (high blue and green, low red) - BGR bounds
+POWER_CURVE_LOWER = np.array([160, 160, 0])
+POWER_CURVE_UPPER = np.array([255, 255, 100])
+
+# The torque curve is orange/yellow - HSV bounds
+TORQUE_CURVE_LOWER_HSV = np.array([10, 120, 150])
+TORQUE_CURVE_UPPER_HSV = np.array([35, 255, 255])
+
+# Power (PS/HP) = torque (kgf·m) × RPM / 716.2
+KGFM_RPM_TO_HP = 716.2
+
+# Torque conversion from kgf·m to lb·ft
+KGFM_TO_FTLB = 7.233
+
+# RPM step between rows of the engine data table
+DEFAULT_RPM_STEP = 100
+
+
+def build_curve_masks(graph_img: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Build the power and torque curve masks for a cropped graph
+
+    Args:
+        graph_img: BGR crop of the power/torque graph
+
+    Returns:
+        Tuple of (power_mask, torque_mask) as uint8 images
+    """
+    power_mask = cv2.inRange(graph_img, POWER_CURVE_LOWER, POWER_CURVE_UPPER)
+    hsv = cv2.cvtColor(graph_img, cv2.COLOR_BGR2HSV)
+    torque_mask = cv2.inRange(hsv, TORQUE_CURVE_LOWER_HSV, TORQUE_CURVE_UPPER_HSV)
+    return power_mask, torque_mask
+
+
+def extract_curve_profile(mask: np.ndarray) -> np.ndarray:
+    """Get the height of the topmost curve pixel in every column
+
+    Args:
+        mask: Binary curve mask
+
+    Returns:
+        Float array with one entry per column: height above the bottom of
+        the graph in pixels, or NaN where the column has no curve pixels
+    """
+    on = mask > 0
+    present = on.any(axis=0)
+
+    # argmax on a boolean array returns the first True - the topmost pixel
+    top_rows = on.argmax(axis=0)
+
+    heights = (mask.shape[0] - 1 - top_rows).astype(np.float64)
+    heights[~present] = np.nan
+    return heights
+
+
+def fill_profile_gaps(profile: np.ndarray) -> Optional[np.ndarray]:
+    """Linearly interpolate columns where the curve was not detected
+
+    Args:
+        profile: Output of extract_curve_profile
+
+    Returns:
+        Profile without NaNs, or None if the curve was not found at all
+    """
+    valid = ~np.isnan(profile)
+    if valid.sum() < 2:
+        return None
+
+    columns = np.arange(len(profile))
+    return np.interp(columns, columns[valid], profile[valid])
+
+
+def find_peak_position(profile: np.ndarray) -> float:
+    """Find the sub-pixel column where a curve profile peaks
+
+    Plateaus are averaged and single peaks are refined with a parabola
+    through the neighbouring columns.
+
+    Args:
+        profile: Gap-filled curve profile
+
+    Returns:
+        Peak position as a fractional column index
+    """
+    peak_height = profile.max()
+    plateau = np.nonzero(profile >= peak_height - 0.5)[0]
+
+    if len(plateau) > 1:
+        return float(plateau.mean())
+
+    peak = int(plateau[0])
+    if 0 < peak < len(profile) - 1:
+        left, center, right = profile[peak - 1], profile[peak], profile[peak + 1]
+        denominator = left - 2 * center + right
+        if denominator != 0:
+            return peak + 0.5 * (left - right) / denominator
+
+    return float(peak)
+
+
+def column_to_rpm(column: float, width: int, min_rpm: int, max_rpm: int) -> float:
+    """Map a graph column to RPM"""
+    return min_rpm + (column / max(1, width - 1)) * (max_rpm - min_rpm)
+
+
+def digitize_power_graph(graph_img: np.ndarray, min_rpm: int, max_rpm: int,
+                         power_hp: Optional[float] = None,
+                         torque_kgfm: Optional[float] = None,
+                         rpm_step: int = DEFAULT_RPM_STEP,
+                         masks: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Dict[str, Any]:
+    """Digitize the power and torque curves of a cropped graph
+
+    The graph has no readable y-axis labels, so each curve is scaled so its
+    peak matches the maximum power/torque read from the screenshot.
+
+    Args:
+        graph_img: BGR crop of the power/torque graph
+        min_rpm: RPM at the left edge of the graph
+        max_rpm: RPM at the right edge of the graph
+        power_hp: Maximum power, used to scale the power curve
+        torque_kgfm: Maximum torque, used to scale the torque curve
+        rpm_step: RPM step between rows of the engine data table
+        masks: Prebuilt (power_mask, torque_mask), built from graph_img if not given
+
+    Returns:
+        Dictionary with 'max_power_rpm' and, when power is known, 'engine_data_table'
+    """
+    power_mask, torque_mask = masks if masks is not None else build_curve_masks(graph_img)
+    width = graph_img.shape[1]
+
+    power_profile = fill_profile_gaps(extract_curve_profile(power_mask))
+    if power_profile is None:
+        logger.warning("No power curve found in the graph")
+        return {}
+
+    peak_column = find_peak_position(power_profile)
+    max_power_rpm = column_to_rpm(peak_column, width, min_rpm, max_rpm)
+
+    # Round to nearest 25 RPM (as is common in engine specs)
+    data = {'max_power_rpm': int(round(max_power_rpm / 25) * 25)}
+
+    if not power_hp:
+        return data
+
+    # Sample both curves on a regular RPM grid
+    columns = np.arange(width)
+    column_rpms = column_to_rpm(columns, width, min_rpm, max_rpm)
+    table_rpms = np.arange(min_rpm, max_rpm + 1, rpm_step, dtype=np.float64)
+
+    power = np.interp(table_rpms, column_rpms, power_profile) * (power_hp / power_profile.max())
+
+    torque_profile = fill_profile_gaps(extract_curve_profile(torque_mask))
+    if torque_profile is not None and torque_kgfm:
+        torque = np.interp(table_rpms, column_rpms, torque_profile) * (torque_kgfm / torque_profile.max())
+    else:
+        # Derive torque from the power curve when the torque curve isn't visible
+        torque = power * KGFM_RPM_TO_HP / np.maximum(table_rpms, 1)
+
+    data['engine_data_table'] = [
+        {
+            'RPM': int(rpm),
+            'Torque_kgfm': round(float(t), 2),
+            'Torque_ftlb': round(float(t * KGFM_TO_FTLB), 2),
+            'Power_hp': round(float(p), 1)
+        }
+        for rpm, t, p in zip(table_rpms, torque, power)
+    ]
+
+    return data
+
+
+def process_engine_data(source: Union[str, ScreenshotContext], results: Dict[str, Any],
+                        graph_region: Tuple[float, float, float, float] = POWER_GRAPH_REGION,
+                        debug_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Digitize the power/torque graph of a power screenshot
+
+    Args:
+        source: Screenshot context or path to the screenshot
+        results: Values already extracted by OCR (needs min_rpm and max_rpm)
+        graph_region: Graph location as percentages (x1, y1, x2, y2)
+        debug_dir: Directory to save the graph crop and masks to
+
+    Returns:
+        Dictionary with 'max_power_rpm' and 'engine_data_table' where available
+    """
+    try:
+        min_rpm = results.get('min_rpm')
+        max_rpm = results.get('max_rpm')
+        if not min_rpm or not max_rpm or min_rpm >= max_rpm:
+            return {}
+
+        context = ScreenshotContext.from_source(source)
+        graph_img = context.crop(graph_region)
+
+        masks = build_curve_masks(graph_img)
+        power_mask, torque_mask = masks
+
+        if debug_dir:
+            writer = get_debug_writer()
+            writer.write_image(os.path.join(debug_dir, "power_graph_region.jpg"), graph_img)
+            writer.write_image(os.path.join(debug_dir, "power_curve_mask.jpg"), power_mask)
+            writer.write_image(os.path.join(debug_dir, "torque_curve_mask.jpg"), torque_mask)
+
+        data = digitize_power_graph(
+            graph_img,
+            min_rpm,
+            max_rpm,
+            power_hp=results.get('power_hp'),
+            torque_kgfm=results.get('torque_kgfm'),
+            masks=masks
+        )
+
+        logger.debug(f"Digitized engine data: max power at {data.get('max_power_rpm')} RPM, "
+                     f"{len(data.get('engine_data_table', []))} table rows")
+
+        return data
+
+    except Exception as e:
+        logger.error(f"Error processing engine data: {str(e)}")
+        return {}
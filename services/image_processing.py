@@ -4,98 +4,249 @@ import numpy as np
 import tempfile
 import os
 import logging
-from typing import Tuple, Optional, Dict, List, Any
+from typing import Tuple, Optional, Dict, Union
 from PIL import Image
 
+from services.screenshot_context import ScreenshotContext
+from services.debug_writer import get_debug_writer
+
 logger = logging.getLogger(__name__)
 
+# Frame (width, height) photos of the screen are warped into - the frame the region tables are defined in
+CANONICAL_FRAME_SIZE = (1920, 1080)
+
+# Width photos are downscaled to before looking for the screen
+PERSPECTIVE_DETECTION_WIDTH = 960
+
+# The screen must cover at least this fraction of a photo
+MIN_SCREEN_AREA_FRACTION = 0.2
+
+# Quads covering more than this fraction of the image need no correction
+MAX_SCREEN_AREA_FRACTION = 0.97
+
 class ImageProcessingError(Exception):
     """Exception raised for errors in image processing."""
     pass
 
-
-def detect_ui_regions(image_path: str, debug_mode: bool = False) -> Dict[str, Tuple[float, float, float, float]]:
+def detect_content_area(img: np.ndarray, threshold: int = 24) -> Optional[Tuple[float, float, float, float]]:
     """
-    Detect UI regions dynamically based on image content
+    Detect the active picture area of a screenshot, excluding black letterbox or pillarbox bars
     
     Args:
-        image_path: Path to the image
-        debug_mode: Whether to save debug images
+        img: BGR or grayscale image array
+        threshold: Brightness a row or column must exceed to count as picture
         
     Returns:
-        Dictionary mapping region names to normalized coordinates (x1, y1, x2, y2)
+        Normalized coordinates (x1, y1, x2, y2) of the picture area or None if the image is blank
     """
     try:
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ImageProcessingError(f"Could not load image at {image_path}")
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        height, width = gray.shape[:2]
         
-        height, width = img.shape[:2]
+        # Brightest pixel of every row and column - bars stay dark all the way across
+        rows = np.nonzero(gray.max(axis=1) > threshold)[0]
+        cols = np.nonzero(gray.max(axis=0) > threshold)[0]
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if len(rows) == 0 or len(cols) == 0:
+            logger.warning("No picture content detected")
+            return None
         
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        return (
+            float(cols[0] / width),
+            float(rows[0] / height),
+            float((cols[-1] + 1) / width),
+            float((rows[-1] + 1) / height)
+        )
         
-        # Find edges
-        edges = cv2.Canny(blurred, 50, 150)
+    except Exception as e:
+        logger.error(f"Error detecting content area: {str(e)}")
+        return None
+
+def order_quad_points(points: np.ndarray) -> np.ndarray:
+    """
+    Order four corner points as top-left, top-right, bottom-right, bottom-left
+    
+    Args:
+        points: Array of four (x, y) points
         
-        if debug_mode:
-            debug_dir = os.path.join(os.path.dirname(image_path), 'debug_ui_detection')
-            os.makedirs(debug_dir, exist_ok=True)
-            cv2.imwrite(os.path.join(debug_dir, "edges.jpg"), edges)
+    Returns:
+        float32 array of shape (4, 2)
+    """
+    points = points.reshape(4, 2).astype(np.float32)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)]
+    ], dtype=np.float32)
+
+def find_screen_quad(gray: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Find the TV screen in a photo
+    
+    Args:
+        gray: Downscaled grayscale photo
         
-        # Find contours
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    Returns:
+        Ordered corner points in normalized coordinates, or None if no screen was found
+    """
+    height, width = gray.shape[:2]
+    image_area = width * height
+    
+    # Close small gaps in the screen outline before tracing it
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 30, 100)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    
+    candidates = []
+    for cnt in contours:
+        hull = cv2.convexHull(cnt)
+        area = cv2.contourArea(hull)
+        if not MIN_SCREEN_AREA_FRACTION * image_area < area < MAX_SCREEN_AREA_FRACTION * image_area:
+            continue
+        
+        approx = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True)
+        if len(approx) != 4:
+            continue
+        
+        quad = order_quad_points(approx)
+        
+        # The screen is 16:9; allow for foreshortening from the camera angle
+        top, right, bottom, left = (np.linalg.norm(quad[(i + 1) % 4] - quad[i]) for i in range(4))
+        aspect = (top + bottom) / max(1.0, left + right)
+        if not 1.2 < aspect < 2.6:
+            continue
+        
+        candidates.append((area, quad))
+    
+    if not candidates:
+        return None
+    
+    # The dilated screen outline and the TV bezel give nested quads - keep the innermost large one
+    largest = max(area for area, _ in candidates)
+    area, quad = min((c for c in candidates if c[0] >= largest * 0.8), key=lambda c: c[0])
+    
+    # A dark UI barely stands out from the bezel, so the strongest outline is often the TV itself
+    quad = trim_screen_bezel(gray, quad)
+    
+    quad = quad / np.array([width, height], dtype=np.float32)
+    
+    # Console captures are 16:9 with the UI edge to edge - an axis-aligned quad in one is a UI panel
+    bounds = np.array([quad[:, 0].min(), quad[:, 1].min(), quad[:, 0].max(), quad[:, 1].max()])
+    axis_aligned = (np.abs(quad[[0, 3], 0] - bounds[0]).max() < 0.01 and
+                    np.abs(quad[[1, 2], 0] - bounds[2]).max() < 0.01 and
+                    np.abs(quad[[0, 1], 1] - bounds[1]).max() < 0.01 and
+                    np.abs(quad[[2, 3], 1] - bounds[3]).max() < 0.01)
+    if axis_aligned and abs(width / height - 16 / 9) < 0.02:
+        return None
+    
+    return quad
+
+def trim_screen_bezel(gray: np.ndarray, quad: np.ndarray) -> np.ndarray:
+    """
+    Shrink a TV outline to the lit picture inside its bezel
+    
+    Even a dark picture is lighter than the unlit bezel, so the picture is
+    the largest blob above the bezel's level. The quad is only replaced if
+    everything between the two outlines is uniformly dark.
+    
+    Args:
+        gray: Downscaled grayscale photo
+        quad: Ordered corner points of the outline in pixels
         
-        # Filter contours by size to find potential UI elements
-        min_area = width * height * 0.001  # Minimum area threshold (0.1% of image)
-        max_area = width * height * 0.1    # Maximum area threshold (10% of image)
+    Returns:
+        Ordered corner points of the picture in pixels
+    """
+    outline = np.zeros(gray.shape[:2], dtype=np.uint8)
+    cv2.fillConvexPoly(outline, quad.astype(np.int32), 255)
+    inside = gray[outline > 0]
+    
+    bezel_level = float(np.percentile(inside, 5))
+    threshold = bezel_level + max(4.0, (float(np.median(inside)) - bezel_level) * 0.25)
+    
+    lit = ((gray > threshold) & (outline > 0)).astype(np.uint8) * 255
+    lit = cv2.morphologyEx(lit, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(lit, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return quad
+    
+    hull = cv2.convexHull(max(contours, key=cv2.contourArea))
+    approx = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True)
+    if len(approx) != 4 or cv2.contourArea(approx) < cv2.contourArea(quad) * 0.6:
+        return quad
+    inner = order_quad_points(approx)
+    
+    # The ring between the outlines must look like a bezel, not dark picture content
+    picture = np.zeros_like(outline)
+    cv2.fillConvexPoly(picture, inner.astype(np.int32), 255)
+    ring = gray[(outline > 0) & (picture == 0)]
+    if ring.size == 0 or ring.std() > 4 or ring.mean() > threshold:
+        return quad
+    
+    return inner
+
+def correct_perspective(source: Union[str, ScreenshotContext], debug_mode: bool = False) -> ScreenshotContext:
+    """
+    Warp a photo of the TV into the canonical 1920x1080 frame
+    
+    The screen is found on a downscaled copy and a homography from its
+    corners to the canonical frame is applied to the full resolution photo
+    once. Screenshots that aren't photos are returned unchanged.
+    
+    Args:
+        source: Screenshot context or path to the image
+        debug_mode: Whether to save debug images
         
-        ui_contours = [cnt for cnt in contours if min_area < cv2.contourArea(cnt) < max_area]
+    Returns:
+        ScreenshotContext of the warped photo, or the source context
+    """
+    context = ScreenshotContext.from_source(source, rectify=False)
+    
+    try:
+        # Find the screen on a small copy of the detection plane
+        gray = context.detection.gray
+        scale = PERSPECTIVE_DETECTION_WIDTH / gray.shape[1]
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        quad = find_screen_quad(gray)
+        if quad is None:
+            return context
+        
+        # Homography from the screen corners at full resolution to the canonical frame
+        width, height = context.size
+        frame_width, frame_height = CANONICAL_FRAME_SIZE
+        corners = quad * np.array([width, height], dtype=np.float32)
+        target = np.array([
+            [0, 0],
+            [frame_width - 1, 0],
+            [frame_width - 1, frame_height - 1],
+            [0, frame_height - 1]
+        ], dtype=np.float32)
+        homography = cv2.getPerspectiveTransform(corners, target)
+        
+        warped = cv2.warpPerspective(context.bgr, homography, CANONICAL_FRAME_SIZE, flags=cv2.INTER_LINEAR)
+        rectified = ScreenshotContext(image=warped, debug_dir=context.debug_dir)
+        rectified.name = context.name
+        logger.debug(f"Corrected perspective of photo with screen corners {np.round(quad, 3).tolist()}")
         
         if debug_mode:
-            # Draw contours on original image for debugging
-            debug_img = img.copy()
-            cv2.drawContours(debug_img, ui_contours, -1, (0, 255, 0), 2)
-            cv2.imwrite(os.path.join(debug_dir, "detected_regions.jpg"), debug_img)
-        
-        # Group contours into UI regions based on proximity and alignment
-        ui_regions = {}
-        
-        # Simple approach: Use bounding boxes of contours as UI regions
-        for i, contour in enumerate(ui_contours):
-            x, y, w, h = cv2.boundingRect(contour)
-            
-            # Normalize coordinates
-            x1 = x / width
-            y1 = y / height
-            x2 = (x + w) / width
-            y2 = (y + h) / height
-            
-            # Add some padding
-            padding = 0.01
-            x1 = max(0, x1 - padding)
-            y1 = max(0, y1 - padding)
-            x2 = min(1, x2 + padding)
-            y2 = min(1, y2 + padding)
-            
-            ui_regions[f"region_{i}"] = (x1, y1, x2, y2)
-        
-        logger.debug(f"Detected {len(ui_regions)} UI regions")
-        
-        # If no regions detected, return empty dict
-        if not ui_regions:
-            logger.warning("No UI regions detected")
-            return {}
+            debug_dir = os.path.join(context.debug_base_dir, 'debug_perspective')
+            debug_img = context.detection.bgr.copy()
+            detection_height, detection_width = debug_img.shape[:2]
+            points = (quad * np.array([detection_width, detection_height])).astype(np.int32)
+            cv2.polylines(debug_img, [points], True, (0, 255, 0), 2)
+            get_debug_writer().write_image(os.path.join(debug_dir, "screen_quad.jpg"), debug_img)
+            get_debug_writer().write_image(os.path.join(debug_dir, "rectified.jpg"), warped)
         
-        return ui_regions
+        return rectified
         
     except Exception as e:
-        logger.error(f"Error detecting text blocks: {str(e)}")
-        return {}
+        logger.error(f"Error correcting perspective: {str(e)}")
+        return context
 
 def preprocess_gt7_screenshot(image_path):
     """
@@ -208,245 +359,38 @@ def crop_regions(image_path: str, regions: Dict[str, Tuple[float, float, float,
         logger.error(f"Error cropping regions: {str(e)}")
         return {}
 
-def detect_graph_area(image_path: str, debug_mode: bool = False) -> Optional[Tuple[float, float, float, float]]:
+def load_screenshot(uploaded_file, output_dir=None, debug_mode=False) -> ScreenshotContext:
     """
-    Detect graph area in the image (for power curves, etc.)
+    Load an uploaded screenshot for processing without going through the filesystem
     
-    Args:
-        image_path: Path to the image
-        debug_mode: Whether to save debug images
-        
-    Returns:
-        Normalized coordinates (x1, y1, x2, y2) of the graph area or None if not found
-    """
-    try:
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ImageProcessingError(f"Could not load image at {image_path}")
-        
-        height, width = img.shape[:2]
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        # Apply Canny edge detection
-        edges = cv2.Canny(blurred, 50, 150)
-        
-        # Find contours
-        contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filter contours to find rectangular shapes that could be graphs
-        graph_candidates = []
-        
-        for cnt in contours:
-            # Approximate contour to simplify shape
-            epsilon = 0.02 * cv2.arcLength(cnt, True)
-            approx = cv2.approxPolyDP(cnt, epsilon, True)
-            
-            # Check if approximated contour has 4 points (rectangular)
-            if len(approx) == 4:
-                # Check area ratio
-                area = cv2.contourArea(cnt)
-                x, y, w, h = cv2.boundingRect(cnt)
-                rect_area = w * h
-                
-                area_ratio = area / rect_area if rect_area > 0 else 0
-                
-                # Graphs typically have a specific aspect ratio and area
-                min_graph_area = width * height * 0.01  # At least 1% of image
-                max_graph_area = width * height * 0.25  # At most 25% of image
-                
-                if (min_graph_area < area < max_graph_area and 
-                    area_ratio > 0.7 and  # Fairly rectangular
-                    0.5 < w/h < 2.0):     # Reasonable aspect ratio
-                    
-                    graph_candidates.append((x, y, w, h, area))
-        
-        if not graph_candidates:
-            logger.warning("No graph area detected")
-            return None
-        
-        # Sort candidates by area (descending)
-        graph_candidates.sort(key=lambda x: x[4], reverse=True)
-        
-        # Take the largest candidate
-        x, y, w, h, _ = graph_candidates[0]
-        
-        if debug_mode:
-            debug_dir = os.path.join(os.path.dirname(image_path), 'debug_graph_detection')
-            os.makedirs(debug_dir, exist_ok=True)
-            
-            # Draw detected graph area
-            debug_img = img.copy()
-            cv2.rectangle(debug_img, (x, y), (x+w, y+h), (0, 255, 0), 2)
-            cv2.imwrite(os.path.join(debug_dir, "detected_graph.jpg"), debug_img)
-        
-        # Normalize coordinates
-        x1 = x / width
-        y1 = y / height
-        x2 = (x + w) / width
-        y2 = (y + h) / height
-        
-        return (x1, y1, x2, y2)
-        
-    except Exception as e:
-        logger.error(f"Error detecting graph area: {str(e)}")
-        return None
-
-def process_screenshot(uploaded_file, output_dir=None, debug_mode=False, invert_colors=False):
-    """
-    Process uploaded screenshot and save to file
+    The upload is decoded in memory; the original is only written to disk
+    when debug output is requested.
     
     Args:
-        uploaded_file: Django UploadedFile object
-        output_dir: Directory to save processed image (if None, uses temp file)
+        uploaded_file: Django UploadedFile object, or a ScreenshotContext already created for it
+        output_dir: Directory for debug output
         debug_mode: Whether to save debug information
-        invert_colors: Whether to invert image colors for better OCR
         
     Returns:
-        Path to the processed image
+        ScreenshotContext for the upload
     """
     try:
-        # Create a temporary file to save the uploaded image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp:
-            for chunk in uploaded_file.chunks():
-                temp.write(chunk)
-            temp_path = temp.name
-        
-        # Enhance image
-        enhanced_path = temp_path
-        
-        # If we need to invert colors for better OCR (light text on dark background)
-        if invert_colors:
-            # Load the image
-            img = cv2.imread(temp_path)
-            if img is None:
-                raise ImageProcessingError(f"Could not load image at {temp_path}")
-            
-            # Invert colors
-            img = cv2.bitwise_not(img)
-            
-            # Save to a new temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as inverted_temp:
-                inverted_path = inverted_temp.name
-                cv2.imwrite(inverted_path, img)
-            
-            # Use this as our enhanced path
-            enhanced_path = inverted_path
-        
-        # If output directory is provided, save the processed image there
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, f"processed_{os.path.basename(temp_path)}")
-            
-            # Copy the enhanced image to the output path
-            with open(enhanced_path, 'rb') as src, open(output_path, 'wb') as dst:
-                dst.write(src.read())
-            
-            # Clean up temporary files
-            if enhanced_path != temp_path:  # Only delete enhanced path if it's different from temp_path
-                os.unlink(enhanced_path)
-            os.unlink(temp_path)
-            
-            return output_path
+        if isinstance(uploaded_file, ScreenshotContext):
+            context = uploaded_file
+            if debug_mode:
+                context.debug_dir = output_dir
         else:
-            # If no output directory, just return the enhanced path
-            # Delete the original temp file if different
-            if enhanced_path != temp_path:
-                os.unlink(temp_path)
-            
-            return enhanced_path
-            
-    except Exception as e:
-        logger.error(f"Error processing screenshot: {str(e)}")
-        raise ImageProcessingError(f"Failed to process screenshot: {str(e)}")
-
-def detect_text_blocks(image_path: str, debug_mode: bool = False) -> Dict[str, Tuple[float, float, float, float]]:
-    """
-    Detect text blocks in the image
-    
-    Args:
-        image_path: Path to the image
-        debug_mode: Whether to save debug images
-        
-    Returns:
-        Dictionary mapping block IDs to normalized coordinates (x1, y1, x2, y2)
-    """
-    try:
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ImageProcessingError(f"Could not load image at {image_path}")
-        
-        height, width = img.shape[:2]
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply adaptive thresholding
-        binary = cv2.adaptiveThreshold(
-            gray, 
-            255, 
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY_INV, 
-            11, 
-            2
-        )
-        
-        # Apply dilation to connect nearby text
-        kernel = np.ones((5, 5), np.uint8)
-        dilated = cv2.dilate(binary, kernel, iterations=3)
-        
-        if debug_mode:
-            debug_dir = os.path.join(os.path.dirname(image_path), 'debug_text_detection')
-            os.makedirs(debug_dir, exist_ok=True)
-            cv2.imwrite(os.path.join(debug_dir, "binary.jpg"), binary)
-            cv2.imwrite(os.path.join(debug_dir, "dilated.jpg"), dilated)
+            context = ScreenshotContext.from_upload(uploaded_file, debug_dir=output_dir if debug_mode else None)
         
-        # Find contours
-        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filter contours by size to find potential text blocks
-        min_area = width * height * 0.0005  # Minimum area threshold (0.05% of image)
-        max_area = width * height * 0.05    # Maximum area threshold (5% of image)
-        
-        text_contours = [cnt for cnt in contours if min_area < cv2.contourArea(cnt) < max_area]
-        
-        if debug_mode:
-            # Draw contours on original image for debugging
-            debug_img = img.copy()
-            cv2.drawContours(debug_img, text_contours, -1, (0, 255, 0), 2)
-            cv2.imwrite(os.path.join(debug_dir, "detected_text_blocks.jpg"), debug_img)
-        
-        # Extract bounding boxes for text blocks
-        text_blocks = {}
-        
-        for i, contour in enumerate(text_contours):
-            x, y, w, h = cv2.boundingRect(contour)
-            
-            # Normalize coordinates
-            x1 = x / width
-            y1 = y / height
-            x2 = (x + w) / width
-            y2 = (y + h) / height
-            
-            # Add some padding
-            padding = 0.005
-            x1 = max(0, x1 - padding)
-            y1 = max(0, y1 - padding)
-            x2 = min(1, x2 + padding)
-            y2 = min(1, y2 + padding)
-            
-            text_blocks[f"block_{i}"] = (x1, y1, x2, y2)
+        # Decode now so a corrupt upload fails here rather than halfway through OCR
+        context.bgr
         
-        logger.debug(f"Detected {len(text_blocks)} text blocks")
+        if debug_mode and output_dir:
+            name = os.path.basename(getattr(uploaded_file, 'name', None) or 'screenshot.jpg')
+            context.save_original(os.path.join(output_dir, f"processed_{name}"))
         
-        return text_blocks
+        return context
         
     except Exception as e:
-        logger.error(f"Error detecting text blocks: {str(e)}")
-        return {}
\ No newline at end of file
+        logger.error(f"Error loading screenshot: {str(e)}")
+        raise ImageProcessingError(f"Failed to load screenshot: {str(e)}")
@@ -0,0 +1,522 @@
+# services/layout_registry.py
+import os
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+from services.image_processing import detect_content_area
+from services.screenshot_context import ScreenshotContext
+
+logger = logging.getLogger(__name__)
+
+# GT7 renders its UI at 16:9; the OCR region tables are percentages of that frame
+CANONICAL_ASPECT_RATIO = 16 / 9
+
+# Width of the canonical frame anchor templates are cropped from
+ANCHOR_FRAME_WIDTH = 1920
+
+# Directory of anchor templates - anchors.json maps each template file to its canonical position
+DEFAULT_ANCHOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layout_anchors')
+
+# Number of pyramid levels below the detection plane the coarse search runs at
+ANCHOR_PYRAMID_LEVELS = 2
+
+# HUD scales tried in the coarse search, relative to the calibrated layout
+ANCHOR_SCALES = (0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15)
+
+# How far from its expected position an anchor is searched for, as a fraction of the frame
+ANCHOR_SEARCH_MARGIN = 0.08
+
+# Minimum normalised correlation for an anchor match
+ANCHOR_MIN_SCORE = 0.7
+
+# Anchors must be spread at least this far apart (fraction of the frame) to fit a scale
+ANCHOR_MIN_SPREAD = 0.2
+
+# Anchors further than this from the fitted layout (fraction of the frame) are dropped as
+# mismatches and the layout refitted, as long as this many anchors remain
+ANCHOR_MAX_RESIDUAL = 0.004
+ANCHOR_MIN_INLIERS = 3
+
+
+class CalibratedLayout:
+    """Mapping from the canonical 16:9 region tables to a specific screenshot layout"""
+
+    def __init__(self, offset_x: float = 0.0, offset_y: float = 0.0,
+                 scale_x: float = 1.0, scale_y: float = 1.0, source: str = 'default'):
+        """Initialize the layout
+
+        Args:
+            offset_x: Left edge of the UI frame as a fraction of image width
+            offset_y: Top edge of the UI frame as a fraction of image height
+            scale_x: Width of the UI frame as a fraction of image width
+            scale_y: Height of the UI frame as a fraction of image height
+            source: How the layout was calibrated, for debugging
+        """
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        self.source = source
+
+    @property
+    def is_identity(self) -> bool:
+        """Return True if the layout leaves regions unchanged"""
+        return (self.offset_x == 0.0 and self.offset_y == 0.0 and
+                self.scale_x == 1.0 and self.scale_y == 1.0)
+
+    def transform_region(self, region: Tuple[float, float, float, float]) -> Tuple[float, float, float, float]:
+        """Map a canonical region (x1, y1, x2, y2) into this layout"""
+        x1, y1, x2, y2 = region
+        return (
+            self.offset_x + x1 * self.scale_x,
+            self.offset_y + y1 * self.scale_y,
+            self.offset_x + x2 * self.scale_x,
+            self.offset_y + y2 * self.scale_y
+        )
+
+    def transform_regions(self, regions: Dict[str, tuple]) -> Dict[str, tuple]:
+        """Map a dictionary of canonical regions into this layout"""
+        if self.is_identity:
+            return regions
+        return {name: self.transform_region(region) for name, region in regions.items()}
+
+    def to_dict(self) -> Dict[str, float]:
+        """Return the layout as a JSON-serializable dictionary"""
+        return {
+            'offset_x': self.offset_x,
+            'offset_y': self.offset_y,
+            'scale_x': self.scale_x,
+            'scale_y': self.scale_y,
+            'source': self.source,
+        }
+
+
+def calibrate_layout(img: np.ndarray) -> CalibratedLayout:
+    """Locate the UI frame in a screenshot
+
+    The anchors are the edges of the active picture: black bars from
+    capture cards or mismatched output resolutions are excluded, and the
+    16:9 UI frame is fitted centred inside what remains.
+
+    Args:
+        img: BGR image array
+
+    Returns:
+        CalibratedLayout for the screenshot's resolution
+    """
+    height, width = img.shape[:2]
+    content = detect_content_area(img)
+    if content is None:
+        return CalibratedLayout(source='blank')
+
+    x1, y1, x2, y2 = content
+
+    # Letterbox and pillarbox bars are symmetric; a dark edge on one side is just dark UI
+    if abs(x1 - (1 - x2)) > 0.01:
+        x1, x2 = 0.0, 1.0
+    if abs(y1 - (1 - y2)) > 0.01:
+        y1, y2 = 0.0, 1.0
+
+    content_width = (x2 - x1) * width
+    content_height = (y2 - y1) * height
+
+    # Fit the 16:9 UI frame inside the picture area
+    if content_width / content_height > CANONICAL_ASPECT_RATIO:
+        frame_width = content_height * CANONICAL_ASPECT_RATIO
+        x1 += (content_width - frame_width) / 2 / width
+        x2 = x1 + frame_width / width
+    else:
+        frame_height = content_width / CANONICAL_ASPECT_RATIO
+        y1 += (content_height - frame_height) / 2 / height
+        y2 = y1 + frame_height / height
+
+    layout = CalibratedLayout(
+        offset_x=round(x1, 4),
+        offset_y=round(y1, 4),
+        scale_x=round(x2 - x1, 4),
+        scale_y=round(y2 - y1, 4),
+        source='content_area'
+    )
+
+    # Treat near-identity calibrations as identity so region tables stay exact
+    if (abs(layout.offset_x) < 0.002 and abs(layout.offset_y) < 0.002 and
+            abs(layout.scale_x - 1) < 0.004 and abs(layout.scale_y - 1) < 0.004):
+        return CalibratedLayout(source='content_area')
+
+    return layout
+
+
+class LayoutRegistry:
+    """Cache of calibrated layouts keyed by image size and aspect ratio
+
+    The first screenshot seen at a resolution pays for calibration; later
+    screenshots at the same resolution reuse the cached layout.
+    """
+
+    def __init__(self):
+        self._layouts: Dict[Tuple[int, int, float], CalibratedLayout] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(width: int, height: int) -> Tuple[int, int, float]:
+        """Registry key for an image size"""
+        return (width, height, round(width / height, 3))
+
+    def get_layout(self, width: int, height: int,
+                   load_image: Optional[Callable[[], Optional[np.ndarray]]] = None) -> CalibratedLayout:
+        """Get the layout for an image size, calibrating on first use
+
+        Args:
+            width: Image width in pixels
+            height: Image height in pixels
+            load_image: Callable returning the BGR image, only called on a cache miss
+
+        Returns:
+            CalibratedLayout for the resolution
+        """
+        key = self.key_for(width, height)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            return layout
+
+        if load_image is None:
+            return CalibratedLayout()
+
+        try:
+            img = load_image()
+            if img is None:
+                return CalibratedLayout()
+            layout = calibrate_layout(img)
+            if layout.source == 'blank':
+                return layout
+        except Exception as e:
+            # Don't cache failures so the next screenshot at this resolution retries
+            logger.error(f"Error calibrating layout for {width}x{height}: {str(e)}")
+            return CalibratedLayout()
+
+        with self._lock:
+            layout = self._layouts.setdefault(key, layout)
+
+        logger.info(f"Calibrated layout for {width}x{height}: {layout.to_dict()}")
+        return layout
+
+    def register(self, width: int, height: int, layout: CalibratedLayout) -> None:
+        """Store a layout for an image size, replacing any cached calibration"""
+        with self._lock:
+            self._layouts[self.key_for(width, height)] = layout
+
+    def clear(self) -> None:
+        """Forget all cached layouts"""
+        with self._lock:
+            self._layouts.clear()
+
+
+class AnchorAligner:
+    """Aligns the region tables to a screenshot using small UI anchor templates
+
+    Anchors (the vehicle panel's section headers and the settings sheet
+    labels, which every tuning screen shows) are cropped from a canonical
+    1920-wide frame. Each is found with coarse-to-fine template matching:
+    a search over a few HUD scales on a small pyramid level near its
+    expected position, then a refinement in a few-pixel window on the
+    detection plane. The matched positions give the offset and scale of
+    the real layout, correcting HUD scaling the content area can't see.
+    """
+
+    def __init__(self):
+        self._anchors: List[Tuple[str, np.ndarray, Tuple[float, float]]] = []
+        self._resized: Dict[Tuple[int, Tuple[int, int]], np.ndarray] = {}
+
+    def add_anchor(self, name: str, template: np.ndarray, position: Tuple[float, float]) -> None:
+        """Add an anchor template
+
+        Args:
+            name: Anchor name, for debugging
+            template: Grayscale or BGR crop from a 1920-wide canonical frame
+            position: Canonical (x, y) of the template's top-left corner as fractions of the frame
+        """
+        if template.ndim == 3:
+            template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        if template.std() == 0:
+            raise ValueError(f"Anchor template {name} is blank")
+        self._anchors.append((name, template, (float(position[0]), float(position[1]))))
+
+    def load_anchors(self, directory: str) -> int:
+        """Load anchor templates listed in a directory's anchors.json
+
+        anchors.json maps anchor names to ``{"file": "<template>.png", "position": [x, y]}``.
+
+        Args:
+            directory: Directory containing anchors.json and the templates
+
+        Returns:
+            Number of anchors loaded
+        """
+        manifest_path = os.path.join(directory or '', 'anchors.json')
+        if not os.path.isfile(manifest_path):
+            return 0
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        loaded = 0
+        for name, entry in manifest.items():
+            template = cv2.imread(os.path.join(directory, entry['file']), cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                logger.warning(f"Skipping anchor {name}: could not read {entry['file']}")
+                continue
+            try:
+                self.add_anchor(name, template, tuple(entry['position']))
+                loaded += 1
+            except ValueError as e:
+                logger.warning(str(e))
+
+        logger.debug(f"Loaded {loaded} layout anchors from {directory}")
+        return loaded
+
+    def align(self, context: ScreenshotContext, base: CalibratedLayout) -> CalibratedLayout:
+        """Refine a layout by locating the anchors in a screenshot
+
+        Args:
+            context: Screenshot context
+            base: Layout from the content area calibration
+
+        Returns:
+            Anchor-aligned layout, or base if too few anchors were found
+        """
+        if not self._anchors:
+            return base
+
+        try:
+            gray = context.detection.gray
+            height, width = gray.shape[:2]
+
+            # Coarse pyramid level for the scale search
+            coarse = gray
+            for _ in range(ANCHOR_PYRAMID_LEVELS):
+                coarse = cv2.pyrDown(coarse)
+            step = 2 ** ANCHOR_PYRAMID_LEVELS
+
+            # Template pixels per detection pixel under the base layout
+            base_scale = base.scale_x * width / ANCHOR_FRAME_WIDTH
+
+            matches = []
+            for name, template, position in self._anchors:
+                expected = (base.offset_x + position[0] * base.scale_x, base.offset_y + position[1] * base.scale_y)
+                match = self._match_anchor(gray, coarse, step, template, expected, base_scale)
+                if match is not None:
+                    logger.debug(f"Anchor {name} matched at {match[0]} (scale {match[1]:.3f}, score {match[2]:.2f})")
+                    matches.append((position, match[0], match[1], match[2]))
+
+            if not matches:
+                return base
+
+            layout = self._fit_layout(matches, base)
+            if layout is None:
+                return base
+
+            logger.debug(f"Anchor-aligned layout from {len(matches)} anchors: {layout.to_dict()}")
+            return layout
+
+        except Exception as e:
+            logger.error(f"Error aligning layout to anchors: {str(e)}")
+            return base
+
+    def _resize_template(self, template: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+        """Resize a template, caching the result (sizes repeat for every screenshot at a resolution)"""
+        key = (id(template), size)
+        resized = self._resized.get(key)
+        if resized is None:
+            resized = cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+            self._resized[key] = resized
+        return resized
+
+    def _match_anchor(self, gray: np.ndarray, coarse: np.ndarray, step: int, template: np.ndarray,
+                      expected: Tuple[float, float], base_scale: float) -> Optional[Tuple[Tuple[float, float], float, float]]:
+        """Find one anchor coarse-to-fine
+
+        Returns:
+            Tuple of (normalized top-left position, scale relative to the base layout, score) or None
+        """
+        height, width = gray.shape[:2]
+        coarse_height, coarse_width = coarse.shape[:2]
+        template_height, template_width = template.shape[:2]
+
+        # Search window around the expected position on the coarse level
+        max_scale = base_scale * max(ANCHOR_SCALES) / step
+        left = max(0, int((expected[0] - ANCHOR_SEARCH_MARGIN) * coarse_width))
+        top = max(0, int((expected[1] - ANCHOR_SEARCH_MARGIN) * coarse_height))
+        right = min(coarse_width, int((expected[0] + ANCHOR_SEARCH_MARGIN) * coarse_width + template_width * max_scale) + 1)
+        bottom = min(coarse_height, int((expected[1] + ANCHOR_SEARCH_MARGIN) * coarse_height + template_height * max_scale) + 1)
+        window = coarse[top:bottom, left:right]
+
+        def match_scale(index: int) -> Optional[tuple]:
+            scale = ANCHOR_SCALES[index]
+            size = (int(round(template_width * base_scale * scale / step)), int(round(template_height * base_scale * scale / step)))
+            if min(size) < 4 or size[0] > window.shape[1] or size[1] > window.shape[0]:
+                return None
+            scores = cv2.matchTemplate(window, self._resize_template(template, size), cv2.TM_CCOEFF_NORMED)
+            _, score, _, location = cv2.minMaxLoc(scores)
+            return (score, scale, (left + location[0]) * step, (top + location[1]) * step)
+
+        # Hill-climb over the HUD scales from the base layout's scale, staying put on ties
+        # (short templates round to the same size at neighbouring scales)
+        index = ANCHOR_SCALES.index(1.0)
+        results = {index: match_scale(index)}
+        while True:
+            for neighbour in (index - 1, index + 1):
+                if 0 <= neighbour < len(ANCHOR_SCALES) and neighbour not in results:
+                    results[neighbour] = match_scale(neighbour)
+            candidates = [i for i in (index, index - 1, index + 1) if results.get(i) is not None]
+            if not candidates:
+                return None
+            best_index = max(candidates, key=lambda i: results[i][0])
+            if best_index == index:
+                break
+            index = best_index
+
+        if results[index][0] < ANCHOR_MIN_SCORE * 0.8:
+            return None
+
+        # Refine within a few pixels at the detection level. The coarse level can't tell
+        # neighbouring scales apart reliably, so they are refined too and the best kept
+        best = None
+        for candidate in (index - 1, index, index + 1):
+            if results.get(candidate) is None:
+                continue
+            _, scale, x, y = results[candidate]
+            size = (int(round(template_width * base_scale * scale)), int(round(template_height * base_scale * scale)))
+            margin = step * 2
+            left, top = max(0, x - margin), max(0, y - margin)
+            window = gray[top:min(height, y + size[1] + margin), left:min(width, x + size[0] + margin)]
+            if size[0] > window.shape[1] or size[1] > window.shape[0]:
+                continue
+            scores = cv2.matchTemplate(window, self._resize_template(template, size), cv2.TM_CCOEFF_NORMED)
+            _, score, _, location = cv2.minMaxLoc(scores)
+            if best is None or score > best[2]:
+                best = (((left + location[0]) / width, (top + location[1]) / height), scale, score)
+
+        if best is None or best[2] < ANCHOR_MIN_SCORE:
+            return None
+        return best
+
+    @staticmethod
+    def _fit_axes(canonical: np.ndarray, found: np.ndarray, hud_scales: np.ndarray,
+                  base: CalibratedLayout) -> List[Tuple[float, float]]:
+        """Least-squares (offset, scale) per axis from matched anchor positions"""
+        hud_scale = float(np.median(hud_scales))
+        fitted = []
+        for axis, base_scale in ((0, base.scale_x), (1, base.scale_y)):
+            # Widely spread anchors give the scale directly; otherwise use the matched template scale
+            if np.ptp(canonical[:, axis]) >= ANCHOR_MIN_SPREAD:
+                scale, offset = np.polyfit(canonical[:, axis], found[:, axis], 1)
+            else:
+                scale = base_scale * hud_scale
+                offset = float(np.mean(found[:, axis] - scale * canonical[:, axis]))
+            fitted.append((offset, scale))
+        return fitted
+
+    @classmethod
+    def _fit_layout(cls, matches: List[tuple], base: CalibratedLayout) -> Optional[CalibratedLayout]:
+        """Fit offset and scale from matched anchors (canonical position, image position, scale, score)
+
+        An anchor matched in the wrong place skews a least-squares fit, so each
+        anchor is checked against the fit of the others; the one furthest off
+        (the weakest match, if several are about as far) is dropped until the
+        rest agree to within ANCHOR_MAX_RESIDUAL.
+        """
+        canonical = np.array([match[0] for match in matches], dtype=np.float64)
+        found = np.array([match[1] for match in matches], dtype=np.float64)
+        hud_scales = np.array([match[2] for match in matches], dtype=np.float64)
+        keep = np.ones(len(matches), dtype=bool)
+
+        while keep.sum() > ANCHOR_MIN_INLIERS:
+            residuals = {}
+            for index in np.flatnonzero(keep):
+                others = keep.copy()
+                others[index] = False
+                fitted = cls._fit_axes(canonical[others], found[others], hud_scales[others], base)
+                predicted = [offset + scale * canonical[index, axis] for axis, (offset, scale) in enumerate(fitted)]
+                residuals[index] = float(np.abs(found[index] - predicted).max())
+
+            worst = max(residuals.values())
+            if worst <= ANCHOR_MAX_RESIDUAL:
+                break
+
+            # Anchors sharing a row or column can't be told apart by position alone
+            suspects = [index for index, residual in residuals.items() if residual > worst - ANCHOR_MAX_RESIDUAL]
+            dropped = min(suspects, key=lambda index: matches[index][3])
+            logger.debug(f"Dropping anchor match at {tuple(found[dropped])} (score {matches[dropped][3]:.2f}), "
+                         f"{residuals[dropped]:.4f} off the other anchors' fit")
+            keep[dropped] = False
+
+        fitted = cls._fit_axes(canonical[keep], found[keep], hud_scales[keep], base)
+        (offset_x, scale_x), (offset_y, scale_y) = fitted
+
+        # Reject fits that disagree wildly with the content area
+        if not (0.5 < scale_x / base.scale_x < 1.5 and 0.5 < scale_y / base.scale_y < 1.5):
+            logger.warning(f"Ignoring implausible anchor fit: scale {scale_x:.3f} x {scale_y:.3f}")
+            return None
+
+        layout = CalibratedLayout(
+            offset_x=round(float(offset_x), 4),
+            offset_y=round(float(offset_y), 4),
+            scale_x=round(float(scale_x), 4),
+            scale_y=round(float(scale_y), 4),
+            source='anchors'
+        )
+
+        # Treat near-identity alignments as identity so region tables stay exact
+        if (abs(layout.offset_x) < 0.002 and abs(layout.offset_y) < 0.002 and
+                abs(layout.scale_x - 1) < 0.004 and abs(layout.scale_y - 1) < 0.004):
+            return CalibratedLayout(source='anchors')
+
+        return layout
+
+
+_registry = LayoutRegistry()
+
+_aligner = None
+_aligner_lock = threading.Lock()
+
+
+def get_layout_registry() -> LayoutRegistry:
+    """Get the process-wide layout registry"""
+    return _registry
+
+
+def get_anchor_aligner() -> AnchorAligner:
+    """Get the shared anchor aligner, loading the anchor templates on first use"""
+    global _aligner
+    if _aligner is None:
+        with _aligner_lock:
+            if _aligner is None:
+                aligner = AnchorAligner()
+                aligner.load_anchors(DEFAULT_ANCHOR_DIR)
+                _aligner = aligner
+    return _aligner
+
+
+def get_screenshot_layout(context: ScreenshotContext) -> CalibratedLayout:
+    """Get the layout for a screenshot
+
+    The per-resolution calibration is refined with the anchor templates;
+    the result is memoized on the context so every processor shares it.
+
+    Args:
+        context: Screenshot context
+
+    Returns:
+        CalibratedLayout for the screenshot
+    """
+    def compute() -> CalibratedLayout:
+        width, height = context.size
+        base = get_layout_registry().get_layout(width, height, lambda: context.detection.bgr)
+        return get_anchor_aligner().align(context, base)
+
+    return context.memoize('layout', compute)
@@ -1,19 +1,35 @@
 # services/ocr_service.py
 import pytesseract
-import io
 import re
 import os
 import logging
-import tempfile
-import json
-from typing import Dict, Any, Optional, Union, List
+from typing import Dict, Any, Optional, Union, List, Tuple
 from PIL import Image
 import numpy as np
 import cv2
 from datetime import datetime
 
+from services.digit_recognizer import get_glyph_classifier, binarize_text
+from services.layout_registry import CalibratedLayout, get_screenshot_layout
+from services.engine_data import POWER_GRAPH_REGION, process_engine_data
+from services.screenshot_context import ScreenshotContext
+from services.tire_badge import get_tire_badge_classifier
+from services.debug_writer import get_debug_writer
+
 logger = logging.getLogger(__name__)
 
+# Glyph reads below this confidence fall back to Tesseract
+GLYPH_MIN_CONFIDENCE = 0.75
+
+# Tire badge reads below this confidence fall back to Tesseract
+TIRE_BADGE_MIN_CONFIDENCE = 0.6
+
+# Fields read with less confidence than this get a second, more expensive pass
+REREAD_CONFIDENCE = 0.6
+
+# Upscaling applied to a region before it is re-read
+REREAD_UPSCALE = 3
+
 class OCRError(Exception):
     """Exception raised for errors in OCR processing."""
     pass
@@ -21,6 +37,12 @@ class OCRError(Exception):
 class OCRProcessor:
     """Base class for OCR processing of game screenshots using Tesseract"""
     
+    # Short numeric fields read with the glyph classifier before trying Tesseract
+    glyph_params = ()
+    
+    # Image plane the regions are cropped from for Tesseract
+    image_plane = 'bgr'
+    
     def __init__(self, debug_mode: bool = False):
         """Initialize the OCR processor
         
@@ -29,37 +51,49 @@ class OCRProcessor:
         """
         self.debug_mode = debug_mode
         self.debug_info = {}
+        self.confidences: Dict[str, float] = {}
+        self.layout = CalibratedLayout()
         
-    def process_image(self, image_path: str, regions: Dict[str, tuple]) -> Dict[str, Any]:
+    def process_image(self, source: Union[str, ScreenshotContext], regions: Dict[str, tuple]) -> Dict[str, Any]:
         """Process an image and extract text from defined regions
         
         Args:
-            image_path: Path to the image file
+            source: Screenshot context or path to the image file
             regions: Dictionary mapping parameter names to regions (x1, y1, x2, y2) as percentages
             
         Returns:
             Dictionary of extracted values
         """
         try:
+            context = ScreenshotContext.from_source(source)
+            
             # Get image dimensions
-            with Image.open(image_path) as img:
-                width, height = img.size
+            width, height = context.size
             
             # Initialize results
             results = {}
             self.debug_info = {}
             
-            # Create debug directory if in debug mode
+            # Confidences left over from an earlier image would stop these regions being re-read
+            for param_name in regions:
+                self.confidences.pop(param_name, None)
+            
+            # Map the canonical regions onto this screenshot's layout
+            self._calibrate_layout(context)
+            regions = self.layout.transform_regions(regions)
+            if self.debug_mode:
+                self.debug_info['layout'] = self.layout.to_dict()
+            
+            # Debug artifacts are queued on the background writer
             debug_dir = None
             if self.debug_mode:
-                debug_dir = os.path.join(os.path.dirname(image_path), 'debug_regions')
-                os.makedirs(debug_dir, exist_ok=True)
+                debug_dir = os.path.join(context.debug_base_dir, 'debug_regions')
             
             # Process the whole image first for debugging
             if self.debug_mode:
                 try:
                     # Use Tesseract OCR on the full image for debugging
-                    full_text = pytesseract.image_to_string(image_path)
+                    full_text = pytesseract.image_to_string(self._to_pil(context.get_plane(self.image_plane)))
                     self.debug_info['full_text'] = full_text
                     logger.debug("Full text detected in image:")
                     logger.debug("-" * 50)
@@ -72,74 +106,33 @@ class OCRProcessor:
             # Process each region
             for param_name, region_pct in regions.items():
                 try:
-                    # Convert percentage to actual pixel coordinates
-                    left = int(region_pct[0] * width)
-                    top = int(region_pct[1] * height)
-                    right = int(region_pct[2] * width)
-                    bottom = int(region_pct[3] * height)
-                    
-                    # Create a cropped image
-                    with Image.open(image_path) as img:
-                        cropped = img.crop((left, top, right, bottom))
-                        
-                        # Save cropped image for debugging
-                        if self.debug_mode and debug_dir:
-                            debug_path = os.path.join(debug_dir, f"{param_name}_region.jpg")
-                            cropped.save(debug_path)
-                        
-                        # Save to temporary file for Tesseract
-                        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp:
-                            temp_path = temp.name
-                            cropped.save(temp_path)
-                    
-                    # Process with Tesseract OCR
-                    # You can customize the config for better recognition based on content type
-                    try:
-                        if param_name in ['rpm', 'gear_ratio', 'final_drive', 'speed']:
-                            # Use a completely different configuration approach - no char whitelist
-                            # Just specify the page segmentation mode
-                            config = '--oem 3 --psm 7'  # PSM 7 is for single line of text
-                        else:
-                            # Default configuration for other text
-                            config = '--oem 3 --psm 6'
-    
-                        region_text = pytesseract.image_to_string(temp_path, config=config).strip()
-                    except Exception as tesseract_error:
-                        logger.warning(f"Tesseract error for {param_name}: {str(tesseract_error)}")
-                        region_text = ""
-                        
-                    # Delete the temporary file
-                    os.unlink(temp_path)
-                    
-                    # Extract text from the region
-                    if region_text:
-                        if self.debug_mode:
-                            self.debug_info[param_name] = region_text
-                        logger.debug(f"{param_name}: Found text: '{region_text}'")
-                        
-                        # Process the text based on parameter name (subclasses will implement this)
-                        processed_value = self._process_text(param_name, region_text)
-                        if processed_value is not None:
-                            results[param_name] = processed_value
-                    else:
-                        if self.debug_mode:
-                            self.debug_info[param_name] = "No text detected"
-                        logger.debug(f"{param_name}: No text detected in this region")
-                
+                    region_text, confidence = self._read_region(context, param_name, region_pct, debug_dir)
+                    self._store_reading(results, param_name, region_text, confidence)
                 except Exception as e:
                     logger.error(f"Error processing region {param_name}: {str(e)}")
                     if self.debug_mode:
                         self.debug_info[param_name] = f"Error: {str(e)}"
             
+            # Re-read only the fields that came back empty or with low confidence
+            for param_name, region_pct in regions.items():
+                if param_name in results and self.confidences.get(param_name, 0.0) >= REREAD_CONFIDENCE:
+                    continue
+                try:
+                    region_text, confidence = self._reread_region(context, param_name, region_pct)
+                    if region_text and confidence > self.confidences.get(param_name, 0.0):
+                        logger.debug(f"{param_name}: Re-read '{region_text}' ({confidence:.2f})")
+                        self._store_reading(results, param_name, region_text, confidence)
+                except Exception as e:
+                    logger.error(f"Error re-reading region {param_name}: {str(e)}")
+            
             # Save debug info if in debug mode
             if self.debug_mode:
-                debug_file_path = os.path.join(os.path.dirname(image_path), f'ocr_debug_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-                with open(debug_file_path, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'debug_info': self.debug_info,
-                        'results': results
-                    }, f, indent=2)
-                logger.info(f"OCR debug information saved to {debug_file_path}")
+                debug_file_path = os.path.join(context.debug_base_dir, f'ocr_debug_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+                get_debug_writer().write_json(debug_file_path, {
+                    'debug_info': dict(self.debug_info),
+                    'results': dict(results)
+                })
+                logger.info(f"OCR debug information queued for {debug_file_path}")
             
             return results
         
@@ -147,6 +140,180 @@ class OCRProcessor:
             logger.error(f"Error in OCR processing: {str(e)}")
             raise OCRError(f"Failed to process image: {str(e)}")
     
+    def _read_region(self, context: ScreenshotContext, param_name: str, region_pct: tuple,
+                     debug_dir: Optional[str] = None) -> Tuple[str, float]:
+        """First pass over a region: glyph classifier for short numbers, then Tesseract
+        
+        Args:
+            context: Screenshot context
+            param_name: Name of the parameter
+            region_pct: Region in normalized coordinates
+            debug_dir: Directory for the debug crop, or None
+            
+        Returns:
+            Tuple of (text, confidence in the range 0-1)
+        """
+        # Create a cropped image from the decoded screenshot
+        cropped = self._to_pil(context.crop(region_pct, self.image_plane))
+        
+        # Save cropped image for debugging
+        if self.debug_mode and debug_dir:
+            debug_path = os.path.join(debug_dir, f"{param_name}_region.jpg")
+            get_debug_writer().write_image(debug_path, cropped)
+        
+        # Read short numbers with the glyph classifier, keeping Tesseract for low confidence reads
+        if param_name in self.glyph_params:
+            glyph_text, glyph_confidence = self._read_glyphs(context.crop(region_pct, 'gray'))
+            if self.debug_mode:
+                self.debug_info[f"{param_name}_glyph"] = {
+                    'text': glyph_text,
+                    'confidence': round(glyph_confidence, 3)
+                }
+            if glyph_text and glyph_confidence >= GLYPH_MIN_CONFIDENCE:
+                logger.debug(f"{param_name}: Glyph classifier read '{glyph_text}' ({glyph_confidence:.2f})")
+                return glyph_text, glyph_confidence
+        
+        if param_name in ['rpm', 'gear_ratio', 'final_drive', 'speed']:
+            # Use a completely different configuration approach - no char whitelist
+            # Just specify the page segmentation mode
+            config = '--oem 3 --psm 7'  # PSM 7 is for single line of text
+        else:
+            # Default configuration for other text
+            config = '--oem 3 --psm 6'
+        
+        return self._read_tesseract(cropped, config, param_name)
+    
+    def _read_glyphs(self, gray: np.ndarray) -> Tuple[str, float]:
+        """Read a number with the glyph classifier
+        
+        Regions that also catch a neighbouring label or value can't be read as
+        a single line, so they are read word by word, keeping the most
+        confident word.
+        
+        Args:
+            gray: Grayscale crop of the region
+            
+        Returns:
+            Tuple of (text, confidence in the range 0-1)
+        """
+        classifier = get_glyph_classifier()
+        text, confidence = classifier.read(gray)
+        if text and confidence >= GLYPH_MIN_CONFIDENCE:
+            return text, confidence
+        
+        words = classifier.read_words(gray)
+        if words:
+            _, word_text, word_confidence = max(words, key=lambda word: word[2])
+            if word_confidence > confidence:
+                return word_text, word_confidence
+        
+        return text, confidence
+    
+    def _reread_region(self, context: ScreenshotContext, param_name: str, region_pct: tuple) -> Tuple[str, float]:
+        """Second, more expensive pass over a single low-confidence region
+        
+        The crop is upscaled and binarized, then read with the glyph classifier
+        (short numbers) and Tesseract with an alternative page segmentation mode.
+        
+        Args:
+            context: Screenshot context
+            param_name: Name of the parameter
+            region_pct: Region in normalized coordinates
+            
+        Returns:
+            Tuple of (text, confidence in the range 0-1) of the better reading
+        """
+        gray = context.crop(region_pct, 'gray')
+        if gray.size == 0:
+            return "", 0.0
+        
+        upscaled = cv2.resize(gray, None, fx=REREAD_UPSCALE, fy=REREAD_UPSCALE, interpolation=cv2.INTER_CUBIC)
+        binary = binarize_text(upscaled, upscale=False)
+        
+        best_text, best_confidence = "", 0.0
+        
+        numeric = param_name in self.glyph_params
+        if numeric:
+            glyph_text, glyph_confidence = get_glyph_classifier().read(binary)
+            if glyph_confidence >= GLYPH_MIN_CONFIDENCE:
+                best_text, best_confidence = glyph_text, glyph_confidence
+        
+        # Tesseract prefers dark text on white with a margin around it
+        page = cv2.copyMakeBorder(cv2.bitwise_not(binary), 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+        if numeric:
+            config = '--oem 3 --psm 8 -c tessedit_char_whitelist=0123456789.,-'
+        else:
+            config = '--oem 3 --psm 7'
+        
+        text, confidence = self._read_tesseract(Image.fromarray(page), config, param_name)
+        if text and confidence > best_confidence:
+            best_text, best_confidence = text, confidence
+        
+        return best_text, best_confidence
+    
+    def _read_tesseract(self, image: Image.Image, config: str, param_name: str) -> Tuple[str, float]:
+        """Read text and its mean word confidence with a single Tesseract call
+        
+        Args:
+            image: Image to read
+            config: Tesseract configuration
+            param_name: Name of the parameter, for logging
+            
+        Returns:
+            Tuple of (text with one line per text line, confidence in the range 0-1)
+        """
+        try:
+            data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        except Exception as tesseract_error:
+            logger.warning(f"Tesseract error for {param_name}: {str(tesseract_error)}")
+            return "", 0.0
+        
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            if not word:
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_key, []).append(word)
+            confidence = float(data['conf'][i])
+            if confidence >= 0:
+                confidences.append(confidence)
+        
+        text = '\n'.join(' '.join(words) for _, words in sorted(lines.items()))
+        confidence = sum(confidences) / len(confidences) / 100 if confidences else 0.0
+        return text, confidence
+    
+    def _store_reading(self, results: Dict[str, Any], param_name: str, region_text: str, confidence: float) -> None:
+        """Parse a region's text into results and record the field's confidence"""
+        if not region_text:
+            if self.debug_mode:
+                self.debug_info[param_name] = "No text detected"
+            logger.debug(f"{param_name}: No text detected in this region")
+            return
+        
+        if self.debug_mode:
+            self.debug_info[param_name] = region_text
+        logger.debug(f"{param_name}: Found text: '{region_text}' ({confidence:.2f})")
+        
+        # Process the text based on parameter name (subclasses will implement this)
+        processed_value = self._process_text(param_name, region_text)
+        if processed_value is not None:
+            results[param_name] = processed_value
+            self.confidences[param_name] = round(confidence, 3)
+    
+    def _calibrate_layout(self, context: ScreenshotContext) -> CalibratedLayout:
+        """Look up the screenshot's layout (resolution calibration refined with the UI anchors)"""
+        self.layout = get_screenshot_layout(context)
+        return self.layout
+    
+    @staticmethod
+    def _to_pil(image: np.ndarray) -> Image.Image:
+        """Convert an OpenCV BGR or grayscale array to a PIL image"""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(image)
+    
     def _process_text(self, param_name: str, text: str) -> Optional[Any]:
         """Process extracted text based on parameter name
         
@@ -161,26 +328,22 @@ class OCRProcessor:
         """
         return text  # Base implementation just returns the text
 
-def extract_ride_height_directly(image_path, is_front=True):
+def extract_ride_height_directly(source, is_front=True):
     """
     Extract ride height values directly from an image using OCR on the full image
     
     Args:
-        image_path: Path to the screenshot
+        source: Screenshot context or path to the screenshot
         is_front: True if looking for front ride height, False for rear
         
     Returns:
         Integer value of the ride height or None if not found
     """
     try:
-        # Load the image
-        img = cv2.imread(image_path)
-        if img is None:
-            logger.error(f"Could not load image at {image_path}")
-            return None
+        context = ScreenshotContext.from_source(source)
         
-        # Invert the image (GT7 has light text on dark background)
-        inverted = cv2.bitwise_not(img)
+        # Use the inverted image (GT7 has light text on dark background)
+        inverted = context.inverted
         
         # Run OCR on the full image
         full_text = pytesseract.image_to_string(inverted).strip()
@@ -207,7 +370,7 @@ def extract_ride_height_directly(image_path, is_front=True):
             ]
         
         # Try each specific pattern first
-        for pattern in patterns:
+        for pattern in specific_patterns:
             match = re.search(pattern, full_text, re.IGNORECASE)
             if match:
                 value = int(match.group(1))
@@ -237,6 +400,14 @@ def extract_ride_height_directly(image_path, is_front=True):
 class SuspensionOCRProcessor(OCRProcessor):
     """OCR processor for suspension screenshots"""
     
+    glyph_params = (
+        'vehicle_weight', 'front_weight_distribution',
+        'front_ride_height', 'rear_ride_height',
+        'front_downforce', 'rear_downforce',
+        'low_speed_stability', 'high_speed_stability',
+        'rotational_g_40mph', 'rotational_g_75mph', 'rotational_g_150mph'
+    )
+    
     def __init__(self, debug_mode: bool = False):
         super().__init__(debug_mode)
         # Define regions for suspension screenshot
@@ -257,17 +428,63 @@ class SuspensionOCRProcessor(OCRProcessor):
             'front_tires': (0.51, 0.13, 0.63, 0.16),
             'rear_tires': (0.51, 0.17, 0.63, 0.21)
         }
+        # Tire compound badges, left of the compound dropdowns read by Tesseract
+        self.badge_regions = {
+            'front_tires': (0.482, 0.122, 0.512, 0.167),
+            'rear_tires': (0.482, 0.170, 0.512, 0.215)
+        }
+        self.tire_params = ('front_tires', 'rear_tires')
     
-    def process_screenshot(self, image_path: str) -> Dict[str, Any]:
+    def process_screenshot(self, source: Union[str, ScreenshotContext]) -> Dict[str, Any]:
         """Process a suspension screenshot
         
+        Tire compounds are read from the code inside their badge; only
+        badges the classifier isn't confident about fall back to Tesseract
+        on the compound dropdown.
+        
         Args:
-            image_path: Path to the screenshot
+            source: Screenshot context or path to the screenshot
             
         Returns:
             Dictionary of extracted values
         """
-        return self.process_image(image_path, self.regions)
+        context = ScreenshotContext.from_source(source)
+        self.confidences = {}
+        tires = self.extract_tire_types(context)
+        
+        regions = {name: region for name, region in self.regions.items() if name not in tires}
+        results = self.process_image(context, regions)
+        
+        results.update(tires)
+        results['field_confidence'] = dict(self.confidences)
+        return results
+    
+    def extract_tire_types(self, context: ScreenshotContext) -> Dict[str, str]:
+        """Classify the front and rear tire badges
+        
+        Args:
+            context: Screenshot context
+            
+        Returns:
+            Dictionary of tire codes for the badges read with enough confidence
+        """
+        tires = {}
+        try:
+            layout = self._calibrate_layout(context)
+            classifier = get_tire_badge_classifier()
+            
+            for param_name in self.tire_params:
+                region = layout.transform_region(self.badge_regions[param_name])
+                code, confidence = classifier.classify(context.crop(region))
+                logger.debug(f"{param_name}: Tire badge classified as {code} ({confidence:.2f})")
+                if code and confidence >= TIRE_BADGE_MIN_CONFIDENCE:
+                    tires[param_name] = code
+                    self.confidences[param_name] = round(confidence, 3)
+                    
+        except Exception as e:
+            logger.error(f"Error classifying tire badges: {str(e)}")
+        
+        return tires
 
     def process_image_for_digits(image_path, region=None):
         """
@@ -299,7 +516,11 @@ class SuspensionOCRProcessor(OCRProcessor):
     def _process_text(self, param_name: str, text: str) -> Optional[Any]:
         """Process text for suspension parameters"""
         try:
-            if param_name == 'vehicle_weight':
+            if param_name == 'vehicle_name':
+                # Keep the raw name on one line; it is matched against the vehicle table later
+                return ' '.join(text.split()) or None
+            
+            elif param_name == 'vehicle_weight':
                 # Extract digits, remove commas
                 match = re.search(r'([0-9,]+)', text.replace(',', ''))
                 return int(match.group(1)) if match else None
@@ -427,6 +648,8 @@ class SuspensionOCRProcessor(OCRProcessor):
 class PowerOCRProcessor(OCRProcessor):
     """OCR processor for power curve screenshots"""
     
+    glyph_params = ('power_hp', 'torque_kgfm', 'min_rpm', 'max_rpm')
+    
     def __init__(self, debug_mode: bool = False):
         super().__init__(debug_mode)
         # Define regions for power screenshot
@@ -438,50 +661,48 @@ class PowerOCRProcessor(OCRProcessor):
             'max_power_rpm_region': (0.50, 0.20, 0.80, 0.40)  # Larger region to extract max power RPM text
         }
     
-    def process_screenshot(self, image_path: str) -> Dict[str, Any]:
+    def process_screenshot(self, source: Union[str, ScreenshotContext]) -> Dict[str, Any]:
         """Process a power curve screenshot
         
         Args:
-            image_path: Path to the screenshot
+            source: Screenshot context or path to the screenshot
             
         Returns:
             Dictionary of extracted values
         """
-        results = self.process_image(image_path, self.regions)
+        context = ScreenshotContext.from_source(source)
+        self.confidences = {}
+        results = self.process_image(context, self.regions)
         
-        # Extract max power RPM from graph if needed
-        if ('min_rpm' in results and 'max_rpm' in results and 
-            ('max_power_rpm' not in results or not results['max_power_rpm'])):
-            try:
-                max_power_rpm = self._extract_max_power_rpm_from_graph(
-                    image_path, 
-                    results['min_rpm'], 
-                    results['max_rpm']
-                )
-                results['max_power_rpm'] = max_power_rpm
-            except Exception as e:
-                logger.error(f"Error extracting max power RPM from graph: {str(e)}")
-                # Fallback estimation
-                if 'min_rpm' in results and 'max_rpm' in results:
-                    results['max_power_rpm'] = int(
-                        results['min_rpm'] + 
-                        (results['max_rpm'] - results['min_rpm']) * 0.75
-                    )
-                else:
-                    results['max_power_rpm'] = 6500  # Default value
-        
-        if all(key in results for key in ['min_rpm', 'max_rpm', 'torque_kgfm', 'power_hp']):
-            try:
-                from services.engine_data import process_engine_data
-                engine_data_results = process_engine_data(
-                    image_path, 
-                    results
+        # The "@ XXXX RPM" text is read under its region's name
+        if 'max_power_rpm_region' in results:
+            results['max_power_rpm'] = results.pop('max_power_rpm_region')
+            if 'max_power_rpm_region' in self.confidences:
+                self.confidences['max_power_rpm'] = self.confidences.pop('max_power_rpm_region')
+        
+        if 'min_rpm' in results and 'max_rpm' in results:
+            # Digitize the power/torque graph once for both the max power RPM and the engine data table
+            debug_dir = os.path.join(context.debug_base_dir, 'debug_power_regions') if self.debug_mode else None
+            engine_data_results = process_engine_data(
+                context, 
+                results,
+                graph_region=self.layout.transform_region(POWER_GRAPH_REGION),
+                debug_dir=debug_dir
+            )
+            
+            # Keep a max power RPM read directly from the screenshot text
+            if results.get('max_power_rpm'):
+                engine_data_results.pop('max_power_rpm', None)
+            results.update(engine_data_results)
+            
+            # Fallback estimation
+            if not results.get('max_power_rpm'):
+                results['max_power_rpm'] = int(
+                    results['min_rpm'] + 
+                    (results['max_rpm'] - results['min_rpm']) * 0.75
                 )
-                # Update results with engine data
-                results.update(engine_data_results)
-            except Exception as e:
-                logger.error(f"Error processing engine data: {str(e)}")
     
+        results['field_confidence'] = dict(self.confidences)
         return results 
     
     def _process_text(self, param_name: str, text: str) -> Optional[Any]:
@@ -519,120 +740,16 @@ class PowerOCRProcessor(OCRProcessor):
         except Exception as e:
             logger.error(f"Error processing text for {param_name}: {str(e)}")
             return None
-    
-    def _extract_max_power_rpm_from_graph(self, image_path: str, min_rpm: int, max_rpm: int) -> int:
-        """Extract the RPM value at maximum power by analyzing the power curve graph
-        
-        Args:
-            image_path: Path to the screenshot
-            min_rpm: Minimum RPM value
-            max_rpm: Maximum RPM value
-            
-        Returns:
-            RPM value at maximum power
-        """
-        try:
-            # Load the image with OpenCV
-            img = cv2.imread(image_path)
-            if img is None:
-                raise OCRError(f"Could not load image at {image_path}")
-            
-            height, width = img.shape[:2]
-            
-            # Define graph region (approximately where the power curve is shown)
-            graph_region = (0.585, 0.095, 0.77, 0.32)  # (left, top, right, bottom) as percentages
-            
-            # Convert to pixel coordinates
-            left = int(width * graph_region[0])
-            top = int(height * graph_region[1])
-            right = int(width * graph_region[2])
-            bottom = int(height * graph_region[3])
-            
-            # Crop the image to the graph region
-            cropped_img = img[top:bottom, left:right]
-            
-            # Save cropped region for debugging
-            if self.debug_mode:
-                debug_dir = os.path.join(os.path.dirname(image_path), 'debug_power_regions')
-                os.makedirs(debug_dir, exist_ok=True)
-                cv2.imwrite(os.path.join(debug_dir, "power_graph_region.jpg"), cropped_img)
-            
-            # Create a mask to isolate the power curve (usually in a distinct color like blue/cyan)
-            # The power curve in GT7 is typically cyan (high blue and green, low red)
-            blue = cropped_img[:, :, 0]
-            green = cropped_img[:, :, 1]
-            red = cropped_img[:, :, 2]
-            
-            # Create mask where blue is high, green is high, and red is low (cyan color)
-            power_mask = cv2.inRange(cropped_img, 
-                                   np.array([160, 160, 0]),   # Lower bound for cyan
-                                   np.array([255, 255, 100]))  # Upper bound for cyan
-            
-            # Save the mask for debugging
-            if self.debug_mode:
-                cv2.imwrite(os.path.join(debug_dir, "power_curve_mask.jpg"), power_mask)
-            
-            # Find all non-zero pixels (the power curve)
-            y_indices, x_indices = np.where(power_mask > 0)
-            
-            if len(x_indices) == 0:
-                logger.warning("No power curve found in the image, using default estimation")
-                return int(min_rpm + (max_rpm - min_rpm) * 0.75)
-            
-            # Create a map of x positions to lowest y positions (highest point on graph)
-            # In images, lower y values are higher on the graph (power peak)
-            x_to_min_y = {}
-            for x, y in zip(x_indices, y_indices):
-                if x not in x_to_min_y or y < x_to_min_y[x]:
-                    x_to_min_y[x] = y
-            
-            # Find the x position with the lowest y (peak of power curve)
-            if not x_to_min_y:
-                return int(min_rpm + (max_rpm - min_rpm) * 0.75)
-            
-            # Get the highest points (lowest y values)
-            sorted_by_height = sorted(x_to_min_y.items(), key=lambda item: item[1])
-            highest_points = sorted_by_height[:5]  # Take the 5 highest points
-            
-            # Average the x positions of the highest points for stability
-            peak_x_positions = [x for x, y in highest_points]
-            peak_x = sum(peak_x_positions) / len(peak_x_positions)
-            
-            # For visualization in debug mode
-            if self.debug_mode:
-                visualization_img = cropped_img.copy()
-                for x, y in highest_points:
-                    cv2.circle(visualization_img, (x, y), 3, (0, 0, 255), -1)  # Red circles
-                
-                # Draw a larger circle at the average peak position
-                avg_y = sum([y for _, y in highest_points]) / len(highest_points)
-                cv2.circle(visualization_img, (int(peak_x), int(avg_y)), 5, (255, 0, 0), -1)  # Blue circle
-                
-                cv2.imwrite(os.path.join(debug_dir, "power_peak_detected.jpg"), visualization_img)
-            
-            # Calculate the relative position of the peak on the x-axis
-            crop_width = cropped_img.shape[1]
-            relative_position = peak_x / crop_width
-            
-            # Map the relative position to the RPM range
-            rpm_at_max_power = int(min_rpm + relative_position * (max_rpm - min_rpm))
-            
-            # Round to nearest 25 RPM (as is common in engine specs)
-            rpm_at_max_power = int(round(rpm_at_max_power / 25) * 25)
-            
-            logger.debug(f"Calculated RPM at max power: {rpm_at_max_power} (peak at {relative_position:.2f} of x-axis)")
-            
-            return rpm_at_max_power
-            
-        except Exception as e:
-            logger.error(f"Error extracting max power RPM from graph: {str(e)}")
-            # Fallback to default estimation
-            return int(min_rpm + (max_rpm - min_rpm) * 0.75)
 
 
 class TransmissionOCRProcessor(OCRProcessor):
     """OCR processor for transmission screenshots"""
     
+    glyph_params = ('gear_ratio', 'rpm', 'speed', 'final_drive')
+    
+    # Tesseract reads the dark-on-light inverted screen more reliably
+    image_plane = 'inverted'
+    
     def __init__(self, debug_mode: bool = False):
         super().__init__(debug_mode)
         # Define regions for transmission screenshot
@@ -643,17 +760,221 @@ class TransmissionOCRProcessor(OCRProcessor):
             'final_drive': (0.42, 0.67, 0.46, 0.71),
             'gear_section': (0.30, 0.35, 0.34, 0.67)  # For detecting number of gears
         }
+        # The whole gear ratio table: gear labels, ratios, speeds, final drive and the RPM header
+        self.table_region = (0.30, 0.34, 0.54, 0.72)
+        # Rows below this (canonical y) belong to the final drive
+        self.final_drive_top = 0.665
+        # Canonical y of the 1st gear row's centre and the spacing of the gear rows
+        self.first_gear_row = 0.3634
+        self.gear_row_pitch = 0.0407
     
-    def process_screenshot(self, image_path: str) -> Dict[str, Any]:
+    def process_screenshot(self, source: Union[str, ScreenshotContext]) -> Dict[str, Any]:
         """Process a transmission screenshot
         
+        The gear ratio table is read in one structured pass; the per-field
+        regions are only OCR'd for values the table pass didn't find.
+        
         Args:
-            image_path: Path to the screenshot
+            source: Screenshot context or path to the screenshot
             
         Returns:
             Dictionary of extracted values
         """
-        return self.process_image(image_path, self.regions)
+        context = ScreenshotContext.from_source(source)
+        self.confidences = {}
+        table = self.extract_gear_table(context)
+        
+        # Skip regions the table already covered
+        covered = set()
+        if table.get('gear_ratios'):
+            covered.add('gear_ratio')
+        if table.get('gear_speeds'):
+            covered.add('speed')
+        if 'final_drive' in table:
+            covered.add('final_drive')
+        if 'num_gears' in table:
+            covered.add('gear_section')
+        if 'rpm' in table:
+            covered.add('rpm')
+        
+        regions = {name: region for name, region in self.regions.items() if name not in covered}
+        results = self.process_image(context, regions)
+        
+        # The legacy gear section reader stores the gear count under its region name
+        if 'gear_section' in results and 'num_gears' not in table:
+            results['num_gears'] = results['gear_section']
+            if 'gear_section' in self.confidences:
+                self.confidences['num_gears'] = self.confidences['gear_section']
+        
+        results.update(table)
+        results['field_confidence'] = dict(self.confidences)
+        return results
+    
+    def extract_gear_table(self, context: ScreenshotContext) -> Dict[str, Any]:
+        """Read the gear ratio table in one structured pass
+        
+        Word boxes are grouped into rows, and each row is matched by the
+        format of its words: a three-decimal ratio, the speed in that gear
+        to its right, or the RPM the speeds are given at.
+        
+        Args:
+            context: Screenshot context
+            
+        Returns:
+            Dictionary with 'gear_ratios' ({'1st': 3.545, ...}), 'gear_speeds',
+            'num_gears', 'final_drive', 'top_speed', 'rpm' and the first gear's
+            'gear_ratio'/'speed', for whichever values were found
+        """
+        try:
+            layout = self._calibrate_layout(context)
+            width, height = context.size
+            region = layout.transform_region(self.table_region)
+            left, top = int(region[0] * width), int(region[1] * height)
+            
+            # Fast path: segment and read the table with the glyph classifier
+            words = get_glyph_classifier().read_words(context.crop(region, 'gray'))
+            words = [word for word in words if word[2] >= GLYPH_MIN_CONFIDENCE]
+            table = self._parse_gear_table(words, left, top, height, layout)
+            
+            # Fall back to a single Tesseract pass over the table if it wasn't read completely
+            if len(table.get('gear_ratios', {})) < 4:
+                tesseract_words = self._tesseract_words(context, region)
+                tesseract_table = self._parse_gear_table(tesseract_words, left, top, height, layout)
+                if len(tesseract_table.get('gear_ratios', {})) > len(table.get('gear_ratios', {})):
+                    table, words = tesseract_table, tesseract_words
+            
+            # Every table field shares the table's mean word confidence
+            if words:
+                table_confidence = round(float(np.mean([word[2] for word in words])), 3)
+                for key in table:
+                    self.confidences[key] = table_confidence
+            
+            if self.debug_mode:
+                self.debug_info['gear_table'] = dict(table)
+            logger.debug(f"Gear table: {table}")
+            
+            return table
+            
+        except Exception as e:
+            logger.error(f"Error reading gear table: {str(e)}")
+            return {}
+    
+    def _tesseract_words(self, context: ScreenshotContext, region: tuple) -> List[tuple]:
+        """Word boxes, text and confidence (0-1) for a region from one Tesseract call"""
+        try:
+            data = pytesseract.image_to_data(
+                self._to_pil(context.crop(region, self.image_plane)),
+                config='--oem 3 --psm 6',
+                output_type=pytesseract.Output.DICT
+            )
+        except Exception as e:
+            logger.warning(f"Tesseract error for gear table: {str(e)}")
+            return []
+        
+        words = []
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            if text:
+                box = (data['left'][i], data['top'][i], data['width'][i], data['height'][i])
+                words.append((box, text, max(0.0, float(data['conf'][i])) / 100))
+        return words
+    
+    def _parse_gear_table(self, words: List[tuple], left: int, top: int, height: int,
+                          layout: CalibratedLayout) -> Dict[str, Any]:
+        """Group word boxes into rows and pick out the table values
+        
+        Args:
+            words: List of ((x, y, w, h), text, confidence) relative to the table crop
+            left: Table crop left edge in image pixels
+            top: Table crop top edge in image pixels
+            height: Image height in pixels
+            layout: Layout the table region was mapped with
+            
+        Returns:
+            Dictionary of table values
+        """
+        if not words:
+            return {}
+        
+        # Group words into rows by their vertical centres
+        words = sorted(words, key=lambda word: word[0][1] + word[0][3] / 2)
+        row_gap = np.median([box[3] for box, _, _ in words]) * 0.6
+        rows = []
+        for box, text, _ in words:
+            center = box[1] + box[3] / 2
+            if rows and center - rows[-1]['center'] <= row_gap:
+                rows[-1]['words'].append((box, text))
+            else:
+                rows.append({'center': center, 'words': [(box, text)]})
+        
+        table = {}
+        gear_numbers = {}
+        gear_ratios = {}
+        gear_speeds = {}
+        
+        for row in rows:
+            row_words = sorted(row['words'], key=lambda word: word[0][0])
+            texts = [text.replace(' ', '') for _, text in row_words]
+            
+            ratio_index = next((i for i, text in enumerate(texts) if re.match(r'^\d\.\d{2,3}$', text)), None)
+            
+            if ratio_index is None:
+                # The RPM the speeds are given at sits in a header row above the gears
+                if not gear_numbers and 'rpm' not in table:
+                    rpm_text = next((text for text in texts if re.match(r'^\d{1,2},?\d{3}$', text)), None)
+                    if rpm_text:
+                        table['rpm'] = int(rpm_text.replace(',', ''))
+                continue
+            
+            ratio = float(texts[ratio_index])
+            
+            # Rows in the final drive band hold the final drive
+            canonical_y = ((top + row['center']) / height - layout.offset_y) / layout.scale_y
+            if canonical_y >= self.final_drive_top:
+                table.setdefault('final_drive', ratio)
+                continue
+            
+            # The row's position gives its gear, so a row that wasn't read can't shift the others up
+            gear_number = int(round((canonical_y - self.first_gear_row) / self.gear_row_pitch)) + 1
+            if gear_number < 1 or gear_number in gear_numbers:
+                continue
+            gear_numbers[gear_number] = ratio
+            
+            # The speed in this gear is the number right of the ratio
+            speed_text = next((text for text in texts[ratio_index + 1:] if re.match(r'^\d{2,3}$', text)), None)
+            if speed_text:
+                gear_speeds[self._gear_name(gear_number)] = int(speed_text)
+        
+        if gear_numbers:
+            # A missing row or a ratio that doesn't get shorter with every gear is a misread;
+            # drop the gears so the table is read again (or the gear regions are)
+            ratios = [gear_numbers.get(number) for number in range(1, max(gear_numbers) + 1)]
+            if None in ratios or any(later >= earlier for earlier, later in zip(ratios, ratios[1:])):
+                logger.debug(f"Discarding incomplete gear table: {gear_numbers}")
+                return table
+            gear_ratios = {self._gear_name(number): ratio for number, ratio in enumerate(ratios, 1)}
+        
+        if gear_ratios:
+            table['gear_ratios'] = gear_ratios
+            table['gear_ratio'] = gear_ratios['1st']
+            if 4 <= len(gear_ratios) <= 9:
+                table['num_gears'] = len(gear_ratios)
+        
+        if gear_speeds:
+            table['gear_speeds'] = gear_speeds
+            if '1st' in gear_speeds:
+                table['speed'] = gear_speeds['1st']
+            top_gear = list(gear_ratios.keys())[-1]
+            if top_gear in gear_speeds:
+                table['top_speed'] = gear_speeds[top_gear]
+        
+        return table
+    
+    @staticmethod
+    def _gear_name(gear_number: int) -> str:
+        """Ordinal gear name as used by the gear calculator ('1st', '2nd', ...)"""
+        suffixes = {1: 'st', 2: 'nd', 3: 'rd'}
+        return f"{gear_number}{suffixes.get(gear_number, 'th')}"
     
     def _process_text(self, param_name: str, text: str) -> Optional[Any]:
         """Process text for transmission parameters"""
@@ -721,57 +1042,43 @@ class TransmissionOCRProcessor(OCRProcessor):
 
 # Module-level functions for backward compatibility
 def process_uploaded_screenshot(uploaded_file, debug_mode: bool = False):
-    """Process an uploaded suspension screenshot"""
-    # Check if uploaded_file is a file object or string path
+    """Process an uploaded suspension screenshot (file object, path or ScreenshotContext)"""
+    # Decode file objects straight from memory rather than through a temporary file
     if hasattr(uploaded_file, 'read') and callable(uploaded_file.read):
-        # Create a temporary file to save the uploaded image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp:
-            for chunk in uploaded_file.chunks():
-                temp.write(chunk)
-            temp_path = temp.name
+        source = ScreenshotContext.from_upload(uploaded_file)
     else:
-        # Assume it's already a path
-        temp_path = uploaded_file
+        # Assume it's already a path or context
+        source = uploaded_file
     
-    try:
-        # Extract inputs using OCR
-        processor = SuspensionOCRProcessor(debug_mode=debug_mode)
-        inputs = processor.process_screenshot(temp_path)
-        
-        # Check if ride height values are in the debug_info but not in the results
-        if debug_mode and hasattr(processor, 'debug_info'):
-            if 'front_ride_height' in processor.debug_info and 'front_ride_height' not in inputs:
-                try:
-                    front_height = int(processor.debug_info['front_ride_height'])
-                    inputs['front_ride_height'] = front_height
-                    logger.info(f"Added front_ride_height from debug_info: {front_height}")
-                except (ValueError, TypeError):
-                    pass
-                    
-            if 'rear_ride_height' in processor.debug_info and 'rear_ride_height' not in inputs:
-                try:
-                    rear_height = int(processor.debug_info['rear_ride_height'])
-                    inputs['rear_ride_height'] = rear_height
-                    logger.info(f"Added rear_ride_height from debug_info: {rear_height}")
-                except (ValueError, TypeError):
-                    pass
-        
-        # Delete temp file if not in debug mode and if we created it
-        if not debug_mode and hasattr(uploaded_file, 'read'):
-            os.unlink(temp_path)
-        
-        return inputs
-    except Exception as e:
-        # Keep temp file for debugging if in debug mode
-        if not debug_mode and hasattr(uploaded_file, 'read'):
-            os.unlink(temp_path)
-        raise e
+    # Extract inputs using OCR
+    processor = SuspensionOCRProcessor(debug_mode=debug_mode)
+    inputs = processor.process_screenshot(source)
+    
+    # Check if ride height values are in the debug_info but not in the results
+    if debug_mode and hasattr(processor, 'debug_info'):
+        if 'front_ride_height' in processor.debug_info and 'front_ride_height' not in inputs:
+            try:
+                front_height = int(processor.debug_info['front_ride_height'])
+                inputs['front_ride_height'] = front_height
+                logger.info(f"Added front_ride_height from debug_info: {front_height}")
+            except (ValueError, TypeError):
+                pass
+                
+        if 'rear_ride_height' in processor.debug_info and 'rear_ride_height' not in inputs:
+            try:
+                rear_height = int(processor.debug_info['rear_ride_height'])
+                inputs['rear_ride_height'] = rear_height
+                logger.info(f"Added rear_ride_height from debug_info: {rear_height}")
+            except (ValueError, TypeError):
+                pass
+    
+    return inputs
 
 def extract_power_data_from_screenshot(image_path, debug_mode: bool = False):
     """Extract power data from screenshot
     
     Args:
-        image_path: Path to the screenshot
+        image_path: Path to the screenshot or a ScreenshotContext
         debug_mode: Whether to save debug information
         
     Returns:
@@ -780,47 +1087,23 @@ def extract_power_data_from_screenshot(image_path, debug_mode: bool = False):
     processor = PowerOCRProcessor(debug_mode=debug_mode)
     return processor.process_screenshot(image_path)
 
-    if all(key in results for key in ['min_rpm', 'max_rpm', 'torque_kgfm', 'power_hp']):
-        try:
-            results = process_engine_data(image_path, results)
-        except Exception as e:
-            logger.error(f"Error processing engine data: {str(e)}")
-    
-    return results
-
 def process_transmission_screenshot(uploaded_file, debug_mode: bool = False):
     """Process an uploaded transmission screenshot
     
     Args:
-        uploaded_file: Django UploadedFile object or path to image file
+        uploaded_file: Django UploadedFile object, path to image file or ScreenshotContext
         debug_mode: Whether to save debug information
         
     Returns:
         Dictionary of extracted values
     """
-    # Check if uploaded_file is a file object or string path
+    # Decode file objects straight from memory rather than through a temporary file
     if hasattr(uploaded_file, 'read') and callable(uploaded_file.read):
-        # Create a temporary file to save the uploaded image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp:
-            for chunk in uploaded_file.chunks():
-                temp.write(chunk)
-            temp_path = temp.name
+        source = ScreenshotContext.from_upload(uploaded_file)
     else:
-        # Assume it's already a path
-        temp_path = uploaded_file
+        # Assume it's already a path or context
+        source = uploaded_file
     
-    try:
-        # Extract data using OCR
-        processor = TransmissionOCRProcessor(debug_mode=debug_mode)
-        transmission_data = processor.process_screenshot(temp_path)
-        
-        # Delete temp file if not in debug mode and if we created it
-        if not debug_mode and hasattr(uploaded_file, 'read'):
-            os.unlink(temp_path)
-        
-        return transmission_data
-    except Exception as e:
-        # Keep temp file for debugging if in debug mode
-        if not debug_mode and hasattr(uploaded_file, 'read'):
-            os.unlink(temp_path)
-        raise e
\ No newline at end of file
+    # Extract data using OCR
+    processor = TransmissionOCRProcessor(debug_mode=debug_mode)
+    return processor.process_screenshot(source)
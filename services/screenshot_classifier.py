@@ -0,0 +1,239 @@
+# services/screenshot_classifier.py
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+from services.digit_recognizer import get_glyph_classifier
+from services.engine_data import POWER_GRAPH_REGION
+from services.layout_registry import get_screenshot_layout
+from services.screenshot_context import ScreenshotContext
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_TYPES = ('suspension', 'power', 'transmission')
+
+# Directory of reference screenshots ("<type>/<anything>.png")
+DEFAULT_REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'screenshot_references')
+
+# Size of the layout fingerprint thumbnail (width, height), and the part of the screen it
+# covers - the vehicle panel on the left and the header/footer bars are the same on every screen
+FINGERPRINT_SIZE = (32, 18)
+FINGERPRINT_REGION = (0.36, 0.05, 1.0, 0.95)
+
+# Fingerprint similarity the nearest reference needs, and its lead over the nearest reference
+# of another type (power and transmission popups share the settings sheet behind them)
+FINGERPRINT_MIN_SIMILARITY = 0.8
+FINGERPRINT_MIN_MARGIN = 0.1
+
+# The power curve's cyan in OpenCV HSV - looser than the digitizer's BGR bounds because
+# the thin curve blends into the background when the screenshot is downscaled
+POWER_CURVE_LOWER_HSV = np.array([80, 100, 120])
+POWER_CURVE_UPPER_HSV = np.array([100, 255, 255])
+
+# Fraction of the graph region the power curve covers on a power screenshot
+POWER_CURVE_MIN_FRACTION = 0.004
+
+# Numeric fields whose format identifies a screen, read with the glyph classifier
+# (region, pattern) - regions are the OCR processors' canonical regions
+ANCHOR_FIELDS = {
+    'suspension': [
+        ((0.54, 0.33, 0.58, 0.37), r'^\d{2,3}$'),           # front ride height
+        ((0.62, 0.33, 0.66, 0.37), r'^\d{2,3}$'),           # rear ride height
+        ((0.30, 0.48, 0.34, 0.52), r'^\d{1,2},?\d{3}$'),    # vehicle weight
+    ],
+    'transmission': [
+        ((0.38, 0.43, 0.425, 0.46), r'^\d\.\d{3}$'),        # gear ratio
+        ((0.42, 0.67, 0.46, 0.71), r'^\d\.\d{3}$'),         # final drive
+    ],
+}
+
+# Best score below this leaves the screenshot unclassified
+MIN_CLASSIFICATION_SCORE = 0.5
+
+
+class ScreenshotClassifier:
+    """Cheap classifier for the type of a GT7 screenshot
+
+    Works on the screenshot's reduced-resolution planes and a handful of
+    glyph reads, so once the detection plane, perspective check and layout
+    exist (all shared with OCR) it costs a few milliseconds instead of an OCR
+    pass. A cold classify of a 4K capture pays for those too, around 50 ms:
+
+    - power screenshots are recognised by the cyan power curve in the graph
+    - suspension and transmission screenshots by the format of anchor fields
+      (ride heights vs three-decimal gear ratios)
+    - by nearest-neighbour matching of a small layout fingerprint against the
+      reference screenshots shipped in screenshot_references, which needs no
+      glyph reads at all
+    """
+
+    def __init__(self):
+        self._labels: List[str] = []
+        self._fingerprints: List[np.ndarray] = []
+
+    # ------------------------------------------------------------------
+    # References
+    # ------------------------------------------------------------------
+
+    def add_reference(self, screenshot_type: str, source) -> None:
+        """Add a labelled reference screenshot
+
+        Args:
+            screenshot_type: 'suspension', 'power' or 'transmission'
+            source: Screenshot context or path to the screenshot
+        """
+        if screenshot_type not in SCREENSHOT_TYPES:
+            raise ValueError(f"Unknown screenshot type: {screenshot_type}")
+        # References are console captures, so skip the screen search that photos need
+        context = ScreenshotContext.from_source(source, rectify=False)
+        self._labels.append(screenshot_type)
+        self._fingerprints.append(self.fingerprint(context))
+
+    def load_references(self, directory: str) -> int:
+        """Load reference screenshots stored in per-type sub-directories
+
+        Args:
+            directory: Directory containing suspension/, power/ and transmission/
+
+        Returns:
+            Number of references loaded
+        """
+        loaded = 0
+        if not directory or not os.path.isdir(directory):
+            return loaded
+
+        for screenshot_type in SCREENSHOT_TYPES:
+            type_dir = os.path.join(directory, screenshot_type)
+            if not os.path.isdir(type_dir):
+                continue
+            for file_name in sorted(os.listdir(type_dir)):
+                if not file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                    continue
+                try:
+                    self.add_reference(screenshot_type, os.path.join(type_dir, file_name))
+                    loaded += 1
+                except Exception as e:
+                    logger.warning(f"Skipping reference screenshot {file_name}: {str(e)}")
+
+        logger.debug(f"Loaded {loaded} reference screenshots from {directory}")
+        return loaded
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+
+    def classify(self, source) -> Tuple[Optional[str], float]:
+        """Classify a screenshot
+
+        Args:
+            source: Screenshot context or path to the screenshot
+
+        Returns:
+            Tuple of (screenshot type or None, score in the range 0-1)
+        """
+        try:
+            scores = self.score(source)
+            best_type = max(scores, key=scores.get)
+            best_score = scores[best_type]
+
+            if best_score < MIN_CLASSIFICATION_SCORE:
+                logger.debug(f"Could not classify screenshot: {scores}")
+                return None, best_score
+
+            return best_type, best_score
+
+        except Exception as e:
+            logger.error(f"Error classifying screenshot: {str(e)}")
+            return None, 0.0
+
+    def score(self, source) -> Dict[str, float]:
+        """Score a screenshot against every type
+
+        Args:
+            source: Screenshot context or path to the screenshot
+
+        Returns:
+            Dictionary mapping screenshot type to a score in the range 0-1
+        """
+        context = ScreenshotContext.from_source(source)
+        layout = get_screenshot_layout(context)
+
+        scores = {screenshot_type: 0.0 for screenshot_type in SCREENSHOT_TYPES}
+
+        # Power: the cyan curve in the graph
+        graph = context.detection.crop(layout.transform_region(POWER_GRAPH_REGION))
+        if graph.size:
+            hsv = cv2.cvtColor(graph, cv2.COLOR_BGR2HSV)
+            curve_fraction = cv2.countNonZero(cv2.inRange(hsv, POWER_CURVE_LOWER_HSV, POWER_CURVE_UPPER_HSV)) / (graph.shape[0] * graph.shape[1])
+            scores['power'] = min(1.0, curve_fraction / POWER_CURVE_MIN_FRACTION)
+
+        # Suspension and transmission: the format of a few numeric anchor fields, read at
+        # detection resolution so classifying never decodes a 4K capture in full
+        if scores['power'] < 1.0:
+            classifier = get_glyph_classifier()
+            for screenshot_type, anchors in ANCHOR_FIELDS.items():
+                total = 0.0
+                for region, pattern in anchors:
+                    text, confidence = classifier.read(context.detection.crop(layout.transform_region(region), 'gray'))
+                    if text and re.match(pattern, text):
+                        total += confidence
+                scores[screenshot_type] = total / len(anchors)
+
+        # Reference screenshots, when available, can only raise the score of the nearest type
+        if self._fingerprints:
+            similarities = np.vstack(self._fingerprints) @ self.fingerprint(context)
+            labels = np.array(self._labels)
+            nearest = {
+                screenshot_type: float(similarities[labels == screenshot_type].max())
+                for screenshot_type in SCREENSHOT_TYPES if np.any(labels == screenshot_type)
+            }
+            ranked = sorted(nearest, key=nearest.get, reverse=True)
+            best = nearest[ranked[0]]
+            runner_up = nearest[ranked[1]] if len(ranked) > 1 else 0.0
+            if best >= FINGERPRINT_MIN_SIMILARITY and best - runner_up >= FINGERPRINT_MIN_MARGIN:
+                scores[ranked[0]] = max(scores[ranked[0]], best)
+
+        return scores
+
+    @staticmethod
+    def fingerprint(context: ScreenshotContext) -> np.ndarray:
+        """Small zero-mean unit-length thumbnail of the screen-specific part of the layout"""
+        thumbnail = cv2.resize(context.detection.crop(FINGERPRINT_REGION, 'gray'), FINGERPRINT_SIZE,
+                               interpolation=cv2.INTER_AREA)
+        vector = thumbnail.astype(np.float32).ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+_default_classifier = None
+_default_classifier_lock = threading.Lock()
+
+
+def get_screenshot_classifier() -> ScreenshotClassifier:
+    """Get the shared classifier, loading any reference screenshots on first use"""
+    global _default_classifier
+    if _default_classifier is None:
+        with _default_classifier_lock:
+            if _default_classifier is None:
+                classifier = ScreenshotClassifier()
+                classifier.load_references(DEFAULT_REFERENCE_DIR)
+                _default_classifier = classifier
+    return _default_classifier
+
+
+def classify_screenshot(source) -> Tuple[Optional[str], float]:
+    """Classify a screenshot as 'suspension', 'power' or 'transmission'
+
+    Args:
+        source: Screenshot context or path to the screenshot
+
+    Returns:
+        Tuple of (screenshot type or None, score in the range 0-1)
+    """
+    return get_screenshot_classifier().classify(source)
@@ -0,0 +1,312 @@
+# services/screenshot_context.py
+import os
+import logging
+import tempfile
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+import cv2
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Smallest width detection will decode down to - 4K captures are detected at 1920, 1080p at full size
+DETECTION_MIN_WIDTH = 1920
+
+# Decode flags for each supported reduction factor
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class ScreenshotContextError(Exception):
+    """Exception raised when a screenshot can't be decoded."""
+    pass
+
+
+def get_reduction_factor(width: int, min_width: int = DETECTION_MIN_WIDTH) -> int:
+    """Get the largest supported reduction factor that keeps the image at least min_width wide
+
+    Args:
+        width: Full resolution image width
+        min_width: Smallest acceptable decoded width
+
+    Returns:
+        Reduction factor (1, 2, 4 or 8)
+    """
+    factor = 1
+    for candidate in sorted(REDUCED_DECODE_FLAGS):
+        if width // candidate >= min_width:
+            factor = candidate
+    return factor
+
+
+class ScreenshotContext:
+    """A single screenshot and the image planes derived from it
+
+    The context is created once per upload and handed to every detector and
+    OCR processor. Each plane (decoded BGR, grayscale, inverted, blurred,
+    Canny edges, binarized) is computed on first use and memoized, so no
+    plane is computed twice for the same screenshot.
+    """
+
+    def __init__(self, image_path: Optional[str] = None, image: Optional[np.ndarray] = None,
+                 factor: int = 1, buffer: Optional[memoryview] = None, debug_dir: Optional[str] = None):
+        """Initialize the context
+
+        Args:
+            image_path: Path to the screenshot on disk
+            image: Already decoded BGR image, used instead of decoding image_path
+            factor: Reduction factor of image relative to the original screenshot
+            buffer: Encoded image bytes, decoded in memory instead of reading image_path
+            debug_dir: Directory for debug output, defaults to the image's directory
+        """
+        if image_path is None and image is None and buffer is None:
+            raise ScreenshotContextError("A screenshot context needs an image path, buffer or decoded image")
+
+        self.image_path = image_path
+        self.name = os.path.basename(image_path) if image_path else None
+        self.factor = factor
+        self.debug_dir = debug_dir
+        self._buffer = buffer
+        self._planes: Dict[str, Any] = {}
+        self._size: Optional[Tuple[int, int]] = None
+        self._detection: Optional['ScreenshotContext'] = None
+        self._rectified: Optional['ScreenshotContext'] = None
+        self._derived: Dict[str, Any] = {}
+
+        if image is not None:
+            self._planes['bgr'] = image
+
+    @classmethod
+    def from_source(cls, source: Union[str, 'ScreenshotContext'], rectify: bool = True) -> 'ScreenshotContext':
+        """Wrap an image path in a context, passing existing contexts through
+
+        Args:
+            source: Screenshot context or path to the screenshot
+            rectify: Whether to return the perspective corrected context for photos of the screen
+
+        Returns:
+            ScreenshotContext in the canonical frame (or the source's own frame if rectify is False)
+        """
+        context = source if isinstance(source, cls) else cls(image_path=source)
+        return context.rectified if rectify else context
+
+    @classmethod
+    def from_upload(cls, uploaded_file, debug_dir: Optional[str] = None) -> 'ScreenshotContext':
+        """Create a context that decodes an upload straight from memory
+
+        In-memory uploads are wrapped without copying; uploads Django spooled
+        to disk are read once.
+
+        Args:
+            uploaded_file: Django UploadedFile, ContentFile or binary file object
+            debug_dir: Directory for debug output
+
+        Returns:
+            ScreenshotContext backed by the upload's bytes
+        """
+        context = cls(buffer=read_upload_buffer(uploaded_file), debug_dir=debug_dir)
+        context.name = getattr(uploaded_file, 'name', None)
+        return context
+
+    def _plane(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Return a memoized plane, computing it on first use"""
+        plane = self._planes.get(name)
+        if plane is None:
+            plane = compute()
+            self._planes[name] = plane
+        return plane
+
+    def memoize(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return a result derived from this screenshot, computing it on first use"""
+        if key not in self._derived:
+            self._derived[key] = compute()
+        return self._derived[key]
+
+    @property
+    def debug_base_dir(self) -> str:
+        """Directory debug output for this screenshot is written next to"""
+        if self.debug_dir:
+            return self.debug_dir
+        return os.path.dirname(self.image_path) if self.image_path else tempfile.gettempdir()
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Image (width, height), read from the header if the pixels aren't decoded yet"""
+        if self._size is None:
+            if 'bgr' in self._planes or self.image_path is None:
+                # In-memory screenshots are decoded in full anyway for OCR
+                height, width = self.bgr.shape[:2]
+                self._size = (width, height)
+            else:
+                with Image.open(self.image_path) as header:
+                    self._size = header.size
+        return self._size
+
+    # ------------------------------------------------------------------
+    # Planes
+    # ------------------------------------------------------------------
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Decoded BGR image"""
+        return self._plane('bgr', self._decode)
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale plane"""
+        return self._plane('gray', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def inverted(self) -> np.ndarray:
+        """Inverted BGR image (GT7 has light text on a dark background)"""
+        return self._plane('inverted', lambda: cv2.bitwise_not(self.bgr))
+
+    @property
+    def blurred(self) -> np.ndarray:
+        """Grayscale plane with a 5x5 Gaussian blur to reduce noise"""
+        return self._plane('blurred', lambda: cv2.GaussianBlur(self.gray, (5, 5), 0))
+
+    @property
+    def edges(self) -> np.ndarray:
+        """Canny edges of the blurred plane"""
+        return self._plane('edges', lambda: cv2.Canny(self.blurred, 50, 150))
+
+    @property
+    def binary(self) -> np.ndarray:
+        """Adaptive threshold of the grayscale plane with text as the foreground"""
+        return self._plane('binary', lambda: cv2.adaptiveThreshold(
+            self.gray,
+            255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            11,
+            2
+        ))
+
+    def get_plane(self, name: str) -> np.ndarray:
+        """Get a plane by name ('bgr', 'gray', 'inverted', 'blurred', 'edges' or 'binary')"""
+        if name not in ('bgr', 'gray', 'inverted', 'blurred', 'edges', 'binary'):
+            raise ScreenshotContextError(f"Unknown image plane: {name}")
+        return getattr(self, name)
+
+    # ------------------------------------------------------------------
+    # Perspective correction
+    # ------------------------------------------------------------------
+
+    @property
+    def rectified(self) -> 'ScreenshotContext':
+        """Context warped into the canonical frame if this is a photo of the screen
+
+        Console captures return themselves. The warp is computed once and
+        memoized, so every detector and OCR processor shares it.
+        """
+        if self._rectified is None:
+            from services.image_processing import correct_perspective
+
+            self._rectified = correct_perspective(self)
+            self._rectified._rectified = self._rectified
+        return self._rectified
+
+    # ------------------------------------------------------------------
+    # Reduced resolution
+    # ------------------------------------------------------------------
+
+    @property
+    def detection(self) -> 'ScreenshotContext':
+        """Reduced resolution context for layout detection
+
+        JPEG captures are decoded at the reduced size directly (DCT scaling)
+        so decoding, blurring and edge detection all cost roughly 1/factor^2.
+        Its planes are memoized separately from the full resolution ones.
+        """
+        if self._detection is None:
+            factor = get_reduction_factor(self.size[0])
+            if factor == 1:
+                self._detection = self
+            elif 'bgr' in self._planes or self.image_path is None:
+                # Already decoded - downscale rather than decoding again
+                width, height = self.size
+                reduced = cv2.resize(self.bgr, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+                self._detection = ScreenshotContext(image=reduced, factor=factor, debug_dir=self.debug_dir)
+            else:
+                reduced = cv2.imread(self.image_path, REDUCED_DECODE_FLAGS[factor])
+                if reduced is None:
+                    raise ScreenshotContextError(f"Could not load image at {self.image_path}")
+                self._detection = ScreenshotContext(image=reduced, factor=factor, debug_dir=self.debug_dir)
+                logger.debug(f"Decoded {self.image_path} at 1/{factor} resolution for detection")
+        return self._detection
+
+    def _decode(self) -> np.ndarray:
+        """Decode the full resolution image"""
+        if self._buffer is not None:
+            # imdecode reads the upload's memory directly through the uint8 view
+            img = cv2.imdecode(np.frombuffer(self._buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ScreenshotContextError("Could not decode uploaded image")
+            return img
+
+        img = cv2.imread(self.image_path)
+        if img is None:
+            raise ScreenshotContextError(f"Could not load image at {self.image_path}")
+        return img
+
+    def save_original(self, path: str) -> str:
+        """Queue the screenshot as uploaded for the debug writer
+
+        Args:
+            path: File path to write to
+
+        Returns:
+            The path the screenshot will be written to
+        """
+        from services.debug_writer import get_debug_writer
+
+        if self._buffer is not None:
+            get_debug_writer().write_bytes(path, self._buffer)
+        else:
+            get_debug_writer().write_image(path, self.bgr)
+        return path
+
+    def crop(self, region: Tuple[float, float, float, float], plane: str = 'bgr') -> np.ndarray:
+        """Crop a region from a plane
+
+        Args:
+            region: Normalized coordinates (x1, y1, x2, y2)
+            plane: Name of the plane to crop from
+
+        Returns:
+            View into the plane (not a copy)
+        """
+        width, height = self.size
+        left = max(0, int(region[0] * width))
+        top = max(0, int(region[1] * height))
+        right = min(width, int(region[2] * width))
+        bottom = min(height, int(region[3] * height))
+        return self.get_plane(plane)[top:bottom, left:right]
+
+
+def read_upload_buffer(uploaded_file) -> memoryview:
+    """Get the bytes of an uploaded file as a memoryview
+
+    Args:
+        uploaded_file: Django UploadedFile, ContentFile or binary file object
+
+    Returns:
+        memoryview over the encoded image
+    """
+    # In-memory uploads (and ContentFile) are backed by a BytesIO we can view without copying
+    file = getattr(uploaded_file, 'file', uploaded_file)
+    if hasattr(file, 'getbuffer'):
+        return file.getbuffer()
+
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+
+    if hasattr(uploaded_file, 'chunks'):
+        return memoryview(b''.join(uploaded_file.chunks()))
+    return memoryview(uploaded_file.read())
@@ -0,0 +1,142 @@
+# services/setup_stats_service.py
+import logging
+import math
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Histogram bin width per metric - the resolution GT7 settings are made in,
+# so percentiles read from the histogram are the values people actually run
+METRIC_BIN_WIDTHS = {
+    'front_spring_rate': 0.05,
+    'rear_spring_rate': 0.05,
+    'front_roll_bar': 1.0,
+    'rear_roll_bar': 1.0,
+    'front_camber': 0.1,
+    'rear_camber': 0.1,
+    'final_drive': 0.01,
+}
+
+SUMMARY_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def empty_accumulator() -> Dict[str, Any]:
+    """Running totals for one metric (JSON serializable)"""
+    return {'count': 0, 'sum': 0.0, 'sum_sq': 0.0, 'min': None, 'max': None, 'histogram': {}}
+
+
+def add_values(metrics: Dict[str, Dict[str, Any]], values: Dict[str, Optional[float]]) -> None:
+    """Add one setup's values to a vehicle's accumulators
+
+    Args:
+        metrics: Accumulators keyed by metric name (updated in place)
+        values: Metric values of a single setup; None and non-finite values are skipped
+    """
+    for metric, value in values.items():
+        if value is None or not math.isfinite(value):
+            continue
+        accumulator = metrics.setdefault(metric, empty_accumulator())
+        accumulator['count'] += 1
+        accumulator['sum'] += value
+        accumulator['sum_sq'] += value * value
+        accumulator['min'] = value if accumulator['min'] is None else min(accumulator['min'], value)
+        accumulator['max'] = value if accumulator['max'] is None else max(accumulator['max'], value)
+
+        bin_key = str(int(round(value / METRIC_BIN_WIDTHS[metric])))
+        accumulator['histogram'][bin_key] = accumulator['histogram'].get(bin_key, 0) + 1
+
+
+def accumulate_columns(accumulators: Dict[Any, Dict[str, Dict[str, Any]]], keys: np.ndarray,
+                       columns: Dict[str, np.ndarray]) -> None:
+    """Add a chunk of setups to per-group accumulators in one array pass per metric
+
+    Produces the same totals as calling add_values() row by row.
+
+    Args:
+        accumulators: Accumulators keyed by group (e.g. vehicle id), then metric (updated in place)
+        keys: Group key of each row
+        columns: Float array per metric, NaN where a row has no value
+    """
+    for metric, column in columns.items():
+        finite = np.isfinite(column)
+        if not finite.any():
+            continue
+        values = column[finite]
+        groups, inverse = np.unique(keys[finite], return_inverse=True)
+
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=values)
+        sums_sq = np.bincount(inverse, weights=values * values)
+        mins = np.full(len(groups), np.inf)
+        maxs = np.full(len(groups), -np.inf)
+        np.minimum.at(mins, inverse, values)
+        np.maximum.at(maxs, inverse, values)
+
+        # Histogram counts per (group, bin) pair
+        bins = np.rint(values / METRIC_BIN_WIDTHS[metric]).astype(np.int64)
+        pairs, pair_counts = np.unique(np.stack([inverse, bins], axis=1), axis=0, return_counts=True)
+
+        group_accumulators = []
+        for index, group in enumerate(groups.tolist()):
+            accumulator = accumulators.setdefault(group, {}).setdefault(metric, empty_accumulator())
+            accumulator['count'] += int(counts[index])
+            accumulator['sum'] += float(sums[index])
+            accumulator['sum_sq'] += float(sums_sq[index])
+            low, high = float(mins[index]), float(maxs[index])
+            accumulator['min'] = low if accumulator['min'] is None else min(accumulator['min'], low)
+            accumulator['max'] = high if accumulator['max'] is None else max(accumulator['max'], high)
+            group_accumulators.append(accumulator['histogram'])
+
+        for (index, bin_index), count in zip(pairs.tolist(), pair_counts.tolist()):
+            histogram = group_accumulators[index]
+            bin_key = str(bin_index)
+            histogram[bin_key] = histogram.get(bin_key, 0) + count
+
+
+def summarize_metric(metric: str, accumulator: Dict[str, Any],
+                     percentiles: Iterable[int] = SUMMARY_PERCENTILES) -> Optional[Dict[str, Any]]:
+    """Turn one metric's accumulator into count, mean, standard deviation, range and percentiles
+
+    Percentiles are nearest-rank over the histogram, reported at the bin's
+    value, so they cost O(bins) whatever the number of setups.
+    """
+    count = accumulator['count']
+    if not count:
+        return None
+
+    mean = accumulator['sum'] / count
+    variance = max(accumulator['sum_sq'] / count - mean * mean, 0.0)
+    width = METRIC_BIN_WIDTHS[metric]
+    digits = max(0, -int(math.floor(math.log10(width))))
+
+    histogram = sorted((int(bin_key), bin_count) for bin_key, bin_count in accumulator['histogram'].items())
+    summary = {
+        'count': count,
+        'mean': round(mean, 3),
+        'std': round(math.sqrt(variance), 3),
+        'min': accumulator['min'],
+        'max': accumulator['max'],
+    }
+
+    for percentile in percentiles:
+        rank = max(1, math.ceil(percentile / 100 * count))
+        seen = 0
+        for bin_index, bin_count in histogram:
+            seen += bin_count
+            if seen >= rank:
+                summary[f'p{percentile}'] = round(bin_index * width, digits)
+                break
+
+    return summary
+
+
+def summarize_metrics(metrics: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Summarize every metric with at least one value"""
+    summaries = {}
+    for metric, accumulator in metrics.items():
+        summary = summarize_metric(metric, accumulator)
+        if summary is not None:
+            summaries[metric] = summary
+    return summaries
@@ -0,0 +1,289 @@
+# services/tire_badge.py
+import os
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Tire codes as stored on SpringCalculation.front_tires/rear_tires
+TIRE_CODES = ('CH', 'CM', 'CS', 'SH', 'SM', 'SS', 'RH', 'RM', 'RS', 'RI', 'RW')
+
+# Text GT7 prints on each badge, where it differs from the stored code
+BADGE_LABELS = {
+    'RI': 'IM',
+    'RW': 'W',
+}
+
+# Directory of labelled badge crops ("<code>/<anything>.png")
+DEFAULT_REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tire_badge_references')
+
+# Size the inside of the ring is normalised to before matching (width, height)
+BADGE_GLYPH_SIZE = (32, 32)
+
+# Accepted width/height ratio of the ring's bounding box, and its smallest height
+# relative to the badge region (so letters like 'o' nearby aren't taken for it)
+RING_ASPECT_RANGE = (0.8, 1.25)
+RING_MIN_HEIGHT = 0.5
+
+# Largest fraction of its bounding box the ring may fill (a ring is hollow), and the
+# smallest fraction of the circle along the box's edge it must cover
+RING_MAX_FILL = 0.5
+RING_MIN_COVERAGE = 0.7
+
+# Proportions of GT7's badges relative to the ring's diameter, measured on the suspension screen:
+# the radius inside which the code is printed, its height and the ring's stroke width
+RING_TEXT_RADIUS = 0.38
+RING_TEXT_HEIGHT = 0.375
+RING_STROKE = 0.1
+
+# Minimum gap between the best and second best code before confidence is discounted
+MIN_CODE_MARGIN = 0.05
+
+
+class TireBadgeClassifier:
+    """Classifier for GT7's tire compound badges
+
+    GT7 draws every badge the same way: a white ring with the compound code
+    in white inside it, on the dark menu background. A badge is located as
+    the largest bright, roughly square and hollow component, and the code
+    inside it is normalised to the ring's size and compared
+    against every reference glyph with one matrix product, so a badge is
+    classified in well under a millisecond instead of a Tesseract call and
+    keyword matching.
+    """
+
+    def __init__(self):
+        self._codes: List[str] = []
+        self._glyphs: List[np.ndarray] = []
+        self._glyph_matrix: Optional[np.ndarray] = None
+        self._code_array: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+
+    def add_reference(self, code: str, glyph: np.ndarray) -> None:
+        """Add a glyph vector for a tire code
+
+        Args:
+            code: Tire code from TIRE_CODES
+            glyph: Normalised glyph vector from badge_features()
+        """
+        if code not in TIRE_CODES:
+            raise ValueError(f"Unknown tire code: {code}")
+        self._codes.append(code)
+        self._glyphs.append(glyph)
+        self._glyph_matrix = None
+
+    @property
+    def codes(self) -> List[str]:
+        """Codes with at least one reference"""
+        return sorted(set(self._codes), key=TIRE_CODES.index)
+
+    def load_labelled_crops(self, directory: str) -> int:
+        """Load badge crops stored in per-code sub-directories
+
+        Args:
+            directory: Directory containing <code>/ sub-directories
+
+        Returns:
+            Number of crops loaded
+        """
+        loaded = 0
+        if not directory or not os.path.isdir(directory):
+            return loaded
+
+        for code in TIRE_CODES:
+            code_dir = os.path.join(directory, code)
+            if not os.path.isdir(code_dir):
+                continue
+
+            for file_name in sorted(os.listdir(code_dir)):
+                if not file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                    continue
+                crop = cv2.imread(os.path.join(code_dir, file_name))
+                glyph = self.badge_features(crop)
+                if glyph is None:
+                    logger.warning(f"No tire badge found in reference crop {code}/{file_name}")
+                    continue
+
+                self.add_reference(code, glyph)
+                loaded += 1
+
+        logger.debug(f"Loaded {loaded} tire badge crops from {directory}")
+        return loaded
+
+    def add_rendered_references(self, skip: Tuple[str, ...] = ()) -> None:
+        """Render ring badges with OpenCV's fonts for codes without real crops
+
+        The ring and text are drawn at the proportions of GT7's badges, but
+        the font only approximates GT7's, so real crops should replace these
+        for any code they cover.
+
+        Args:
+            skip: Codes that already have labelled crops
+        """
+        size = 80
+        stroke = max(1, int(round(size * RING_STROKE)))
+        for code in TIRE_CODES:
+            if code in skip:
+                continue
+            label = BADGE_LABELS.get(code, code)
+            for font in (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX):
+                for thickness in (1, 2):
+                    text = np.zeros((60, 40 * len(label) + 20), dtype=np.uint8)
+                    cv2.putText(text, label, (10, 45), font, 1.2, 255, thickness, cv2.LINE_AA)
+                    ys, xs = np.nonzero(text > 127)
+                    text = text[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+                    # Scale the label's ink to the height GT7 prints codes at, centred in the ring
+                    text_h = int(round(size * RING_TEXT_HEIGHT))
+                    text_w = min(int(size * 2 * RING_TEXT_RADIUS), max(1, int(round(text.shape[1] * text_h / text.shape[0]))))
+                    text = cv2.resize(text, (text_w, text_h), interpolation=cv2.INTER_AREA)
+
+                    canvas = np.zeros((size + 16, size + 16), dtype=np.uint8)
+                    centre = canvas.shape[0] // 2
+                    cv2.circle(canvas, (centre, centre), (size - stroke) // 2, 230, stroke, cv2.LINE_AA)
+                    top, left = centre - text_h // 2, centre - text_w // 2
+                    canvas[top:top + text_h, left:left + text_w] = np.maximum(
+                        canvas[top:top + text_h, left:left + text_w], text
+                    )
+
+                    glyph = self.badge_features(canvas)
+                    if glyph is not None:
+                        self.add_reference(code, glyph)
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+
+    def classify(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        """Classify the tire badge in a region crop
+
+        Args:
+            image: BGR crop of the badge region
+
+        Returns:
+            Tuple of (tire code or None, confidence in the range 0-1)
+        """
+        try:
+            glyph = self.badge_features(image)
+            if glyph is None or not self._glyphs:
+                return None, 0.0
+
+            scores = self.score(glyph)
+            ranked = np.argsort(scores)[::-1]
+            best, second = scores[ranked[0]], scores[ranked[1]]
+
+            # Discount near-ties between two codes
+            confidence = float(max(0.0, best))
+            if best - second < MIN_CODE_MARGIN:
+                confidence *= (best - second) / MIN_CODE_MARGIN
+
+            return TIRE_CODES[ranked[0]], confidence
+
+        except Exception as e:
+            logger.error(f"Error classifying tire badge: {str(e)}")
+            return None, 0.0
+
+    def score(self, glyph: np.ndarray) -> np.ndarray:
+        """Score a badge glyph vector against every code
+
+        Args:
+            glyph: Normalised glyph vector
+
+        Returns:
+            Array of best reference similarities in TIRE_CODES order
+        """
+        if self._glyph_matrix is None:
+            self._glyph_matrix = np.vstack(self._glyphs)
+            self._code_array = np.array([TIRE_CODES.index(code) for code in self._codes])
+
+        # Best reference similarity per code
+        scores = np.full(len(TIRE_CODES), -1.0, dtype=np.float32)
+        np.maximum.at(scores, self._code_array, self._glyph_matrix @ glyph)
+        return scores
+
+    def badge_features(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """Locate the ring in a crop and extract the glyph vector of the code inside it
+
+        Args:
+            image: BGR (or grayscale) crop containing the badge
+
+        Returns:
+            Glyph vector, or None if no ring with text inside it was found
+        """
+        if image is None or image.size == 0:
+            return None
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        if count <= 1:
+            return None
+
+        # The ring is the largest roughly square, hollow component that covers the circle
+        # around the edge of its bounding box
+        ring = None
+        for label in sorted(range(1, count), key=lambda index: -stats[index, cv2.CC_STAT_AREA]):
+            x, y, w, h, area = stats[label]
+            if h < RING_MIN_HEIGHT * binary.shape[0] or not RING_ASPECT_RANGE[0] <= w / h <= RING_ASPECT_RANGE[1] or area >= RING_MAX_FILL * w * h:
+                continue
+            radius = self._radius(w, h)
+            edge = (radius > (0.5 - RING_STROKE) ** 2) & (radius < 0.25)
+            if np.mean(labels[y:y + h, x:x + w][edge] == label) >= RING_MIN_COVERAGE:
+                ring = (x, y, w, h)
+                break
+        if ring is None:
+            return None
+
+        # Keep only the text inside the ring, in the ring's frame so its size and position relative
+        # to the ring count. On small screenshots the code can touch the ring, so the two are
+        # separated by distance from the centre rather than as components
+        x, y, w, h = ring
+        text = np.where(self._radius(w, h) < RING_TEXT_RADIUS ** 2, binary[y:y + h, x:x + w], 0).astype(np.uint8)
+        return self._vectorize(text)
+
+    @staticmethod
+    def _radius(width: int, height: int) -> np.ndarray:
+        """Squared distance of each pixel from the centre of a box, relative to its size"""
+        ys, xs = np.mgrid[0:height, 0:width]
+        return ((xs - (width - 1) / 2) / width) ** 2 + ((ys - (height - 1) / 2) / height) ** 2
+
+    @staticmethod
+    def _vectorize(text: np.ndarray) -> Optional[np.ndarray]:
+        """Normalise the text inside the ring into a zero-mean unit-length feature vector"""
+        resized = cv2.resize(text, BADGE_GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+        vector = resized.ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+
+_default_classifier = None
+_default_classifier_lock = threading.Lock()
+
+
+def get_tire_badge_classifier() -> TireBadgeClassifier:
+    """Get the shared classifier, building it on first use
+
+    Returns:
+        TireBadgeClassifier with the labelled crops, and rendered references
+        for codes no crop covers yet
+    """
+    global _default_classifier
+    if _default_classifier is None:
+        with _default_classifier_lock:
+            if _default_classifier is None:
+                classifier = TireBadgeClassifier()
+                classifier.load_labelled_crops(DEFAULT_REFERENCE_DIR)
+                classifier.add_rendered_references(skip=tuple(classifier.codes))
+                _default_classifier = classifier
+    return _default_classifier
@@ -0,0 +1,131 @@
+# services/vehicle_matcher.py
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Anything that isn't a letter or digit separates words
+NON_WORD_PATTERN = re.compile(r'[^0-9a-z]+')
+
+# Characters OCR commonly confuses are folded together on both sides of a match
+OCR_CONFUSABLES = str.maketrans({'l': 'i', '1': 'i', '|': 'i', '0': 'o'})
+
+# Score a confident match needs, and its lead over the runner-up
+DEFAULT_MIN_SCORE = 0.45
+DEFAULT_MIN_MARGIN = 0.1
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase a vehicle name, fold OCR confusables and reduce punctuation and whitespace to single spaces"""
+    return NON_WORD_PATTERN.sub(' ', text.lower().translate(OCR_CONFUSABLES)).strip()
+
+
+def name_trigrams(text: str) -> Set[str]:
+    """Trigrams of each word padded with spaces, as PostgreSQL's pg_trgm makes them
+
+    Padding gives word starts and ends trigrams of their own, so a short
+    word like "gt" still contributes "  g", " gt" and "gt ".
+    """
+    trigrams = set()
+    for word in normalize_name(text).split():
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class VehicleNameIndex:
+    """In-memory trigram index for matching noisy OCR text to vehicle names
+
+    Each name's trigrams are stored in an inverted index of position
+    arrays, so a lookup counts shared trigrams with one np.bincount over
+    the text's postings and scores every name by trigram similarity
+    (shared / union, 0-1) in a single array pass. OCR mistakes such as
+    a dropped apostrophe or an "0" read as "O" only cost the trigrams
+    around them, where exact or prefix matching would miss entirely.
+    """
+
+    def __init__(self, names: Iterable[Tuple[Any, str]]):
+        """Build the index
+
+        Args:
+            names: (key, name) pairs, e.g. vehicle ids and names
+        """
+        self._keys: List[Any] = []
+        self._names: List[str] = []
+        sizes: List[int] = []
+        postings: Dict[str, List[int]] = {}
+
+        for key, name in names:
+            trigrams = name_trigrams(name)
+            if not trigrams:
+                continue
+            position = len(self._keys)
+            self._keys.append(key)
+            self._names.append(name)
+            sizes.append(len(trigrams))
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(position)
+
+        self._sizes = np.array(sizes, dtype=np.float64)
+        self._postings: Dict[str, np.ndarray] = {
+            trigram: np.array(positions, dtype=np.int32) for trigram, positions in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def match(self, text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[Any, str, float]]:
+        """Rank names by trigram similarity to the text
+
+        Args:
+            text: OCR'd vehicle name
+            limit: Most candidates to return
+            min_score: Candidates scoring below this are left out
+
+        Returns:
+            List of (key, name, score) tuples, best first
+        """
+        query = name_trigrams(text or '')
+        if not query:
+            return []
+
+        postings = [self._postings[trigram] for trigram in query if trigram in self._postings]
+        if not postings:
+            return []
+
+        # Shared trigram count per name, then similarity against every name at once
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._keys))
+        scores = shared / (len(query) + self._sizes - shared)
+
+        # Partial sort: only the top candidates are ordered
+        count = min(limit, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return [
+            (self._keys[position], self._names[position], round(float(scores[position]), 3))
+            for position in top.tolist()
+            if scores[position] > 0 and scores[position] >= min_score
+        ]
+
+
+def pick_confident_match(candidates: List[Tuple[Any, str, float]], min_score: float = DEFAULT_MIN_SCORE,
+                         min_margin: float = DEFAULT_MIN_MARGIN):
+    """Return the best candidate if it is good enough to use without asking
+
+    Args:
+        candidates: Output of VehicleNameIndex.match(), best first
+        min_score: Lowest acceptable score for the best candidate
+        min_margin: Lowest acceptable lead over the second candidate
+
+    Returns:
+        The best (key, name, score) tuple, or None
+    """
+    if not candidates or candidates[0][2] < min_score:
+        return None
+    if len(candidates) > 1 and candidates[0][2] - candidates[1][2] < min_margin:
+        return None
+    return candidates[0]
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class SpringCalcConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'spring_calc'
+
+    def ready(self):
+        from .models import SpringCalculation, GearCalculation
+        from .setup_stats import record_calculation_on_commit
+
+        # Keep the per-vehicle setup statistics up to date as calculations are saved
+        post_save.connect(record_calculation_on_commit, sender=SpringCalculation, dispatch_uid='setup_stats_spring')
+        post_save.connect(record_calculation_on_commit, sender=GearCalculation, dispatch_uid='setup_stats_gear')
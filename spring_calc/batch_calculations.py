@@ -0,0 +1,294 @@
+# spring_calc/batch_calculations.py
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from django import forms
+from django.conf import settings
+from django.core.validators import MinValueValidator, MaxValueValidator
+
+from cars.models import Vehicle
+from services.batch_calculation_service import (
+    GEAR_NAMES,
+    validate_columns,
+    apply_row_rules,
+    calculate_suspension_batch,
+    calculate_gearing_batch
+)
+from .forms import SpringCalculatorForm, GearCalculatorForm
+
+logger = logging.getLogger(__name__)
+
+# Inputs read from each setup (besides 'vehicle'), validated like the calculator forms
+SUSPENSION_INPUTS = [
+    'vehicle_weight', 'front_weight_distribution',
+    'front_ride_height', 'rear_ride_height',
+    'front_downforce', 'rear_downforce',
+    'stiffness_multiplier', 'spring_frequency_offset',
+    'front_tires', 'rear_tires', 'arb_stiffness_multiplier',
+    'ou_adjustment', 'corner_entry_adjustment', 'corner_exit_adjustment',
+    'track_type', 'tire_wear_multiplier',
+    'low_speed_stability', 'high_speed_stability',
+    'rotational_g_40mph', 'rotational_g_75mph', 'rotational_g_150mph'
+]
+
+GEARING_INPUTS = [
+    'top_speed_mph', 'min_corner_speed_mph', 'tire_diameter_inches',
+    'power_hp', 'min_rpm', 'max_rpm', 'max_power_rpm',
+    'torque_kgfm', 'num_gears', 'min_corner_gear'
+]
+
+SUSPENSION_RESULTS = [
+    'front_spring_rate', 'rear_spring_rate',
+    'front_spring_frequency', 'rear_spring_frequency',
+    'front_compression', 'front_extension', 'rear_compression', 'rear_extension',
+    'front_roll_bar', 'rear_roll_bar',
+    'front_camber', 'rear_camber', 'front_toe', 'rear_toe'
+]
+
+# Cross-field checks from SpringCalculatorForm.clean() and GearCalculatorForm.clean(), in their order
+SUSPENSION_RULES = [
+    {
+        'fields': ['front_ride_height', 'rear_ride_height'],
+        'invalid': lambda columns: np.abs(columns['front_ride_height'] - columns['rear_ride_height']) > 100,
+        'field': None,
+        'message': "Front and rear ride height difference should not exceed 100mm for optimal handling",
+    },
+]
+
+GEARING_RULES = [
+    {
+        'fields': ['min_rpm', 'max_rpm'],
+        'invalid': lambda columns: columns['min_rpm'] >= columns['max_rpm'],
+        'field': 'min_rpm',
+        'message': "Minimum RPM must be less than maximum RPM.",
+    },
+    {
+        'fields': ['max_power_rpm', 'max_rpm'],
+        'invalid': lambda columns: columns['max_power_rpm'] > columns['max_rpm'],
+        'field': 'max_power_rpm',
+        'message': "Maximum power RPM cannot be greater than maximum RPM.",
+    },
+    {
+        'fields': ['max_power_rpm', 'min_rpm'],
+        'invalid': lambda columns: columns['max_power_rpm'] < columns['min_rpm'],
+        'field': 'max_power_rpm',
+        'message': "Maximum power RPM cannot be less than minimum RPM.",
+    },
+    {
+        'fields': ['top_speed_mph', 'min_corner_speed_mph'],
+        'invalid': lambda columns: columns['min_corner_speed_mph'] >= columns['top_speed_mph'],
+        'field': 'min_corner_speed_mph',
+        'message': "Corner speed must be less than top speed.",
+    },
+]
+
+BATCH_TYPES = ('suspension', 'gearing')
+
+# Setups validated and calculated together; each chunk is streamed before the next starts
+DEFAULT_BATCH_CHUNK_SIZE = 1000
+
+# Largest number of setups accepted in one request
+DEFAULT_BATCH_MAX_SETUPS = 10000
+
+# Largest request body read, in bytes - a full batch of setups is well under this
+DEFAULT_BATCH_MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+def build_field_specs(form_class, names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Build validate_columns() field specs from a calculator form and its model
+
+    Range limits are the tighter of the form field's and the model field's
+    validators; together with SUSPENSION_RULES and GEARING_RULES the batch
+    accepts what the form and the model would. Inputs left out of a setup fall back to the model field default.
+
+    Args:
+        form_class: Calculator ModelForm class
+        names: Input field names
+
+    Returns:
+        Field specs keyed by field name
+    """
+    model = form_class._meta.model
+    specs = {}
+    for name in names:
+        form_field = form_class.base_fields[name]
+        model_field = model._meta.get_field(name)
+
+        # FloatField subclasses IntegerField, so it is checked first
+        if isinstance(form_field, forms.ChoiceField):
+            kind = 'choice'
+        elif isinstance(form_field, forms.FloatField):
+            kind = 'float'
+        else:
+            kind = 'int'
+
+        spec = {
+            'kind': kind,
+            'required': form_field.required,
+            'default': model_field.default if model_field.has_default() and not callable(model_field.default) else None,
+            'min': None,
+            'max': None,
+            'choices': [choice for choice, _ in form_field.choices] if kind == 'choice' else None,
+        }
+
+        for validator in list(form_field.validators) + list(model_field.validators):
+            if isinstance(validator, MinValueValidator):
+                spec['min'] = validator.limit_value if spec['min'] is None else max(spec['min'], validator.limit_value)
+            elif isinstance(validator, MaxValueValidator):
+                spec['max'] = validator.limit_value if spec['max'] is None else min(spec['max'], validator.limit_value)
+
+        specs[name] = spec
+    return specs
+
+
+_field_specs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+
+def get_field_specs(batch_type: str) -> Dict[str, Dict[str, Any]]:
+    """Get the (cached) field specs for a batch type, including the vehicle id"""
+    if batch_type not in _field_specs:
+        if batch_type == 'suspension':
+            specs = build_field_specs(SpringCalculatorForm, SUSPENSION_INPUTS)
+        else:
+            specs = build_field_specs(GearCalculatorForm, GEARING_INPUTS)
+        specs['vehicle'] = {'kind': 'int', 'required': True, 'default': None, 'min': 1, 'max': None, 'choices': None}
+        _field_specs[batch_type] = specs
+    return _field_specs[batch_type]
+
+
+def stream_batch_results(setups: List[Any], default_type: str = 'suspension',
+                         chunk_size: Optional[int] = None) -> Iterator[str]:
+    """Validate and calculate setups in chunks, yielding one NDJSON line per setup
+
+    Results are not saved as calculations. Lines come out in input order
+    and carry the setup's index (and its 'id', if it had one) so clients
+    can match them up while the response is still streaming.
+
+    Args:
+        setups: Setup input dicts; each may set 'type' to 'suspension' or 'gearing'
+        default_type: Type of setups that don't set one
+        chunk_size: Setups per chunk, defaults to BATCH_CALCULATION_CHUNK_SIZE
+
+    Yields:
+        JSON encoded result lines ending in a newline
+    """
+    chunk_size = chunk_size or getattr(settings, 'BATCH_CALCULATION_CHUNK_SIZE', DEFAULT_BATCH_CHUNK_SIZE)
+
+    for start in range(0, len(setups), chunk_size):
+        chunk = setups[start:start + chunk_size]
+        lines: List[Optional[Dict[str, Any]]] = [None] * len(chunk)
+
+        # Group the chunk by type so each type is calculated in one array pass
+        groups: Dict[str, List[int]] = {batch_type: [] for batch_type in BATCH_TYPES}
+        for offset, setup in enumerate(chunk):
+            batch_type = setup.get('type', default_type) if isinstance(setup, dict) else default_type
+            if not isinstance(batch_type, str) or batch_type not in groups:
+                lines[offset] = _error_line(start + offset, setup, batch_type, {
+                    'type': [f"Select a valid choice. {batch_type} is not one of the available choices."]
+                })
+                continue
+            groups[batch_type].append(offset)
+
+        for batch_type, offsets in groups.items():
+            if not offsets:
+                continue
+            try:
+                records = [chunk[offset] for offset in offsets]
+                for position, line in enumerate(_calculate_group(batch_type, records)):
+                    offset = offsets[position]
+                    line = {'index': start + offset, **line}
+                    if isinstance(chunk[offset], dict) and 'id' in chunk[offset]:
+                        line['id'] = chunk[offset]['id']
+                    lines[offset] = line
+            except Exception as e:
+                logger.error(f"Error calculating {batch_type} batch: {str(e)}")
+                for offset in offsets:
+                    lines[offset] = {
+                        'index': start + offset,
+                        'type': batch_type,
+                        'success': False,
+                        'error': str(e),
+                        'message': "An error occurred during calculation"
+                    }
+
+        for line in lines:
+            yield json.dumps(line) + '\n'
+
+
+def _calculate_group(batch_type: str, records: List[Any]) -> List[Dict[str, Any]]:
+    """Validate and calculate setups of a single type, returning unindexed result lines"""
+    columns, errors = validate_columns(records, get_field_specs(batch_type))
+
+    # Fetch every referenced vehicle in one query
+    vehicle_ids = columns['vehicle']
+    vehicles = Vehicle.objects.in_bulk(
+        {int(vehicle_id) for vehicle_id in vehicle_ids[np.isfinite(vehicle_ids)] if vehicle_id == int(vehicle_id)}
+    )
+    for index, vehicle_id in enumerate(vehicle_ids):
+        if 'vehicle' not in errors[index] and int(vehicle_id) not in vehicles:
+            errors[index]['vehicle'] = ["Select a valid choice. That choice is not one of the available choices."]
+
+    # The forms' clean() checks between fields, reported like form errors
+    apply_row_rules(columns, errors, SUSPENSION_RULES if batch_type == 'suspension' else GEARING_RULES)
+
+    valid = np.array([not row_errors for row_errors in errors], dtype=bool)
+    lines = [
+        {'type': batch_type, 'success': False, 'errors': row_errors, 'message': "Invalid form data"}
+        for row_errors in errors
+    ]
+    if not valid.any():
+        return lines
+
+    # Calculate the valid rows only, with the vehicle columns alongside the inputs
+    columns = {name: column[valid] for name, column in columns.items()}
+    row_vehicles = [vehicles[int(vehicle_id)] for vehicle_id in columns['vehicle']]
+
+    if batch_type == 'suspension':
+        columns['front_lever_ratio'] = np.array([vehicle.lever_ratio_front for vehicle in row_vehicles], dtype=np.float64)
+        columns['rear_lever_ratio'] = np.array([vehicle.lever_ratio_rear for vehicle in row_vehicles], dtype=np.float64)
+        columns['drivetrain'] = np.array([vehicle.drivetrain for vehicle in row_vehicles], dtype=object)
+        columns['car_type'] = np.array([vehicle.car_type for vehicle in row_vehicles], dtype=object)
+        results = calculate_suspension_batch(columns)
+        rows = _suspension_rows(results)
+    else:
+        columns['weight_kg'] = np.array([vehicle.base_weight or 1400 for vehicle in row_vehicles], dtype=np.float64)
+        results = calculate_gearing_batch(columns)
+        rows = _gearing_rows(results)
+
+    for index, row in zip(np.flatnonzero(valid), rows):
+        lines[index] = {'type': batch_type, 'success': True, 'results': row}
+    return lines
+
+
+def _suspension_rows(results: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Turn suspension result arrays into one dict per setup"""
+    columns = [results[name].tolist() for name in SUSPENSION_RESULTS]
+    return [dict(zip(SUSPENSION_RESULTS, values)) for values in zip(*columns)]
+
+
+def _gearing_rows(results: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Turn gearing result arrays into one dict per setup"""
+    rows = []
+    for ratios, speeds, final_drive, top_speed, acceleration, gears in zip(
+        results['gear_ratios'].tolist(), results['gear_speeds'].tolist(),
+        results['final_drive'].tolist(), results['top_speed_mph'].tolist(),
+        results['acceleration_estimate'].tolist(), np.isfinite(results['gear_ratios']).sum(axis=1).tolist()
+    ):
+        rows.append({
+            'gear_ratios': dict(zip(GEAR_NAMES[:gears], ratios[:gears])),
+            'final_drive': final_drive,
+            'gear_speeds': dict(zip(GEAR_NAMES[:gears], speeds[:gears])),
+            'top_speed_mph': top_speed,
+            'acceleration_estimate': acceleration,
+        })
+    return rows
+
+
+def _error_line(index: int, setup: Any, batch_type: Any, errors: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Result line for a setup that couldn't be validated"""
+    line = {'index': index, 'type': batch_type, 'success': False, 'errors': errors, 'message': "Invalid form data"}
+    if isinstance(setup, dict) and 'id' in setup:
+        line['id'] = setup['id']
+    return line
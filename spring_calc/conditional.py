@@ -0,0 +1,141 @@
+# spring_calc/conditional.py
+import hashlib
+import json
+import logging
+from functools import wraps
+from typing import Any, Callable, List, Optional
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import condition
+
+from cars.catalog import get_vehicle_catalog
+from .derived import DERIVED_RESULTS_VERSION
+from .workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+# Default lifetime of cached template fragments, overridden with TEMPLATE_FRAGMENT_CACHE_SECONDS
+DEFAULT_FRAGMENT_CACHE_SECONDS = 600
+
+
+def get_fragment_cache_seconds() -> int:
+    """Lifetime of cached template fragments (their keys change with the data, so this only bounds memory)"""
+    return getattr(settings, 'TEMPLATE_FRAGMENT_CACHE_SECONDS', DEFAULT_FRAGMENT_CACHE_SECONDS)
+
+
+def make_etag(request, *parts: Any) -> Optional[str]:
+    """Hash everything a page's representation depends on into an ETag
+
+    The CSRF cookie is always included, since pages embed a token for it.
+    No ETag is made while flash messages are waiting to be shown, so those
+    responses are always rendered.
+
+    Args:
+        request: HttpRequest
+        parts: JSON serializable values the page is rendered from
+
+    Returns:
+        ETag value, or None if the response must not be revalidated
+    """
+    storage = getattr(request, '_messages', None)
+    if storage is not None and len(storage):
+        return None
+
+    parts = list(parts) + [request.COOKIES.get(settings.CSRF_COOKIE_NAME)]
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return digest[:24]
+
+
+def workspace_parts(request) -> List[Any]:
+    """ETag parts identifying the session's calculations and vehicle
+
+    Calculations are never edited after they are saved, so their ids (and
+    the derived results version they are shown with) stand for their
+    contents; the vehicle is identified by its id and updated_at.
+    """
+    workspace = get_workspace(request)
+    spring_calculation = workspace.spring_calculation
+    gear_calculation = workspace.gear_calculation
+    vehicle = workspace.vehicle
+
+    return [
+        spring_calculation.id if spring_calculation else None,
+        gear_calculation.id if gear_calculation else None,
+        [vehicle.id, vehicle.updated_at] if vehicle else None,
+        DERIVED_RESULTS_VERSION,
+    ]
+
+
+def workspace_etag(*session_keys: str, include_catalog: bool = False) -> Callable:
+    """Build an etag_func for a page rendered from the workspace
+
+    Args:
+        session_keys: Other session values the page is rendered from
+        include_catalog: Whether the page renders the vehicle select
+
+    Returns:
+        Function taking the request and returning the ETag (or None)
+    """
+    def etag_func(request) -> Optional[str]:
+        parts = workspace_parts(request)
+        parts.append({key: request.session.get(key) for key in session_keys})
+        if include_catalog:
+            parts.append(get_vehicle_catalog().etag)
+        return make_etag(request, request.resolver_match.view_name if request.resolver_match else None, *parts)
+
+    return etag_func
+
+
+def workspace_last_modified(request):
+    """Newest of the session's calculations and its vehicle's last update
+
+    Only used for pages rendered from nothing but the workspace; the ETag
+    takes precedence whenever the client sends both validators.
+    """
+    workspace = get_workspace(request)
+    timestamps = [
+        obj.created_at
+        for obj in (workspace.spring_calculation, workspace.gear_calculation)
+        if obj is not None
+    ]
+    if workspace.vehicle is not None:
+        timestamps.append(workspace.vehicle.updated_at)
+    return max(timestamps) if timestamps else None
+
+
+def conditional_page(etag_func: Callable, last_modified_func: Optional[Callable] = None) -> Callable:
+    """Answer repeat GETs with 304 Not Modified while the page's inputs are unchanged
+
+    Wraps django.views.decorators.http.condition and marks the response
+    private, must-revalidate-every-time, since it is built from the
+    session.
+    """
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+    return decorator
+
+
+def not_modified_response(request, etag: Optional[str]):
+    """Return a 304 response if the client's copy matches etag, for views that compute their own ETag"""
+    if etag is None or request.method not in ('GET', 'HEAD'):
+        return None
+    return get_conditional_response(request, etag=f'"{etag}"')
+
+
+def set_page_validators(response, etag: Optional[str]):
+    """Add the ETag and cache headers that pair with not_modified_response()"""
+    if etag is not None and response.status_code == 200:
+        response['ETag'] = f'"{etag}"'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -45,29 +45,9 @@ def require_vehicle_selection(view_func):
     """
     @wraps(view_func)
     def wrapped(request, *args, **kwargs):
-        # Check if vehicle is selected in session
-        vehicle_id = None
-        
-        if 'ocr_data' in request.session and 'vehicle' in request.session['ocr_data']:
-            vehicle_id = request.session['ocr_data']['vehicle']
-        
-        # Also check spring_calculation_id and retrieve vehicle
-        elif 'spring_calculation_id' in request.session:
-            from .models import SpringCalculation
-            try:
-                spring_calculation = SpringCalculation.objects.get(id=request.session['spring_calculation_id'])
-                vehicle_id = spring_calculation.vehicle.id
-            except SpringCalculation.DoesNotExist:
-                pass
-        
-        # Check gear_calculation_id as well
-        elif 'gear_calculation_id' in request.session:
-            from .models import GearCalculation
-            try:
-                gear_calculation = GearCalculation.objects.get(id=request.session['gear_calculation_id'])
-                vehicle_id = gear_calculation.vehicle.id
-            except GearCalculation.DoesNotExist:
-                pass
+        # Resolve the selected vehicle once; views reuse the same workspace
+        from .workspace import get_workspace
+        vehicle_id = get_workspace(request).vehicle_id
         
         if not vehicle_id and request.method != 'POST':
             # No vehicle selected, redirect to upload screenshot
@@ -0,0 +1,141 @@
+# spring_calc/derived.py
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.calculation_service import calculate_damper_settings
+from services.gear_service import generate_gear_speeds, generate_torque_curve
+
+logger = logging.getLogger(__name__)
+
+# Bump when a derived value's formula changes; older rows are recomputed on their next read
+DERIVED_RESULTS_VERSION = 1
+
+SPRING_DERIVED_FIELDS = ['front_compression', 'front_extension', 'rear_compression', 'rear_extension', 'derived_version']
+GEAR_DERIVED_FIELDS = ['gear_speeds', 'engine_data', 'derived_version']
+
+
+def generate_engine_data(min_rpm, max_rpm, max_power_rpm, torque_kgfm, power_hp, num_points=10):
+    """
+    Generate engine performance data for display in the table
+
+    Returns:
+        list of dicts with RPM, Torque, and Power values
+    """
+    # Generate torque curve data
+    torque_curve = generate_torque_curve(
+        min_rpm=min_rpm,
+        max_rpm=max_rpm,
+        max_power_rpm=max_power_rpm,
+        torque_kgfm=torque_kgfm,
+        power_hp=power_hp,
+        num_points=num_points
+    )
+
+    # Calculate power values
+    engine_data = []
+
+    for rpm, torque in torque_curve:
+        # Calculate power (HP) at this RPM point
+        # Power (HP) = Torque (kg·m) × RPM / 5252 × 7.124
+        # 7.124 is the conversion factor from kg·m to lb·ft
+        power = (torque * rpm / 5252) * 7.124
+
+        # Convert torque from kg·m to ft·lb
+        torque_ftlb = torque * 7.233
+
+        engine_data.append({
+            'RPM': int(rpm),
+            'Torque_kgfm': float(torque),
+            'Torque_ftlb': float(torque_ftlb),
+            'Power_hp': float(power)
+        })
+
+    return engine_data
+
+
+def set_spring_derived_results(calculation, damper_settings: Optional[Dict[str, int]] = None) -> None:
+    """Store the damper settings on a spring calculation (without saving it)
+
+    Args:
+        calculation: SpringCalculation with its spring rates set
+        damper_settings: Already calculated damper settings, calculated here if None
+    """
+    if damper_settings is None:
+        damper_settings = calculate_damper_settings(
+            spring_rates=(calculation.front_spring_rate, calculation.rear_spring_rate),
+            vehicle_weight=calculation.vehicle_weight,
+            front_weight_distribution=calculation.front_weight_distribution,
+            corner_entry_adjustment=calculation.corner_entry_adjustment,
+            corner_exit_adjustment=calculation.corner_exit_adjustment,
+            front_tire_type=calculation.front_tires,
+            rear_tire_type=calculation.rear_tires
+        )
+
+    calculation.front_compression = damper_settings['front_compression']
+    calculation.front_extension = damper_settings['front_extension']
+    calculation.rear_compression = damper_settings['rear_compression']
+    calculation.rear_extension = damper_settings['rear_extension']
+    calculation.derived_version = DERIVED_RESULTS_VERSION
+
+
+def set_gear_derived_results(calculation, gear_speeds: Optional[Dict[str, float]] = None,
+                             engine_data: Optional[List[Dict[str, Any]]] = None) -> None:
+    """Store the gear speeds and engine table on a gear calculation (without saving it)
+
+    Args:
+        calculation: GearCalculation with its gear ratios and final drive set
+        gear_speeds: Already calculated gear speeds, calculated here if None
+        engine_data: Engine table digitized from the power screenshot, estimated
+            from the calculation's power figures if None
+    """
+    gear_speeds_data: Optional[Dict[str, float]] = None
+    engine_data_table: Optional[List[Dict[str, Any]]] = None
+
+    if calculation.gear_ratios and calculation.final_drive:
+        if gear_speeds is None:
+            gear_speeds = generate_gear_speeds(
+                gear_ratios=calculation.gear_ratios,
+                final_drive=calculation.final_drive,
+                max_power_rpm=calculation.max_power_rpm,
+                tire_diameter_inches=calculation.tire_diameter_inches
+            )
+        gear_speeds_data = gear_speeds
+
+        engine_data_table = engine_data or generate_engine_data(
+            min_rpm=calculation.min_rpm,
+            max_rpm=calculation.max_rpm,
+            max_power_rpm=calculation.max_power_rpm,
+            torque_kgfm=calculation.torque_kgfm,
+            power_hp=calculation.power_hp
+        )
+
+    calculation.gear_speeds = gear_speeds_data
+    calculation.engine_data = engine_data_table
+    calculation.derived_version = DERIVED_RESULTS_VERSION
+
+
+def ensure_derived_results(calculation) -> None:
+    """Compute and save a calculation's derived results if they are missing or stale
+
+    Rows saved before the derived fields existed (or under an older
+    DERIVED_RESULTS_VERSION) are brought up to date on their first read,
+    so every later read is a plain field access.
+
+    Args:
+        calculation: SpringCalculation or GearCalculation
+    """
+    if calculation is None or calculation.derived_version == DERIVED_RESULTS_VERSION:
+        return
+
+    from .models import SpringCalculation
+
+    try:
+        if isinstance(calculation, SpringCalculation):
+            set_spring_derived_results(calculation)
+            calculation.save(update_fields=SPRING_DERIVED_FIELDS)
+        else:
+            set_gear_derived_results(calculation)
+            calculation.save(update_fields=GEAR_DERIVED_FIELDS)
+        logger.debug(f"Stored derived results for {type(calculation).__name__} {calculation.id}")
+    except Exception as e:
+        logger.error(f"Error storing derived results for {type(calculation).__name__} {calculation.id}: {str(e)}")
@@ -2,6 +2,7 @@
 from django import forms
 from django.core.validators import MinValueValidator, MaxValueValidator
 from cars.models import Vehicle
+from cars.catalog import get_vehicle_catalog
 from .models import SpringCalculation, TireSizeCalculation, GearCalculation, SavedSetup
 
 class BaseForm(forms.ModelForm):
@@ -25,6 +26,11 @@ class BaseForm(forms.ModelForm):
                 field.widget.attrs.update({'class': 'form-check-input'})
             elif isinstance(field.widget, forms.FileInput):
                 field.widget.attrs.update({'class': 'form-control'})
+        
+        # Render the vehicle select from the cached catalog instead of querying every vehicle
+        vehicle_field = self.fields.get('vehicle')
+        if isinstance(vehicle_field, forms.ModelChoiceField) and vehicle_field.queryset.model is Vehicle:
+            vehicle_field.choices = [('', vehicle_field.empty_label)] + get_vehicle_catalog().choices()
 
 # Define tire type choices
 TIRE_TYPE_CHOICES = [
@@ -0,0 +1,163 @@
+# spring_calc/history.py
+import atexit
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Model
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden with the HISTORY_* settings
+DEFAULT_FLUSH_ROWS = 100
+DEFAULT_FLUSH_SECONDS = 5.0
+DEFAULT_MAX_PENDING_ROWS = 10000
+
+# Rows per INSERT statement when a flush is written
+BULK_CREATE_BATCH_SIZE = 500
+
+
+class HistoryRecorder:
+    """Write-behind recorder for calculation history rows
+
+    Rows nobody reads back during the request (e.g. TireSizeCalculation)
+    are queued in memory and inserted with bulk_create by a daemon thread
+    once HISTORY_FLUSH_ROWS rows are pending or the oldest has waited
+    HISTORY_FLUSH_SECONDS, so the request never waits on SQLite's write
+    lock for them. Pending rows are flushed at interpreter exit.
+
+    auto_now_add fields are stamped when a row is flushed, so they can lag
+    the request by up to the flush interval.
+    """
+
+    def __init__(self, flush_rows: int = DEFAULT_FLUSH_ROWS, flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 max_pending_rows: int = DEFAULT_MAX_PENDING_ROWS, enabled: bool = True):
+        """Initialize the recorder
+
+        Args:
+            flush_rows: Pending row count that triggers a flush
+            flush_seconds: Longest a row waits before it is flushed
+            max_pending_rows: Rows beyond this are dropped rather than queued
+            enabled: If False, rows are saved synchronously instead
+        """
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_pending_rows = max_pending_rows
+        self.enabled = enabled
+
+        self.dropped = 0
+        self.written = 0
+
+        self._pending: List[Model] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, instance: Model) -> bool:
+        """Queue an unsaved model instance to be inserted
+
+        Args:
+            instance: Unsaved model instance; it must not be modified after it is queued
+
+        Returns:
+            True if the row was queued (or saved)
+        """
+        if not self.enabled:
+            instance.save()
+            return True
+
+        self._ensure_worker()
+        with self._lock:
+            if len(self._pending) >= self.max_pending_rows:
+                self.dropped += 1
+                logger.warning(f"History queue full, dropped {type(instance).__name__} row")
+                return False
+
+            self._pending.append(instance)
+            pending = len(self._pending)
+
+        if pending >= self.flush_rows:
+            self._wake.set()
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Number of rows waiting to be flushed"""
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Insert every pending row now, on the calling thread
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+
+            # One bulk_create per model, keeping each model's rows in arrival order
+            by_model: Dict[type, List[Model]] = {}
+            for row in rows:
+                by_model.setdefault(type(row), []).append(row)
+
+            written = 0
+            for model, model_rows in by_model.items():
+                try:
+                    model.objects.bulk_create(model_rows, batch_size=BULK_CREATE_BATCH_SIZE)
+                    written += len(model_rows)
+                except Exception as e:
+                    self.dropped += len(model_rows)
+                    logger.error(f"Error writing {len(model_rows)} {model.__name__} history rows: {str(e)}")
+
+            self.written += written
+            logger.debug(f"Flushed {written} history rows")
+            return written
+
+    def _ensure_worker(self) -> None:
+        """Start the flush thread on first use"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='history-recorder', daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        """Flush on the row threshold or the time limit, whichever comes first"""
+        while True:
+            self._wake.wait(timeout=self.flush_seconds)
+            self._wake.clear()
+            if not self._pending:
+                continue
+
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing history rows: {str(e)}")
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_history_recorder() -> HistoryRecorder:
+    """Get the process-wide history recorder, configured from the HISTORY_* settings"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                recorder = HistoryRecorder(
+                    flush_rows=getattr(settings, 'HISTORY_FLUSH_ROWS', DEFAULT_FLUSH_ROWS),
+                    flush_seconds=getattr(settings, 'HISTORY_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS),
+                    max_pending_rows=getattr(settings, 'HISTORY_MAX_PENDING_ROWS', DEFAULT_MAX_PENDING_ROWS),
+                    enabled=getattr(settings, 'HISTORY_WRITE_BEHIND', True)
+                )
+                # Write out whatever is still queued on a clean shutdown
+                atexit.register(recorder.flush)
+                _recorder = recorder
+    return _recorder
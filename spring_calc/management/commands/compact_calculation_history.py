@@ -0,0 +1,58 @@
+# spring_calc/management/commands/compact_calculation_history.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from spring_calc.retention import compact_calculation_history
+
+
+class Command(BaseCommand):
+    help = ('Deduplicate identical calculations, delete unreferenced ones past the retention window '
+            'and VACUUM/ANALYZE the database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Keep unreferenced calculations this many days (default: CALCULATION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows handled per transaction (default: CALCULATION_RETENTION_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be removed without changing anything')
+        parser.add_argument('--no-vacuum', action='store_true',
+                            help='Skip the final VACUUM/ANALYZE')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['retention_days'] is not None and kwargs['retention_days'] < 1:
+            raise CommandError('--retention-days must be at least 1')
+        if kwargs['batch_size'] is not None and kwargs['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        verbosity = kwargs['verbosity']
+        started = time.perf_counter()
+
+        def progress(message):
+            if verbosity >= 2:
+                self.stderr.write(message)
+
+        report = compact_calculation_history(
+            retention_days=kwargs['retention_days'],
+            batch_size=kwargs['batch_size'],
+            dry_run=kwargs['dry_run'],
+            vacuum=not kwargs['no_vacuum'],
+            progress=progress
+        )
+        vacuumed = report.pop('vacuumed')
+        stats_rebuilt = report.pop('stats_rebuilt')
+
+        elapsed = time.perf_counter() - started
+        prefix = 'Would remove' if kwargs['dry_run'] else 'Removed'
+        for model_name, counts in report.items():
+            self.stdout.write(
+                f"{model_name}: {prefix.lower()} {counts['duplicates']} duplicates and {counts['expired']} expired rows, "
+                f"{counts['repointed']} saved setups repointed"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {sum(counts['duplicates'] + counts['expired'] for counts in report.values())} calculations "
+            f"in {elapsed:.1f}s{' (database vacuumed)' if vacuumed else ''}"
+        ))
+        if stats_rebuilt:
+            self.stdout.write(f"Setup statistics rebuilt for {stats_rebuilt} vehicles")
@@ -0,0 +1,148 @@
+# spring_calc/management/commands/ocr_screenshots.py
+import os
+import sys
+import glob
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.screenshot_context import ScreenshotContext
+from services.screenshot_classifier import classify_screenshot
+from spring_calc.ocr_jobs import SCREENSHOT_FIELDS, extract_context_data
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+# File name keywords used when the image itself can't be classified
+NAME_KEYWORDS = {
+    'suspension': ('suspension', 'susp'),
+    'power': ('power', 'engine', 'torque'),
+    'transmission': ('transmission', 'gearbox', 'gear', 'trans'),
+}
+
+
+def classify_by_name(path):
+    """Guess the screenshot type from its file or directory name, or None"""
+    name = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path)).lower()
+    for screenshot_type, keywords in NAME_KEYWORDS.items():
+        if any(keyword in name for keyword in keywords):
+            return screenshot_type
+    return None
+
+
+def ocr_file(path, screenshot_type=None):
+    """Classify and OCR a single screenshot (runs in a worker process)
+
+    Args:
+        path: Path to the screenshot
+        screenshot_type: Type to use, classified from the image (or its name) if None
+
+    Returns:
+        JSON-serializable result record
+    """
+    started = time.perf_counter()
+    record = {'file': path, 'type': screenshot_type, 'status': 'ok', 'data': {}, 'timings_ms': {}}
+
+    try:
+        context = ScreenshotContext(path)
+
+        if record['type'] is None:
+            record['type'], record['classification_score'] = classify_screenshot(context)
+            if record['type'] is None:
+                record['type'] = classify_by_name(path)
+        record['timings_ms']['classify'] = round((time.perf_counter() - started) * 1000, 2)
+
+        if record['type'] is None:
+            record['status'] = 'unclassified'
+            return record
+
+        ocr_started = time.perf_counter()
+        record['data'] = extract_context_data(record['type'], context)
+        record['timings_ms']['ocr'] = round((time.perf_counter() - ocr_started) * 1000, 2)
+
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+
+    finally:
+        record['timings_ms']['total'] = round((time.perf_counter() - started) * 1000, 2)
+
+    return record
+
+
+class Command(BaseCommand):
+    help = 'Run OCR on a directory or glob of GT7 screenshots and write the results as JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', type=str, help='Screenshot files, directories or glob patterns')
+        parser.add_argument('--type', choices=sorted(SCREENSHOT_FIELDS), default=None,
+                            help='Screenshot type for every file (default: classify each file)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (1 runs in this process)')
+        parser.add_argument('--output', type=str, default=None,
+                            help='JSON Lines output file (default: stdout)')
+        parser.add_argument('--recursive', action='store_true', help='Search directories recursively')
+
+    def handle(self, *args, **kwargs):
+        files = self.collect_files(kwargs['paths'], kwargs['recursive'])
+        if not files:
+            raise CommandError('No screenshots found')
+
+        workers = max(1, kwargs['workers'])
+        screenshot_type = kwargs['type']
+
+        output = open(kwargs['output'], 'w', encoding='utf-8') if kwargs['output'] else sys.stdout
+        counts = {}
+        started = time.perf_counter()
+
+        self.stderr.write(f'Processing {len(files)} screenshots with {workers} worker(s)')
+
+        try:
+            for record in self.process_files(files, screenshot_type, workers):
+                # Stream each result as soon as it is ready
+                output.write(json.dumps(record, default=str) + '\n')
+                output.flush()
+                counts[record['status']] = counts.get(record['status'], 0) + 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(counts.items()))
+        self.stderr.write(self.style.SUCCESS(
+            f'Processed {len(files)} screenshots in {elapsed:.1f}s ({summary})'
+        ))
+
+    def process_files(self, files, screenshot_type, workers):
+        """Yield result records as files finish processing"""
+        if workers == 1:
+            for path in files:
+                yield ocr_file(path, screenshot_type)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(ocr_file, path, screenshot_type): path for path in files}
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker process died (e.g. out of memory)
+                    yield {'file': futures[future], 'type': screenshot_type, 'status': 'error', 'error': str(e)}
+
+    @staticmethod
+    def collect_files(paths, recursive):
+        """Expand files, directories and glob patterns into a sorted list of images"""
+        files = set()
+        for path in paths:
+            if os.path.isdir(path):
+                pattern = os.path.join(path, '**', '*') if recursive else os.path.join(path, '*')
+                candidates = glob.glob(pattern, recursive=recursive)
+            else:
+                candidates = glob.glob(path, recursive=recursive) or [path]
+
+            for candidate in candidates:
+                if os.path.isfile(candidate) and candidate.lower().endswith(IMAGE_EXTENSIONS):
+                    files.add(os.path.abspath(candidate))
+
+        return sorted(files)
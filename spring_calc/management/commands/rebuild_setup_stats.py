@@ -0,0 +1,38 @@
+# spring_calc/management/commands/rebuild_setup_stats.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from spring_calc.setup_stats import rebuild_setup_stats, DEFAULT_REBUILD_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-vehicle setup statistics from the calculation tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles', default=None,
+                            help='Only rebuild this vehicle id (can be repeated)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_REBUILD_CHUNK_SIZE,
+                            help='Calculations read per query')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        verbosity = kwargs['verbosity']
+        started = time.perf_counter()
+
+        def progress(model_name, rows):
+            if verbosity >= 2:
+                self.stderr.write(f'{model_name}: {rows} rows read')
+
+        vehicles = rebuild_setup_stats(
+            vehicle_ids=kwargs['vehicles'],
+            chunk_size=kwargs['chunk_size'],
+            progress=progress
+        )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt setup statistics for {vehicles} vehicles in {elapsed:.1f}s'
+        ))
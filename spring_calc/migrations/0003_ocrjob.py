@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:38
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spring_calc', '0002_alter_savedsetup_vehicle_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('screenshot_type', models.CharField(choices=[('suspension', 'Suspension'), ('power', 'Power'), ('transmission', 'Transmission')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('result', models.JSONField(blank=True, default=dict, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status'], name='spring_calc_status_84a240_idx'), models.Index(fields=['created_at'], name='spring_calc_created_12ebeb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spring_calc', '0003_ocrjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gearcalculation',
+            name='derived_version',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Version of the derived results stored with this row (0 = not computed)'),
+        ),
+        migrations.AddField(
+            model_name='gearcalculation',
+            name='engine_data',
+            field=models.JSONField(blank=True, default=list, help_text='Engine performance table rows (RPM, torque, power)', null=True),
+        ),
+        migrations.AddField(
+            model_name='gearcalculation',
+            name='gear_speeds',
+            field=models.JSONField(blank=True, default=dict, help_text='Speed (mph) at max power RPM per gear', null=True),
+        ),
+        migrations.AddField(
+            model_name='springcalculation',
+            name='derived_version',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Version of the derived results stored with this row (0 = not computed)'),
+        ),
+        migrations.AddField(
+            model_name='springcalculation',
+            name='front_compression',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='springcalculation',
+            name='front_extension',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='springcalculation',
+            name='rear_compression',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='springcalculation',
+            name='rear_extension',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
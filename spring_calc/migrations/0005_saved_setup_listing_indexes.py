@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0003_alter_vehicle_options'),
+        ('spring_calc', '0004_derived_results'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='savedsetup',
+            index=models.Index(fields=['date_saved', 'id'], name='savedsetup_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsetup',
+            index=models.Index(fields=['vehicle', 'date_saved', 'id'], name='savedsetup_vehicle_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsetup',
+            index=models.Index(fields=['user', 'date_saved', 'id'], name='savedsetup_user_listing_idx'),
+        ),
+    ]
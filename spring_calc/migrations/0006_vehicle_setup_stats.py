@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0003_alter_vehicle_options'),
+        ('spring_calc', '0005_saved_setup_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleSetupStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spring_count', models.PositiveIntegerField(default=0)),
+                ('gear_count', models.PositiveIntegerField(default=0)),
+                ('metrics', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='setup_stats', to='cars.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Vehicle setup statistics',
+                'verbose_name_plural': 'Vehicle setup statistics',
+            },
+        ),
+    ]
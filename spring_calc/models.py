@@ -1,4 +1,5 @@
 # spring_calc/models.py
+import uuid
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator, DecimalValidator
 from django.contrib.auth.models import User
@@ -202,6 +203,17 @@ class SpringCalculation(BaseCalculation):
     front_toe = models.FloatField(null=True, blank=True)
     rear_toe = models.FloatField(null=True, blank=True)
     
+    # Derived damper settings, stored at calculation time (see spring_calc.derived)
+    front_compression = models.IntegerField(null=True, blank=True)
+    front_extension = models.IntegerField(null=True, blank=True)
+    rear_compression = models.IntegerField(null=True, blank=True)
+    rear_extension = models.IntegerField(null=True, blank=True)
+    
+    derived_version = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Version of the derived results stored with this row (0 = not computed)"
+    )
+    
     def __str__(self):
         return f"Spring calculation for {self.vehicle.name}"
     
@@ -363,6 +375,26 @@ class GearCalculation(BaseCalculation):
         null=True, blank=True
     )
     
+    # Derived display data, stored at calculation time (see spring_calc.derived)
+    gear_speeds = models.JSONField(
+        blank=True, 
+        null=True, 
+        default=dict,
+        help_text="Speed (mph) at max power RPM per gear"
+    )
+    
+    engine_data = models.JSONField(
+        blank=True, 
+        null=True, 
+        default=list,
+        help_text="Engine performance table rows (RPM, torque, power)"
+    )
+    
+    derived_version = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Version of the derived results stored with this row (0 = not computed)"
+    )
+    
     def __str__(self):
         return f"Gear calculation for {self.vehicle.name}"
     
@@ -416,8 +448,86 @@ class SavedSetup(models.Model):
     
     class Meta:
         ordering = ['-date_saved']
+        # (date_saved, id) keys the keyset paginated listing, alone or after a filter
         indexes = [
             models.Index(fields=['vehicle']),
             models.Index(fields=['date_saved']),
             models.Index(fields=['user']),
-        ]
\ No newline at end of file
+            models.Index(fields=['date_saved', 'id'], name='savedsetup_listing_idx'),
+            models.Index(fields=['vehicle', 'date_saved', 'id'], name='savedsetup_vehicle_listing_idx'),
+            models.Index(fields=['user', 'date_saved', 'id'], name='savedsetup_user_listing_idx'),
+        ]
+
+class OCRJob(models.Model):
+    """Model to track background OCR processing of an uploaded screenshot"""
+    SCREENSHOT_TYPE_CHOICES = [
+        ('suspension', 'Suspension'),
+        ('power', 'Power'),
+        ('transmission', 'Transmission'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    # Public identifier handed to the client for polling
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    
+    screenshot_type = models.CharField(
+        max_length=20,
+        choices=SCREENSHOT_TYPE_CHOICES
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='queued'
+    )
+    
+    # Extracted values, merged into the session's ocr_data when polled
+    result = models.JSONField(blank=True, null=True, default=dict)
+    
+    error = models.TextField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"OCR job {self.job_id} ({self.screenshot_type}, {self.status})"
+    
+    @property
+    def is_finished(self):
+        """Return True once the job has either succeeded or failed"""
+        return self.status in ('done', 'failed')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['created_at']),
+        ]
+
+class VehicleSetupStats(models.Model):
+    """Setup statistics per vehicle, maintained by spring_calc.setup_stats"""
+    vehicle = models.OneToOneField(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='setup_stats'
+    )
+    
+    spring_count = models.PositiveIntegerField(default=0)
+    gear_count = models.PositiveIntegerField(default=0)
+    
+    # Per-metric running totals and histograms (see services.setup_stats_service)
+    metrics = models.JSONField(default=dict)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Setup statistics for {self.vehicle_id}"
+    
+    class Meta:
+        verbose_name = "Vehicle setup statistics"
+        verbose_name_plural = "Vehicle setup statistics"
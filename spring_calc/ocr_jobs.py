@@ -0,0 +1,426 @@
+# spring_calc/ocr_jobs.py
+import os
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+
+from services.calculation_service import calculate_tire_diameter
+from services.ocr_service import (
+    process_uploaded_screenshot,
+    extract_power_data_from_screenshot,
+    process_transmission_screenshot
+)
+from services.image_processing import load_screenshot
+from services.vehicle_matcher import pick_confident_match, DEFAULT_MIN_SCORE, DEFAULT_MIN_MARGIN
+from services.screenshot_context import ScreenshotContext
+from services.screenshot_classifier import classify_screenshot
+from services.debug_writer import (
+    DebugArtifactWriter,
+    get_debug_writer,
+    DEFAULT_SAMPLE_RATE,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_MAX_ARTIFACT_BYTES,
+    DEFAULT_MAX_TOTAL_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields copied into ocr_data from each screenshot type (power keeps every field)
+SUSPENSION_KEYS = [
+    'vehicle_weight', 'front_weight_distribution',
+    'front_ride_height', 'rear_ride_height',
+    'front_downforce', 'rear_downforce',
+    'low_speed_stability', 'high_speed_stability',
+    'rotational_g_40mph', 'rotational_g_75mph', 'rotational_g_150mph',
+    'performance_points', 'front_tires', 'rear_tires',
+    'vehicle_name', 'field_confidence'
+]
+
+TRANSMISSION_KEYS = [
+    'gear_ratio', 'rpm', 'speed', 'final_drive',
+    'num_gears', 'tire_diameter_inches',
+    'gear_ratios', 'gear_speeds', 'top_speed',
+    'field_confidence'
+]
+
+# Upload form field for each screenshot type
+SCREENSHOT_FIELDS = {
+    'suspension': 'suspension_screenshot',
+    'power': 'power_screenshot',
+    'transmission': 'transmission_screenshot',
+}
+
+# Ranked vehicle candidates kept in ocr_data for the vehicle picker
+VEHICLE_CANDIDATE_LIMIT = 5
+
+# Jobs still running this long after a worker picked them up are reported as failed
+# (e.g. the worker restarted); queued jobs are waiting for a free worker, not stuck
+DEFAULT_JOB_TIMEOUT_SECONDS = 300
+
+# Jobs are deleted this long after they were queued, at most once per prune interval
+DEFAULT_JOB_RETENTION_SECONDS = 24 * 60 * 60
+JOB_PRUNE_INTERVAL_SECONDS = 10 * 60
+
+
+def ocr_debug_enabled() -> bool:
+    """Return True if OCR debug output is enabled in settings"""
+    return hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR
+
+
+def get_ocr_debug_root() -> str:
+    """Directory OCR debug captures are written under
+
+    DEBUG_OCR_ROOT if set, else debug_ocr under MEDIA_ROOT. Without either
+    the captures go to the system temp directory (as ScreenshotContext does
+    for in-memory uploads), never to the working directory.
+    """
+    root = getattr(settings, 'DEBUG_OCR_ROOT', None)
+    if root:
+        return str(root)
+    if settings.MEDIA_ROOT:
+        return os.path.join(settings.MEDIA_ROOT, 'debug_ocr')
+    return os.path.join(tempfile.gettempdir(), 'gt7_tuning_debug_ocr')
+
+
+_debug_writer_configured = False
+
+
+def get_configured_debug_writer() -> DebugArtifactWriter:
+    """Get the debug artifact writer, applying the DEBUG_OCR_* settings on first use"""
+    global _debug_writer_configured
+    writer = get_debug_writer()
+    if not _debug_writer_configured:
+        writer.configure(
+            root=get_ocr_debug_root(),
+            sample_rate=getattr(settings, 'DEBUG_OCR_SAMPLE_RATE', DEFAULT_SAMPLE_RATE),
+            queue_size=getattr(settings, 'DEBUG_OCR_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+            max_artifact_bytes=getattr(settings, 'DEBUG_OCR_MAX_ARTIFACT_BYTES', DEFAULT_MAX_ARTIFACT_BYTES),
+            max_total_bytes=getattr(settings, 'DEBUG_OCR_MAX_TOTAL_BYTES', DEFAULT_MAX_TOTAL_BYTES),
+            retention_seconds=int(getattr(settings, 'DEBUG_OCR_RETENTION_DAYS', 7) * 24 * 60 * 60)
+        )
+        _debug_writer_configured = True
+    return writer
+
+
+def should_capture_debug() -> bool:
+    """Decide whether to capture debug output for a screenshot (DEBUG_OCR plus sampling)"""
+    return ocr_debug_enabled() and get_configured_debug_writer().should_sample()
+
+
+def merge_ocr_data(ocr_data: Dict[str, Any], screenshot_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge one screenshot's values into ocr_data, combining the per-field confidences
+
+    Args:
+        ocr_data: Values gathered so far (updated in place)
+        screenshot_data: Values extracted from a single screenshot
+
+    Returns:
+        The updated ocr_data
+    """
+    field_confidence = dict(ocr_data.get('field_confidence', {}))
+    field_confidence.update(screenshot_data.get('field_confidence', {}))
+
+    ocr_data.update(screenshot_data)
+    if field_confidence:
+        ocr_data['field_confidence'] = field_confidence
+    return ocr_data
+
+
+def match_ocr_vehicle(ocr_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Match the OCR'd vehicle name against the vehicle catalog
+
+    The ranked candidates are stored in ocr_data['vehicle_candidates'].
+    If no vehicle was picked by hand and the best candidate clears
+    VEHICLE_MATCH_MIN_SCORE with a VEHICLE_MATCH_MIN_MARGIN lead over the
+    next one, it becomes ocr_data['vehicle'].
+
+    Args:
+        ocr_data: Values gathered so far (updated in place)
+
+    Returns:
+        The candidate selected as the vehicle, or None
+    """
+    from cars.catalog import get_vehicle_catalog
+
+    vehicle_name = ocr_data.get('vehicle_name')
+    if not vehicle_name:
+        return None
+
+    matches = get_vehicle_catalog().name_index.match(vehicle_name, limit=VEHICLE_CANDIDATE_LIMIT)
+    ocr_data['vehicle_candidates'] = [
+        {'id': vehicle_id, 'name': name, 'score': score} for vehicle_id, name, score in matches
+    ]
+    logger.debug(f"Vehicle candidates for '{vehicle_name}': {matches}")
+
+    if ocr_data.get('vehicle'):
+        return None
+
+    best = pick_confident_match(
+        matches,
+        min_score=getattr(settings, 'VEHICLE_MATCH_MIN_SCORE', DEFAULT_MIN_SCORE),
+        min_margin=getattr(settings, 'VEHICLE_MATCH_MIN_MARGIN', DEFAULT_MIN_MARGIN)
+    )
+    if best is None:
+        return None
+
+    ocr_data['vehicle'] = best[0]
+    logger.info(f"Matched vehicle '{best[1]}' to OCR'd name '{vehicle_name}' ({best[2]:.2f})")
+    return ocr_data['vehicle_candidates'][0]
+
+
+def extract_screenshot_data(screenshot_type: str, uploaded_file) -> Dict[str, Any]:
+    """Run the OCR pipeline for a single screenshot
+
+    Args:
+        screenshot_type: 'suspension', 'power' or 'transmission'
+        uploaded_file: Django UploadedFile (or any File with chunks())
+
+    Returns:
+        Dictionary of values to merge into the session's ocr_data
+    """
+    # Only a sample of screenshots get debug output; it is written by the background writer
+    debug_mode = should_capture_debug()
+
+    debug_dir = None
+    if debug_mode:
+        debug_dir = os.path.join(get_ocr_debug_root(), datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+
+    if screenshot_type not in SCREENSHOT_FIELDS:
+        raise ValueError(f"Unknown screenshot type: {screenshot_type}")
+
+    # Decode the upload in memory once and share its derived planes between every processor
+    context = load_screenshot(uploaded_file, output_dir=debug_dir, debug_mode=debug_mode)
+
+    return extract_context_data(screenshot_type, context, debug_mode=debug_mode)
+
+
+def extract_context_data(screenshot_type: str, context: ScreenshotContext,
+                         debug_mode: bool = False) -> Dict[str, Any]:
+    """Run the OCR processor for a screenshot type on a loaded screenshot
+
+    Args:
+        screenshot_type: 'suspension', 'power' or 'transmission'
+        context: Screenshot context
+        debug_mode: Whether to save debug information
+
+    Returns:
+        Dictionary of values to merge into the session's ocr_data
+    """
+    if screenshot_type == 'suspension':
+        suspension_data = process_uploaded_screenshot(context, debug_mode=debug_mode)
+        return {key: suspension_data[key] for key in SUSPENSION_KEYS if key in suspension_data}
+
+    if screenshot_type == 'power':
+        # Keep ALL extracted fields - even if they're None
+        return dict(extract_power_data_from_screenshot(context, debug_mode=debug_mode))
+
+    if screenshot_type == 'transmission':
+        # The transmission processor reads the context's inverted plane for better OCR
+        transmission_data = process_transmission_screenshot(context, debug_mode=debug_mode)
+        data = {key: transmission_data[key] for key in TRANSMISSION_KEYS if key in transmission_data}
+
+        # Calculate tire diameter if we have all the required data
+        gear_ratio = transmission_data.get('gear_ratio')
+        rpm = transmission_data.get('rpm')
+        speed = transmission_data.get('speed')
+        final_drive = transmission_data.get('final_drive')
+
+        if gear_ratio and rpm and speed and final_drive:
+            tire_diameter = calculate_tire_diameter(gear_ratio, rpm, speed, final_drive)
+            data['tire_diameter_inches'] = tire_diameter
+            logger.info(f"Calculated tire diameter: {tire_diameter} inches")
+
+        return data
+
+    raise ValueError(f"Unknown screenshot type: {screenshot_type}")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the shared OCR worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, 'OCR_JOB_WORKERS', 2)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-job')
+    return _executor
+
+
+def enqueue_screenshot(screenshot_type: str, uploaded_file):
+    """Create an OCR job for an uploaded screenshot and queue it for processing
+
+    The upload is read into memory here because Django closes temporary
+    upload files when the request finishes.
+
+    Args:
+        screenshot_type: 'suspension', 'power' or 'transmission'
+        uploaded_file: Django UploadedFile object, or the ScreenshotContext it was classified with
+
+    Returns:
+        The created OCRJob
+    """
+    from .models import OCRJob
+
+    job = OCRJob.objects.create(screenshot_type=screenshot_type)
+    if isinstance(uploaded_file, ScreenshotContext):
+        # Already in memory - reuse the planes decoded for classification
+        content = uploaded_file
+    else:
+        content = ContentFile(uploaded_file.read(), name=uploaded_file.name)
+
+    get_executor().submit(_run_job, job.pk, screenshot_type, content)
+    logger.debug(f"Queued OCR job {job.job_id} for {screenshot_type} screenshot")
+
+    return job
+
+
+def _run_job(pk: int, screenshot_type: str, content) -> None:
+    """Process a queued OCR job on a worker thread"""
+    from .models import OCRJob
+
+    close_old_connections()
+    try:
+        OCRJob.objects.filter(pk=pk).update(status='running', updated_at=timezone.now())
+
+        try:
+            data = extract_screenshot_data(screenshot_type, content)
+            OCRJob.objects.filter(pk=pk).update(status='done', result=data, updated_at=timezone.now())
+            logger.debug(f"OCR job {pk} finished: {data}")
+        except Exception as e:
+            logger.error(f"Error processing {screenshot_type} screenshot in job {pk}: {str(e)}", exc_info=True)
+            OCRJob.objects.filter(pk=pk).update(status='failed', error=str(e), updated_at=timezone.now())
+    finally:
+        close_old_connections()
+
+
+def classify_uploaded_screenshots(uploaded_files) -> Tuple[Dict[str, ScreenshotContext], List[str]]:
+    """Classify screenshots uploaded through the single drop zone
+
+    Each upload is decoded once; the returned contexts are passed on to the
+    OCR pipeline so classification doesn't cost a second decode.
+
+    Args:
+        uploaded_files: Django UploadedFile objects
+
+    Returns:
+        Tuple of (contexts keyed by screenshot type, names of files that couldn't be used)
+    """
+    classified = {}
+    scores = {}
+    rejected = []
+
+    for uploaded_file in uploaded_files:
+        try:
+            context = ScreenshotContext.from_upload(uploaded_file)
+            screenshot_type, score = classify_screenshot(context)
+        except Exception as e:
+            logger.error(f"Error classifying {uploaded_file.name}: {str(e)}")
+            screenshot_type, score = None, 0.0
+
+        if screenshot_type is None:
+            rejected.append(uploaded_file.name)
+            continue
+
+        logger.debug(f"Classified {uploaded_file.name} as {screenshot_type} ({score:.2f})")
+
+        # Keep the most confident screenshot of each type
+        if screenshot_type in classified:
+            if score <= scores[screenshot_type]:
+                rejected.append(uploaded_file.name)
+                continue
+            rejected.append(classified[screenshot_type].name)
+
+        classified[screenshot_type] = context
+        scores[screenshot_type] = score
+
+    return classified, rejected
+
+
+def merge_job_results(base_data: Dict[str, Any], jobs: Iterable) -> Dict[str, Any]:
+    """Build ocr_data from an upload's starting values and every finished job
+
+    ocr_data is rebuilt from the OCRJob rows on each poll rather than
+    updated one job at a time, so concurrent status requests all write the
+    same value to the session and none can drop another job's results.
+
+    Args:
+        base_data: Values known when the upload was queued (e.g. the selected vehicle)
+        jobs: The upload's OCRJob instances
+
+    Returns:
+        New ocr_data dict
+    """
+    ocr_data = dict(base_data)
+    for job in sorted(jobs, key=lambda job: job.pk):
+        if job.status == 'done':
+            merge_ocr_data(ocr_data, job.result or {})
+    match_ocr_vehicle(ocr_data)
+    return ocr_data
+
+
+_last_prune = None
+_prune_lock = threading.Lock()
+
+
+def prune_ocr_jobs() -> int:
+    """Delete OCR jobs older than OCR_JOB_RETENTION_SECONDS
+
+    Called when uploads are queued; only runs once per
+    JOB_PRUNE_INTERVAL_SECONDS per process.
+
+    Returns:
+        Number of jobs deleted
+    """
+    from .models import OCRJob
+
+    global _last_prune
+    now = timezone.now()
+    with _prune_lock:
+        if _last_prune is not None and now - _last_prune < timedelta(seconds=JOB_PRUNE_INTERVAL_SECONDS):
+            return 0
+        _last_prune = now
+
+    retention = getattr(settings, 'OCR_JOB_RETENTION_SECONDS', DEFAULT_JOB_RETENTION_SECONDS)
+    try:
+        deleted, _ = OCRJob.objects.filter(created_at__lt=now - timedelta(seconds=retention)).delete()
+    except Exception as e:
+        logger.error(f"Error pruning OCR jobs: {str(e)}")
+        return 0
+
+    if deleted:
+        logger.debug(f"Pruned {deleted} old OCR jobs")
+    return deleted
+
+
+def get_job_status(job) -> str:
+    """Get the job status, treating long-running jobs as failed
+
+    A job's updated_at is set when a worker picks it up, so the timeout
+    runs from the start of processing rather than from when it was queued.
+
+    Args:
+        job: OCRJob instance
+
+    Returns:
+        Status string
+    """
+    if job.is_finished:
+        return job.status
+
+    timeout = getattr(settings, 'OCR_JOB_TIMEOUT_SECONDS', DEFAULT_JOB_TIMEOUT_SECONDS)
+    if job.status == 'running' and job.updated_at and timezone.now() - job.updated_at > timedelta(seconds=timeout):
+        return 'failed'
+
+    return job.status
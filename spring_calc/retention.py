@@ -0,0 +1,316 @@
+# spring_calc/retention.py
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Window
+from django.utils import timezone
+
+from .derived import SPRING_DERIVED_FIELDS, GEAR_DERIVED_FIELDS
+from .models import SpringCalculation, GearCalculation, TireSizeCalculation, SavedSetup
+from .setup_stats import rebuild_setup_stats
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden with the CALCULATION_RETENTION_* settings or command options
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_BATCH_SIZE = 1000
+
+# Duplicates younger than this are left alone, as a session may have just been handed one
+DUPLICATE_GRACE_PERIOD = timedelta(days=1)
+
+# Session engines whose sessions can be read back from the database
+DATABASE_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+# Calculation history models, with the SavedSetup foreign key and session key that reference them
+HISTORY_MODELS = [
+    (SpringCalculation, 'spring_calculation', 'spring_calculation_id'),
+    (GearCalculation, 'gear_calculation', 'gear_calculation_id'),
+    (TireSizeCalculation, None, None),
+]
+
+# Stored results that are recomputed on read, so they don't make two rows different
+DERIVED_FIELDS = set(SPRING_DERIVED_FIELDS + GEAR_DERIVED_FIELDS)
+
+# Models summarized in VehicleSetupStats, which must be rebuilt for vehicles that lose rows
+STATS_MODELS = (SpringCalculation, GearCalculation)
+
+
+def identity_fields(model) -> List[str]:
+    """Columns that must all match for two rows to be duplicates (inputs and stored results)"""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname not in ('id', 'created_at') and field.name not in DERIVED_FIELDS
+    ]
+
+
+def get_session_references() -> Optional[Dict[str, Set[int]]]:
+    """Collect the calculation ids referenced by unexpired sessions
+
+    Returns:
+        Referenced ids keyed by session key, or None if the session engine
+        can't be enumerated (then nothing younger than SESSION_COOKIE_AGE
+        is deleted)
+    """
+    if settings.SESSION_ENGINE not in DATABASE_SESSION_ENGINES:
+        return None
+
+    from django.contrib.sessions.models import Session
+
+    references = {session_key: set() for _, _, session_key in HISTORY_MODELS if session_key}
+    for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator(chunk_size=2000):
+        try:
+            data = session.get_decoded()
+        except Exception as e:
+            logger.warning(f"Could not decode session {session.pk[:8]}...: {str(e)}")
+            continue
+        for session_key, ids in references.items():
+            calculation_id = data.get(session_key)
+            if calculation_id:
+                ids.add(int(calculation_id))
+    return references
+
+
+class HistoryCompactor:
+    """Deduplicates and prunes the calculation history tables
+
+    Duplicates are rows with identical inputs and results (see
+    identity_fields). The oldest row of each group is kept and saved
+    setups pointing at the others are repointed to it. Rows past the
+    retention window are deleted unless a saved setup or a live session
+    references them. Every batch is its own transaction, and deletes
+    re-check SavedSetup references inside it, so setups saved while the
+    job runs are never cascaded away. Vehicles that lost spring or gear
+    calculations get their VehicleSetupStats rebuilt at the end, since
+    deletes bypass the incremental statistics.
+    """
+
+    def __init__(self, retention_days: int = DEFAULT_RETENTION_DAYS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 dry_run: bool = False, progress: Optional[Callable[[str], None]] = None):
+        """Initialize the compactor
+
+        Args:
+            retention_days: Unreferenced rows older than this are deleted
+            batch_size: Rows handled per transaction
+            dry_run: Count what would change without writing anything
+            progress: Called with a message after each step
+        """
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.progress = progress
+
+        self.started = timezone.now()
+        self.session_references = get_session_references()
+
+        # Rows a dry run has counted as removed, so they aren't counted again as expired,
+        # and kept rows saved setups would have been repointed to, which it must not count at all
+        self._dry_run_removed: Dict[str, Set[int]] = {}
+        self._dry_run_repointed: Dict[str, Set[int]] = {}
+
+        # Vehicles whose setup statistics no longer match their calculations
+        self.affected_vehicles: Set[int] = set()
+
+    def run(self) -> Dict[str, Dict[str, int]]:
+        """Compact every history model
+
+        Returns:
+            Counts per model name: duplicates, repointed and expired
+        """
+        report = {}
+        for model, setup_field, session_key in HISTORY_MODELS:
+            counts = {'duplicates': 0, 'repointed': 0, 'expired': 0}
+            counts['duplicates'], counts['repointed'] = self.deduplicate(model, setup_field, session_key)
+            counts['expired'] = self.expire(model, setup_field, session_key)
+            report[model.__name__] = counts
+            self._report(f"{model.__name__}: {counts['duplicates']} duplicates removed, "
+                         f"{counts['repointed']} saved setups repointed, {counts['expired']} expired rows removed")
+
+        if self.affected_vehicles:
+            rebuild_setup_stats(vehicle_ids=self.affected_vehicles, chunk_size=self.batch_size)
+            self._report(f"Setup statistics rebuilt for {len(self.affected_vehicles)} vehicles")
+        return report
+
+    def deduplicate(self, model, setup_field: Optional[str], session_key: Optional[str]) -> Tuple[int, int]:
+        """Remove duplicate rows, repointing saved setups to the row that is kept
+
+        Returns:
+            Tuple of (rows removed, saved setups repointed)
+        """
+        fields = identity_fields(model)
+        cutoff = self.started - DUPLICATE_GRACE_PERIOD
+        if self.session_references is None and session_key:
+            cutoff = min(cutoff, self.started - timedelta(seconds=settings.SESSION_COOKIE_AGE))
+
+        # Duplicates can only share a vehicle, so each vehicle is grouped on its own
+        if any(field.name == 'vehicle' for field in model._meta.concrete_fields):
+            scopes = list(model.objects.filter(created_at__lt=cutoff).values_list('vehicle_id', flat=True).distinct())
+        else:
+            scopes = [None]
+
+        removed = 0
+        repointed = 0
+        for vehicle_id in scopes:
+            queryset = model.objects.filter(created_at__lt=cutoff)
+            if vehicle_id is not None:
+                queryset = queryset.filter(vehicle_id=vehicle_id)
+
+            # Pair every duplicate with the oldest row of its group
+            pairs = list(
+                queryset.annotate(
+                    canonical_id=Window(Min('id'), partition_by=[F(field) for field in fields])
+                ).filter(canonical_id__lt=F('id')).values_list('id', 'canonical_id')
+            )
+
+            for start in range(0, len(pairs), self.batch_size):
+                batch_removed, batch_repointed = self._remove_duplicates(
+                    model, setup_field, session_key, dict(pairs[start:start + self.batch_size])
+                )
+                removed += batch_removed
+                repointed += batch_repointed
+
+        return removed, repointed
+
+    def expire(self, model, setup_field: Optional[str], session_key: Optional[str]) -> int:
+        """Delete unreferenced rows older than the retention window, batch by batch
+
+        Returns:
+            Number of rows removed
+        """
+        cutoff = self.started - timedelta(days=self.retention_days)
+        if self.session_references is None and session_key:
+            cutoff = min(cutoff, self.started - timedelta(seconds=settings.SESSION_COOKIE_AGE))
+        queryset = model.objects.filter(created_at__lt=cutoff).order_by('id')
+
+        removed = 0
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            removed += self._delete(model, setup_field, session_key, ids)
+
+        return removed
+
+    def _remove_duplicates(self, model, setup_field: Optional[str], session_key: Optional[str],
+                           canonical_ids: Dict[int, int]) -> Tuple[int, int]:
+        """Repoint and delete one batch of duplicates (duplicate id -> kept id) in a transaction"""
+        if self.dry_run:
+            # Referencing setups would be repointed first, so only sessions keep a duplicate
+            repointed = 0
+            if setup_field:
+                attname = f'{setup_field}_id'
+                references = list(SavedSetup.objects.filter(**{f'{attname}__in': list(canonical_ids)})
+                                  .values_list(attname, flat=True))
+                self._dry_run_repointed.setdefault(model.__name__, set()).update(
+                    canonical_ids[duplicate_id] for duplicate_id in references
+                )
+                repointed = len(references)
+            return self._delete(model, None, session_key, list(canonical_ids)), repointed
+
+        with transaction.atomic():
+            repointed = 0
+            if setup_field:
+                attname = f'{setup_field}_id'
+                setups = list(SavedSetup.objects.filter(**{f'{attname}__in': list(canonical_ids)}).only('id', attname))
+                for setup in setups:
+                    setattr(setup, attname, canonical_ids[getattr(setup, attname)])
+                SavedSetup.objects.bulk_update(setups, [attname], batch_size=self.batch_size)
+                repointed = len(setups)
+
+            removed = self._delete(model, setup_field, session_key, list(canonical_ids))
+        return removed, repointed
+
+    def _delete(self, model, setup_field: Optional[str], session_key: Optional[str], ids: List[int]) -> int:
+        """Delete rows not referenced by a saved setup or a session"""
+        ids = self._unreferenced_by_sessions(session_key, ids)
+        if not ids:
+            return 0
+
+        queryset = model.objects.filter(id__in=ids)
+        if setup_field:
+            queryset = queryset.exclude(
+                id__in=SavedSetup.objects.filter(**{f'{setup_field}__isnull': False}).values(f'{setup_field}_id')
+            )
+
+        if self.dry_run:
+            removed_ids = self._dry_run_removed.setdefault(model.__name__, set())
+            counted = set(queryset.values_list('id', flat=True)) - removed_ids
+            counted -= self._dry_run_repointed.get(model.__name__, set())
+            removed_ids.update(counted)
+            return len(counted)
+
+        with transaction.atomic():
+            if model in STATS_MODELS:
+                self.affected_vehicles.update(queryset.values_list('vehicle_id', flat=True).distinct())
+            removed, _ = queryset.delete()
+        return removed
+
+    def _unreferenced_by_sessions(self, session_key: Optional[str], ids: List[int]) -> List[int]:
+        """Drop ids a live session still points at"""
+        if not session_key or not self.session_references:
+            return ids
+        referenced = self.session_references[session_key]
+        return [calculation_id for calculation_id in ids if calculation_id not in referenced]
+
+    def _report(self, message: str) -> None:
+        logger.info(message)
+        if self.progress:
+            self.progress(message)
+
+
+def vacuum_database() -> bool:
+    """Reclaim the space freed by deleted rows and refresh the planner statistics
+
+    Returns:
+        True if the database backend supports it and it ran
+    """
+    tables = [model._meta.db_table for model, _, _ in HISTORY_MODELS]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # VACUUM rewrites the file (and its indexes) without the free pages
+            cursor.execute('VACUUM')
+            cursor.execute('ANALYZE')
+            return True
+        if connection.vendor == 'postgresql':
+            for table in tables:
+                cursor.execute(f'VACUUM ANALYZE {connection.ops.quote_name(table)}')
+            return True
+
+    logger.info(f"VACUUM/ANALYZE not supported for {connection.vendor}, skipped")
+    return False
+
+
+def compact_calculation_history(retention_days: Optional[int] = None, batch_size: Optional[int] = None,
+                                dry_run: bool = False, vacuum: bool = True,
+                                progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Deduplicate and prune the calculation history, then VACUUM/ANALYZE
+
+    Args:
+        retention_days: Defaults to CALCULATION_RETENTION_DAYS
+        batch_size: Defaults to CALCULATION_RETENTION_BATCH_SIZE
+        dry_run: Count what would change without writing anything
+        vacuum: Whether to VACUUM/ANALYZE afterwards (never on a dry run)
+        progress: Called with a message after each step
+
+    Returns:
+        Counts per model name, plus whether the database was vacuumed and
+        the number of vehicles whose setup statistics were rebuilt
+    """
+    compactor = HistoryCompactor(
+        retention_days=retention_days or getattr(settings, 'CALCULATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS),
+        batch_size=batch_size or getattr(settings, 'CALCULATION_RETENTION_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        dry_run=dry_run,
+        progress=progress
+    )
+    report: Dict[str, Any] = compactor.run()
+    report['vacuumed'] = vacuum and not dry_run and vacuum_database()
+    report['stats_rebuilt'] = len(compactor.affected_vehicles)
+    return report
@@ -0,0 +1,139 @@
+# spring_calc/setup_listing.py
+import base64
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import SavedSetup
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridden with the SAVED_SETUPS_* settings
+DEFAULT_PAGE_SIZE = 24
+DEFAULT_MAX_PAGE_SIZE = 100
+
+# Newest first; id breaks ties between setups saved in the same instant
+SETUP_ORDERING = ['-date_saved', '-id']
+
+
+class InvalidCursor(ValueError):
+    """Raised when a page cursor can't be decoded"""
+
+
+def encode_cursor(setup: SavedSetup) -> str:
+    """Encode the sort key of the last setup on a page as an opaque cursor"""
+    key = f"{setup.date_saved.isoformat()}|{setup.id}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor made by encode_cursor()
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_saved, setup_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(date_saved), int(setup_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {str(e)}")
+
+
+def get_page_size(requested: Optional[Any] = None) -> int:
+    """Clamp a requested page size to 1..SAVED_SETUPS_MAX_PAGE_SIZE, defaulting to SAVED_SETUPS_PAGE_SIZE"""
+    default = getattr(settings, 'SAVED_SETUPS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'SAVED_SETUPS_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    try:
+        page_size = int(requested) if requested not in (None, '') else default
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def get_saved_setups_page(vehicle_id: Optional[int] = None, user_id: Optional[int] = None,
+                          cursor: Optional[str] = None, page_size: Optional[int] = None) -> Dict[str, Any]:
+    """Fetch one page of saved setups, newest first
+
+    Pages are keyset paginated: a page starts after the (date_saved, id)
+    of the previous page's last setup instead of at an OFFSET, so every
+    page is a single index range scan of page_size + 1 rows however deep
+    it is. Vehicles and calculations are joined in with select_related,
+    making a page one query in total.
+
+    Args:
+        vehicle_id: Only setups for this vehicle
+        user_id: Only setups saved by this user
+        cursor: next_cursor of the previous page, None for the first page
+        page_size: Setups per page, see get_page_size()
+
+    Returns:
+        dict with 'setups', 'next_cursor' (None on the last page) and 'has_more'
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    page_size = get_page_size(page_size)
+
+    setups = SavedSetup.objects.select_related(
+        'vehicle', 'spring_calculation', 'gear_calculation'
+    ).order_by(*SETUP_ORDERING)
+
+    if vehicle_id is not None:
+        setups = setups.filter(vehicle_id=vehicle_id)
+    if user_id is not None:
+        setups = setups.filter(user_id=user_id)
+
+    if cursor:
+        date_saved, setup_id = decode_cursor(cursor)
+        # The lte bound lets the index seek straight to the cursor; the OR settles ties
+        setups = setups.filter(date_saved__lte=date_saved).filter(
+            Q(date_saved__lt=date_saved) | Q(id__lt=setup_id)
+        )
+
+    # One extra row tells whether another page follows
+    rows: List[SavedSetup] = list(setups[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return {
+        'setups': rows,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+        'has_more': has_more,
+    }
+
+
+def serialize_setup(setup: SavedSetup) -> Dict[str, Any]:
+    """Summarize a saved setup (with its select_related rows) for the JSON listing"""
+    spring = setup.spring_calculation
+    gear = setup.gear_calculation
+
+    return {
+        'id': setup.id,
+        'name': setup.name,
+        'notes': setup.notes,
+        'date_saved': setup.date_saved.isoformat(),
+        'user_id': setup.user_id,
+        'vehicle': {
+            'id': setup.vehicle.id,
+            'name': setup.vehicle.name,
+        },
+        'spring_calculation': {
+            'id': spring.id,
+            'front_spring_rate': spring.front_spring_rate,
+            'rear_spring_rate': spring.rear_spring_rate,
+            'front_roll_bar': spring.front_roll_bar,
+            'rear_roll_bar': spring.rear_roll_bar,
+            'front_camber': spring.front_camber,
+            'rear_camber': spring.rear_camber,
+        } if spring else None,
+        'gear_calculation': {
+            'id': gear.id,
+            'final_drive': gear.final_drive,
+            'top_speed_calculated': gear.top_speed_calculated,
+            'acceleration_estimate': gear.acceleration_estimate,
+        } if gear else None,
+    }
@@ -0,0 +1,165 @@
+# spring_calc/setup_stats.py
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from services.setup_stats_service import add_values, accumulate_columns, summarize_metrics
+from .models import SpringCalculation, GearCalculation, VehicleSetupStats
+
+logger = logging.getLogger(__name__)
+
+# Calculation fields summarized per vehicle
+SPRING_METRICS = [
+    'front_spring_rate', 'rear_spring_rate',
+    'front_roll_bar', 'rear_roll_bar',
+    'front_camber', 'rear_camber'
+]
+GEAR_METRICS = ['final_drive']
+
+# Calculations read per query by a rebuild
+DEFAULT_REBUILD_CHUNK_SIZE = 5000
+
+
+def record_calculation(calculation) -> None:
+    """Add a newly saved calculation to its vehicle's statistics
+
+    Args:
+        calculation: Saved SpringCalculation or GearCalculation
+    """
+    if not calculation.vehicle_id:
+        return
+
+    is_spring = isinstance(calculation, SpringCalculation)
+    metrics = SPRING_METRICS if is_spring else GEAR_METRICS
+
+    try:
+        with transaction.atomic():
+            stats, _ = VehicleSetupStats.objects.select_for_update().get_or_create(vehicle_id=calculation.vehicle_id)
+            add_values(stats.metrics, {metric: getattr(calculation, metric) for metric in metrics})
+            if is_spring:
+                stats.spring_count += 1
+            else:
+                stats.gear_count += 1
+            stats.save()
+    except Exception as e:
+        # Statistics drift until the next rebuild rather than failing the calculation
+        logger.error(f"Error updating setup statistics for vehicle {calculation.vehicle_id}: {str(e)}")
+
+
+def record_calculation_on_commit(sender, instance, created, raw=False, **kwargs) -> None:
+    """post_save receiver recording inserted calculations once their transaction commits
+
+    Rows written with bulk_create() or removed with delete() are only
+    picked up by rebuild_setup_stats().
+    """
+    if not created or raw or not getattr(settings, 'SETUP_STATS_ON_INSERT', True):
+        return
+    transaction.on_commit(lambda: record_calculation(instance))
+
+
+def get_vehicle_setup_stats(vehicle_id: int) -> Optional[Dict[str, Any]]:
+    """Read a vehicle's setup statistics with a single-row lookup
+
+    Returns:
+        dict with the setup counts and a summary per metric, or None if
+        no setups have been recorded for the vehicle
+    """
+    stats = VehicleSetupStats.objects.filter(vehicle_id=vehicle_id).first()
+    if stats is None:
+        return None
+
+    return {
+        'vehicle_id': stats.vehicle_id,
+        'spring_count': stats.spring_count,
+        'gear_count': stats.gear_count,
+        'metrics': summarize_metrics(stats.metrics),
+        'updated_at': stats.updated_at.isoformat(),
+    }
+
+
+def rebuild_setup_stats(vehicle_ids: Optional[Iterable[int]] = None, chunk_size: Optional[int] = None,
+                        progress: Optional[Callable[[str, int], None]] = None) -> int:
+    """Recompute setup statistics from the calculation tables
+
+    Calculations are read in id order, chunk_size rows per query, and
+    aggregated with array operations, so memory stays bounded by the
+    chunk plus one accumulator per vehicle. Rows inserted while the scan
+    runs are caught up in the transaction that writes the results.
+
+    Args:
+        vehicle_ids: Only rebuild these vehicles (default: all)
+        chunk_size: Calculations per query
+        progress: Called with the model name and rows read so far after each chunk
+
+    Returns:
+        Number of vehicles with statistics written
+    """
+    chunk_size = chunk_size or DEFAULT_REBUILD_CHUNK_SIZE
+    vehicle_ids = list(vehicle_ids) if vehicle_ids is not None else None
+
+    accumulators: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    counts: Dict[int, List[int]] = {}
+    sources = [
+        (SpringCalculation, SPRING_METRICS, 0),
+        (GearCalculation, GEAR_METRICS, 1),
+    ]
+    last_ids = {model: 0 for model, _, _ in sources}
+
+    def scan(model, metrics, count_index):
+        queryset = model.objects.order_by('id')
+        if vehicle_ids is not None:
+            queryset = queryset.filter(vehicle_id__in=vehicle_ids)
+
+        read = 0
+        while True:
+            rows = list(
+                queryset.filter(id__gt=last_ids[model]).values_list('id', 'vehicle_id', *metrics)[:chunk_size]
+            )
+            if not rows:
+                break
+            last_ids[model] = rows[-1][0]
+            read += len(rows)
+
+            data = np.array(rows, dtype=object)
+            keys = data[:, 1].astype(np.int64)
+            columns = {
+                metric: np.where(data[:, 2 + index] == None, np.nan, data[:, 2 + index]).astype(np.float64)  # noqa: E711
+                for index, metric in enumerate(metrics)
+            }
+            accumulate_columns(accumulators, keys, columns)
+
+            vehicles, vehicle_counts = np.unique(keys, return_counts=True)
+            for vehicle_id, count in zip(vehicles.tolist(), vehicle_counts.tolist()):
+                counts.setdefault(vehicle_id, [0, 0])[count_index] += count
+
+            if progress:
+                progress(model.__name__, read)
+
+    for model, metrics, count_index in sources:
+        scan(model, metrics, count_index)
+
+    with transaction.atomic():
+        # Catch up on rows committed during the scan right before the old statistics are replaced
+        for model, metrics, count_index in sources:
+            scan(model, metrics, count_index)
+
+        existing = VehicleSetupStats.objects.all()
+        if vehicle_ids is not None:
+            existing = existing.filter(vehicle_id__in=vehicle_ids)
+        existing.delete()
+
+        VehicleSetupStats.objects.bulk_create([
+            VehicleSetupStats(
+                vehicle_id=vehicle_id,
+                spring_count=vehicle_counts[0],
+                gear_count=vehicle_counts[1],
+                metrics=accumulators.get(vehicle_id, {})
+            )
+            for vehicle_id, vehicle_counts in counts.items()
+        ], batch_size=500)
+
+    logger.info(f"Rebuilt setup statistics for {len(counts)} vehicles")
+    return len(counts)
@@ -1,3 +1,1702 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from cars.catalog import get_vehicle_catalog
+from cars.models import Vehicle
+from services.batch_calculation_service import calculate_suspension_batch, calculate_gearing_batch
+from services.calculation_service import (
+    calculate_spring_rates,
+    calculate_spring_frequencies,
+    calculate_damper_settings,
+    calculate_roll_bar_stiffness,
+    calculate_alignment_settings
+)
+from services.digit_recognizer import get_glyph_classifier
+from services.layout_registry import (
+    DEFAULT_ANCHOR_DIR,
+    AnchorAligner,
+    CalibratedLayout,
+    LayoutRegistry,
+    calibrate_layout,
+    get_anchor_aligner,
+    get_screenshot_layout
+)
+from services.ocr_service import (
+    GLYPH_MIN_CONFIDENCE,
+    REREAD_CONFIDENCE,
+    TIRE_BADGE_MIN_CONFIDENCE,
+    OCRProcessor,
+    PowerOCRProcessor,
+    SuspensionOCRProcessor,
+    TransmissionOCRProcessor
+)
+from services.screenshot_classifier import MIN_CLASSIFICATION_SCORE, ScreenshotClassifier, classify_screenshot
+from services.screenshot_context import (
+    DETECTION_MIN_WIDTH,
+    ScreenshotContext,
+    ScreenshotContextError,
+    get_reduction_factor
+)
+from services.tire_badge import DEFAULT_REFERENCE_DIR, TireBadgeClassifier, get_tire_badge_classifier
+from services.image_processing import ImageProcessingError, find_screen_quad, load_screenshot, order_quad_points
+from services.gear_service import (
+    calculate_optimal_gear_ratios,
+    calculate_speed_at_rpm,
+    estimate_acceleration,
+    generate_gear_speeds
+)
+from spring_calc.batch_calculations import get_field_specs, stream_batch_results
+from spring_calc.conditional import make_etag
+from spring_calc.derived import DERIVED_RESULTS_VERSION, ensure_derived_results, set_gear_derived_results
+from spring_calc.history import HistoryRecorder
+from spring_calc.management.commands.ocr_screenshots import Command as OCRScreenshotsCommand, classify_by_name
+from spring_calc.models import (
+    GearCalculation,
+    OCRJob,
+    SavedSetup,
+    SpringCalculation,
+    TireSizeCalculation,
+    VehicleSetupStats
+)
+from spring_calc.retention import DUPLICATE_GRACE_PERIOD, HistoryCompactor, compact_calculation_history
+from spring_calc.setup_listing import InvalidCursor, decode_cursor, encode_cursor, get_page_size, get_saved_setups_page
+from spring_calc.setup_stats import get_vehicle_setup_stats, rebuild_setup_stats
+from spring_calc.workspace import Workspace, get_workspace
+from spring_calc.views.calculation_views import calculate_batch
+from spring_calc.ocr_jobs import enqueue_screenshot, get_job_status, get_ocr_debug_root, merge_job_results
+
+DRIVETRAINS = ['FF', 'FR', 'MR', 'RR', '4WD']
+CAR_TYPES = ['ROAD', 'GR4', 'GR3', 'RACE', 'VGT', 'FAN']
+
+EXAMPLE_DIR = os.path.join(settings.BASE_DIR, 'static', 'images')
+
+EXAMPLE_SCREENSHOT_TYPES = {
+    'suspension_example.JPG': 'suspension',
+    'transmission_example.jpg': 'transmission',
+    'power_example.jpg': 'power',
+}
+
+# Fields of the example screenshots the glyph templates were not cut from,
+# as (x1, y1, x2, y2) at 1920x1080 and the text shown
+HELD_OUT_GLYPH_FIELDS = {
+    'transmission_example.jpg': [
+        ((756, 377, 826, 407), '3.209'), ((745, 421, 811, 451), '2.487'),
+        ((745, 465, 811, 495), '1.928'), ((745, 509, 811, 539), '1.494'),
+        ((745, 553, 811, 583), '1.158'), ((745, 597, 811, 627), '0.897'),
+        ((808, 733, 878, 763), '3.651'), ((960, 378, 1020, 406), '8,549'),
+    ],
+    'power_example.jpg': [
+        ((1116, 347, 1174, 375), '1,300'), ((1426, 347, 1484, 375), '8,755'),
+        ((1088, 126, 1118, 154), '50'), ((1484, 101, 1526, 129), '498'),
+    ],
+}
+
+# What the suspension processor's glyph regions show on suspension_example.JPG
+SUSPENSION_EXAMPLE_VALUES = {
+    'vehicle_weight': '1,464', 'front_weight_distribution': '41',
+    'front_ride_height': '57', 'rear_ride_height': '57',
+    'front_downforce': '200', 'rear_downforce': '450',
+    'low_speed_stability': '-0.25', 'high_speed_stability': '-1.00',
+    'rotational_g_40mph': '1.09', 'rotational_g_75mph': '1.14', 'rotational_g_150mph': '1.30',
+}
+
+
+def random_columns(batch_type, count, seed):
+    """Random valid input columns for a batch type, drawn from the form field ranges"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, spec in get_field_specs(batch_type).items():
+        if name == 'vehicle':
+            continue
+        if spec['kind'] == 'choice':
+            columns[name] = np.array(rng.choice(spec['choices'], count), dtype=object)
+        elif spec['kind'] == 'int':
+            columns[name] = rng.integers(spec['min'], spec['max'] + 1, count).astype(np.float64)
+        else:
+            columns[name] = np.round(rng.uniform(spec['min'], spec['max'], count), 2)
+    return columns
+
+
+class BatchCalculationParityTests(SimpleTestCase):
+    """The array formulas in services.batch_calculation_service must match the scalar services"""
+
+    count = 300
+
+    def test_suspension_batch_matches_scalar_functions(self):
+        columns = random_columns('suspension', self.count, seed=41)
+        rng = np.random.default_rng(42)
+        columns['front_lever_ratio'] = np.round(rng.uniform(0.5, 1.0, self.count), 2)
+        columns['rear_lever_ratio'] = np.round(rng.uniform(0.5, 1.0, self.count), 2)
+        columns['drivetrain'] = np.array(rng.choice(DRIVETRAINS, self.count), dtype=object)
+        columns['car_type'] = np.array(rng.choice(CAR_TYPES, self.count), dtype=object)
+
+        results = calculate_suspension_batch(columns)
+
+        for index in range(self.count):
+            row = {name: column[index] for name, column in columns.items()}
+            row = {name: value.item() if hasattr(value, 'item') else value for name, value in row.items()}
+
+            spring_rates = calculate_spring_rates(
+                vehicle_weight=row['vehicle_weight'],
+                front_weight_distribution=row['front_weight_distribution'],
+                front_ride_height=row['front_ride_height'],
+                rear_ride_height=row['rear_ride_height'],
+                front_lever_ratio=row['front_lever_ratio'],
+                rear_lever_ratio=row['rear_lever_ratio'],
+                front_downforce=row['front_downforce'],
+                rear_downforce=row['rear_downforce'],
+                stiffness_multiplier=row['stiffness_multiplier'],
+                front_tire_type=row['front_tires'],
+                rear_tire_type=row['rear_tires'],
+                drivetrain=row['drivetrain']
+            )
+            frequencies = calculate_spring_frequencies(
+                spring_rates=spring_rates,
+                vehicle_weight=row['vehicle_weight'],
+                front_weight_distribution=row['front_weight_distribution'],
+                car_type=row['car_type'],
+                spring_frequency_offset=int(row['spring_frequency_offset'])
+            )
+            dampers = calculate_damper_settings(
+                spring_rates=spring_rates,
+                vehicle_weight=row['vehicle_weight'],
+                front_weight_distribution=row['front_weight_distribution'],
+                corner_entry_adjustment=int(row['corner_entry_adjustment']),
+                corner_exit_adjustment=int(row['corner_exit_adjustment']),
+                front_tire_type=row['front_tires'],
+                rear_tire_type=row['rear_tires']
+            )
+            roll_bars = calculate_roll_bar_stiffness(
+                rotational_g_values=[row['rotational_g_40mph'], row['rotational_g_75mph'], row['rotational_g_150mph']],
+                low_speed_stability=row['low_speed_stability'],
+                high_speed_stability=row['high_speed_stability'],
+                arb_stiffness_multiplier=row['arb_stiffness_multiplier'],
+                ou_adjustment=int(row['ou_adjustment'])
+            )
+            alignment = calculate_alignment_settings(
+                rotational_g_75mph=row['rotational_g_75mph'],
+                drivetrain=row['drivetrain'],
+                tire_wear_multiplier=row['tire_wear_multiplier'],
+                track_type=row['track_type'],
+                front_weight_distribution=row['front_weight_distribution'],
+                low_speed_stability=row['low_speed_stability'],
+                high_speed_stability=row['high_speed_stability'],
+                front_tire_type=row['front_tires'],
+                rear_tire_type=row['rear_tires']
+            )
+
+            expected = {
+                'front_spring_rate': spring_rates[0],
+                'rear_spring_rate': spring_rates[1],
+                'front_spring_frequency': frequencies[0],
+                'rear_spring_frequency': frequencies[1],
+                'front_roll_bar': roll_bars[0],
+                'rear_roll_bar': roll_bars[1],
+                **{name: dampers[name] for name in ('front_compression', 'front_extension',
+                                                    'rear_compression', 'rear_extension')},
+                **{name: alignment[name] for name in ('front_camber', 'rear_camber', 'front_toe', 'rear_toe')},
+            }
+            for name, value in expected.items():
+                with self.subTest(row=index, result=name):
+                    self.assertAlmostEqual(float(results[name][index]), float(value), places=6)
+
+    def test_gearing_batch_matches_scalar_functions(self):
+        columns = random_columns('gearing', self.count, seed=43)
+
+        # Keep to inputs the form accepts, as the batch API now enforces
+        columns['max_power_rpm'] = np.clip(columns['max_power_rpm'], columns['min_rpm'], columns['max_rpm'])
+        columns['min_corner_speed_mph'] = np.minimum(columns['min_corner_speed_mph'], columns['top_speed_mph'] - 1)
+        columns['weight_kg'] = np.random.default_rng(44).integers(800, 2000, self.count).astype(np.float64)
+
+        results = calculate_gearing_batch(columns)
+
+        for index in range(self.count):
+            row = {name: column[index] for name, column in columns.items()}
+            row = {name: value.item() if hasattr(value, 'item') else value for name, value in row.items()}
+
+            gear_ratios, final_drive = calculate_optimal_gear_ratios(
+                num_gears=int(row['num_gears']),
+                top_speed_mph=row['top_speed_mph'],
+                min_corner_speed_mph=row['min_corner_speed_mph'],
+                max_rpm=row['max_rpm'],
+                min_rpm=row['min_rpm'],
+                tire_diameter_inches=row['tire_diameter_inches'],
+                power_hp=row['power_hp'],
+                max_power_rpm=row['max_power_rpm'],
+                min_corner_gear=int(row['min_corner_gear'])
+            )
+            gear_speeds = generate_gear_speeds(
+                gear_ratios=gear_ratios,
+                final_drive=final_drive,
+                max_power_rpm=row['max_power_rpm'],
+                tire_diameter_inches=row['tire_diameter_inches']
+            )
+            top_speed_mph, _ = calculate_speed_at_rpm(
+                rpm=row['max_rpm'],
+                gear_ratio=list(gear_ratios.values())[-1],
+                final_drive=final_drive,
+                tire_diameter_inches=row['tire_diameter_inches']
+            )
+            acceleration = estimate_acceleration(
+                power_hp=row['power_hp'],
+                weight_kg=row['weight_kg'],
+                gear_ratios=gear_ratios,
+                final_drive=final_drive,
+                tire_diameter_inches=row['tire_diameter_inches']
+            )
+
+            with self.subTest(row=index):
+                ratios = results['gear_ratios'][index]
+                speeds = results['gear_speeds'][index]
+                self.assertEqual(int(np.isfinite(ratios).sum()), len(gear_ratios))
+                np.testing.assert_allclose(ratios[:len(gear_ratios)], list(gear_ratios.values()), atol=1e-9)
+                np.testing.assert_allclose(speeds[:len(gear_speeds)], list(gear_speeds.values()), atol=1e-9)
+                self.assertAlmostEqual(float(results['final_drive'][index]), final_drive, places=9)
+                self.assertAlmostEqual(float(results['top_speed_mph'][index]), top_speed_mph, places=6)
+                self.assertAlmostEqual(float(results['acceleration_estimate'][index]), acceleration, places=9)
+
+
+class GlyphClassifierTests(SimpleTestCase):
+    """The glyph classifier fast path must read real GT7 screenshots, confidently"""
+
+    def read(self, file_name, region):
+        """Read a region given in normalized (x1, y1, x2, y2) coordinates"""
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, file_name), cv2.IMREAD_GRAYSCALE)
+        height, width = image.shape
+        x1, y1, x2, y2 = int(region[0] * width), int(region[1] * height), int(region[2] * width), int(region[3] * height)
+        return get_glyph_classifier().read(image[y1:y2, x1:x2])
+
+    def test_reads_screenshots_the_templates_were_not_cut_from(self):
+        for file_name, fields in HELD_OUT_GLYPH_FIELDS.items():
+            for box, expected in fields:
+                with self.subTest(file=file_name, expected=expected):
+                    text, confidence = self.read(file_name, [value / size for value, size in zip(box, (1920, 1080, 1920, 1080))])
+                    self.assertEqual(text, expected)
+                    self.assertGreaterEqual(confidence, GLYPH_MIN_CONFIDENCE)
+
+    def test_reads_suspension_regions(self):
+        processor = SuspensionOCRProcessor()
+        for name in processor.glyph_params:
+            with self.subTest(field=name):
+                text, confidence = self.read('suspension_example.JPG', processor.regions[name])
+                self.assertEqual(text, SUSPENSION_EXAMPLE_VALUES[name])
+                self.assertGreaterEqual(confidence, GLYPH_MIN_CONFIDENCE)
+
+
+class TireBadgeClassifierTests(SimpleTestCase):
+    """Tire badges must be read from the ring on real screenshots, at any resolution"""
+
+    def test_reads_suspension_example_badges(self):
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, 'suspension_example.JPG'))
+        for scale in (1.0, 0.5, 1 / 3):
+            with self.subTest(scale=scale):
+                processor = SuspensionOCRProcessor()
+                resized = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                tires = processor.extract_tire_types(ScreenshotContext(image=resized))
+                self.assertEqual(tires, {'front_tires': 'SH', 'rear_tires': 'SH'})
+                for name in processor.tire_params:
+                    self.assertGreaterEqual(processor.confidences[name], TIRE_BADGE_MIN_CONFIDENCE)
+
+    def test_reads_badge_the_references_were_not_cut_from(self):
+        classifier = TireBadgeClassifier()
+        front = cv2.imread(os.path.join(DEFAULT_REFERENCE_DIR, 'SH', 'suspension_example_front.png'))
+        classifier.add_reference('SH', classifier.badge_features(front))
+        classifier.add_rendered_references(skip=('SH',))
+
+        rear = cv2.imread(os.path.join(DEFAULT_REFERENCE_DIR, 'SH', 'suspension_example_rear.png'))
+        code, confidence = classifier.classify(rear)
+        self.assertEqual(code, 'SH')
+        self.assertGreaterEqual(confidence, TIRE_BADGE_MIN_CONFIDENCE)
+
+        # Only rendered references: the real badge must still be closest to its own code
+        rendered = TireBadgeClassifier()
+        rendered.add_rendered_references()
+        self.assertEqual(rendered.classify(rear)[0], 'SH')
+
+    def test_ignores_regions_without_a_badge(self):
+        processor = SuspensionOCRProcessor()
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, 'transmission_example.jpg'))
+        self.assertEqual(processor.extract_tire_types(ScreenshotContext(image=image)), {})
+
+        # The compound dropdown next to the badge has text, but no ring
+        suspension = ScreenshotContext(image=cv2.imread(os.path.join(EXAMPLE_DIR, 'suspension_example.JPG')))
+        self.assertEqual(get_tire_badge_classifier().classify(suspension.crop(processor.regions['front_tires'])), (None, 0.0))
+
+
+class ScreenshotClassifierTests(SimpleTestCase):
+    """Screenshot types must be recognised on real GT7 screenshots"""
+
+    def test_classifies_example_screenshots(self):
+        anchors_only = ScreenshotClassifier()
+        for file_name, expected in EXAMPLE_SCREENSHOT_TYPES.items():
+            path = os.path.join(EXAMPLE_DIR, file_name)
+            with self.subTest(file=file_name):
+                self.assertEqual(classify_screenshot(path)[0], expected)
+                self.assertEqual(anchors_only.classify(path)[0], expected)
+
+    def test_references_classify_screenshots_without_readable_fields(self):
+        anchors_only = ScreenshotClassifier()
+        for file_name, expected in EXAMPLE_SCREENSHOT_TYPES.items():
+            # Blurred and downscaled until no anchor field can be read
+            image = cv2.imread(os.path.join(EXAMPLE_DIR, file_name))
+            image = cv2.GaussianBlur(cv2.resize(image, (1280, 720), interpolation=cv2.INTER_AREA), (0, 0), 3)
+            with self.subTest(file=file_name):
+                self.assertLess(max(anchors_only.score(ScreenshotContext(image=image)).values()), MIN_CLASSIFICATION_SCORE)
+                self.assertEqual(classify_screenshot(ScreenshotContext(image=image))[0], expected)
+
+    def test_classifying_4k_capture_skips_full_decode(self):
+        for file_name, expected in EXAMPLE_SCREENSHOT_TYPES.items():
+            context = ScreenshotContext(image_path=os.path.join(EXAMPLE_DIR, file_name))
+            with self.subTest(file=file_name):
+                self.assertEqual(classify_screenshot(context)[0], expected)
+                self.assertEqual(context.detection.factor, 2)
+                self.assertNotIn('bgr', context._planes)
+
+
+class AnchorAlignerTests(SimpleTestCase):
+    """The shipped anchors must be found on real screenshots and recover HUD scaling"""
+
+    def test_finds_anchors_on_example_screenshots(self):
+        with open(os.path.join(DEFAULT_ANCHOR_DIR, 'anchors.json'), encoding='utf-8') as f:
+            self.assertEqual(AnchorAligner().load_anchors(DEFAULT_ANCHOR_DIR), len(json.load(f)))
+
+        for file_name in EXAMPLE_SCREENSHOT_TYPES:
+            with self.subTest(file=file_name):
+                context = ScreenshotContext.from_source(os.path.join(EXAMPLE_DIR, file_name))
+                layout = get_anchor_aligner().align(context, CalibratedLayout())
+                self.assertEqual(layout.to_dict(), CalibratedLayout(source='anchors').to_dict())
+
+    def test_aligns_scaled_hud(self):
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, 'suspension_example.JPG'))
+        height, width = image.shape[:2]
+        for hud_scale in (0.9, 0.95):
+            # Shrink the UI off-centre, padding with the edge colours so the content area can't see it
+            scaled = cv2.resize(image, (int(width * hud_scale), int(height * hud_scale)), interpolation=cv2.INTER_AREA)
+            left = (width - scaled.shape[1]) // 2 + 37
+            top = (height - scaled.shape[0]) // 2 - 11
+            padded = cv2.copyMakeBorder(scaled, top, height - scaled.shape[0] - top, left, width - scaled.shape[1] - left,
+                                        cv2.BORDER_REPLICATE)
+
+            with self.subTest(hud_scale=hud_scale):
+                context = ScreenshotContext(image=padded)
+                layout = get_screenshot_layout(context)
+                self.assertEqual(layout.source, 'anchors')
+                self.assertAlmostEqual(layout.offset_x, left / width, delta=0.002)
+                self.assertAlmostEqual(layout.offset_y, top / height, delta=0.002)
+                self.assertAlmostEqual(layout.scale_x, hud_scale, delta=0.002)
+                self.assertAlmostEqual(layout.scale_y, hud_scale, delta=0.002)
+                self.assertEqual(SuspensionOCRProcessor().extract_tire_types(context),
+                                 {'front_tires': 'SH', 'rear_tires': 'SH'})
+
+    def test_fit_drops_mismatched_anchor(self):
+        positions = [(0.08, 0.30), (0.07, 0.56), (0.11, 0.71), (0.10, 0.81), (0.57, 0.03), (0.79, 0.03)]
+        matches = [(position, (0.02 + 0.95 * position[0], 0.01 + 0.95 * position[1]), 0.95, 1.0) for position in positions]
+        expected = AnchorAligner._fit_layout(matches, CalibratedLayout()).to_dict()
+
+        # One weak match a few pixels off must not skew the fit
+        (x, y), _, scale, _ = matches[-1]
+        matches[-1] = (positions[-1], (x, y + 0.015), scale, 0.81)
+        self.assertEqual(AnchorAligner._fit_layout(matches, CalibratedLayout()).to_dict(), expected)
+
+
+class LayoutRegistryTests(SimpleTestCase):
+    """Layouts are calibrated once per resolution and fit the 16:9 UI frame inside bars"""
+
+    def setUp(self):
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, 'suspension_example.JPG'))
+        self.image = cv2.resize(image, (960, 540), interpolation=cv2.INTER_AREA)
+
+    def test_layout_cached_per_resolution(self):
+        registry = LayoutRegistry()
+        pillarboxed = cv2.copyMakeBorder(self.image, 0, 0, 60, 60, cv2.BORDER_CONSTANT, value=0)
+        loads = []
+
+        def loader(img):
+            def load_image():
+                loads.append(img.shape)
+                return img
+            return load_image
+
+        first = registry.get_layout(1080, 540, loader(pillarboxed))
+        self.assertIs(registry.get_layout(1080, 540, loader(pillarboxed)), first)
+        self.assertIs(registry.get_layout(1080, 540), first)
+        self.assertEqual(len(loads), 1)
+
+        # A new resolution is calibrated on its own
+        self.assertTrue(registry.get_layout(960, 540, loader(self.image)).is_identity)
+        self.assertEqual(len(loads), 2)
+
+        # Blank frames and failures aren't cached, so the next screenshot retries
+        blank = np.zeros((540, 720, 3), dtype=np.uint8)
+        self.assertEqual(registry.get_layout(720, 540, loader(blank)).source, 'blank')
+        with self.assertLogs('services.layout_registry', 'ERROR'):
+            self.assertTrue(registry.get_layout(720, 540, mock.Mock(side_effect=ValueError('truncated'))).is_identity)
+        self.assertIsNot(registry.get_layout(720, 540, loader(pillarboxed)), first)
+        self.assertEqual(len(loads), 4)
+
+        manual = CalibratedLayout(0.1, 0.0, 0.8, 1.0, source='manual')
+        registry.register(1080, 540, manual)
+        self.assertIs(registry.get_layout(1080, 540), manual)
+        registry.clear()
+        self.assertEqual(registry.get_layout(1080, 540).source, 'default')
+
+    def test_transform_region(self):
+        regions = {'a': (0.0, 0.0, 1.0, 1.0), 'b': (0.25, 0.5, 0.75, 0.6)}
+        identity = CalibratedLayout()
+        self.assertTrue(identity.is_identity)
+        self.assertIs(identity.transform_regions(regions), regions)
+
+        layout = CalibratedLayout(offset_x=0.1, offset_y=0.05, scale_x=0.8, scale_y=0.9)
+        self.assertFalse(layout.is_identity)
+        transformed = layout.transform_regions(regions)
+        for name, expected in (('a', (0.1, 0.05, 0.9, 0.95)), ('b', (0.3, 0.5, 0.7, 0.59))):
+            for actual, coordinate in zip(transformed[name], expected):
+                self.assertAlmostEqual(actual, coordinate)
+
+    def test_calibrates_frames_that_are_not_16_9(self):
+        # Black bars on both sides or above and below are cut off
+        pillarboxed = cv2.copyMakeBorder(self.image, 0, 0, 60, 60, cv2.BORDER_CONSTANT, value=0)
+        self.assertEqual(calibrate_layout(pillarboxed).to_dict(),
+                         CalibratedLayout(0.0556, 0.0, 0.8889, 1.0, source='content_area').to_dict())
+        letterboxed = cv2.copyMakeBorder(self.image, 30, 30, 0, 0, cv2.BORDER_CONSTANT, value=0)
+        self.assertEqual(calibrate_layout(letterboxed).to_dict(),
+                         CalibratedLayout(0.0, 0.05, 1.0, 0.9, source='content_area').to_dict())
+
+        # A 16:10 picture with no bars has the 16:9 frame centred in it
+        stretched = cv2.resize(self.image, (960, 600), interpolation=cv2.INTER_AREA)
+        self.assertEqual(calibrate_layout(stretched).to_dict(),
+                         CalibratedLayout(0.0, 0.05, 1.0, 0.9, source='content_area').to_dict())
+
+        # A bar on one side only is dark UI, not pillarboxing, so the frame stays centred
+        one_sided = cv2.copyMakeBorder(self.image, 0, 0, 120, 0, cv2.BORDER_CONSTANT, value=0)
+        self.assertEqual(calibrate_layout(one_sided).to_dict(), calibrate_layout(pillarboxed).to_dict())
+
+
+class ScreenshotContextTests(SimpleTestCase):
+    """Each plane of a screenshot is computed at most once and shared by every reader"""
+
+    def setUp(self):
+        self.path = os.path.join(EXAMPLE_DIR, 'transmission_example.jpg')
+
+    def test_planes_computed_once(self):
+        context = ScreenshotContext(image_path=self.path)
+        with mock.patch('services.screenshot_context.cv2.imread', wraps=cv2.imread) as imread, \
+                mock.patch('services.screenshot_context.cv2.cvtColor', wraps=cv2.cvtColor) as cvt_color:
+            for _ in range(2):
+                for name in ('bgr', 'gray', 'inverted', 'blurred', 'edges', 'binary'):
+                    plane = context.get_plane(name)
+                    self.assertIs(getattr(context, name), plane)
+        self.assertEqual(imread.call_count, 1)
+        self.assertEqual(cvt_color.call_count, 1)
+
+        with self.assertRaises(ScreenshotContextError):
+            context.get_plane('sharpened')
+
+    def test_size_read_without_decoding(self):
+        context = ScreenshotContext(image_path=self.path)
+        self.assertEqual(context.size, (3840, 2160))
+        self.assertNotIn('bgr', context._planes)
+
+        with self.assertRaises(ScreenshotContextError):
+            ScreenshotContext()
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as f:
+            f.write(b'not a jpeg')
+            f.flush()
+            with self.assertRaises(ScreenshotContextError):
+                ScreenshotContext(image_path=f.name).bgr
+
+    def test_crop_is_a_clamped_view(self):
+        image = np.arange(200 * 100, dtype=np.uint8).reshape(100, 200)
+        context = ScreenshotContext(image=cv2.cvtColor(image, cv2.COLOR_GRAY2BGR))
+        crop = context.crop((0.5, 0.25, 1.2, 0.5), 'gray')
+        self.assertEqual(crop.shape, (25, 100))
+        self.assertTrue(np.shares_memory(crop, context.gray))
+
+    def test_derived_results_shared_between_readers(self):
+        context = ScreenshotContext(image_path=self.path)
+        compute = mock.Mock(return_value=42)
+        self.assertEqual(context.memoize('answer', compute), 42)
+        self.assertEqual(context.memoize('answer', compute), 42)
+        compute.assert_called_once()
+
+        # Every processor reading this screenshot gets the same layout without aligning again
+        layout = get_screenshot_layout(context)
+        with mock.patch('services.layout_registry.get_anchor_aligner') as get_aligner:
+            self.assertIs(get_screenshot_layout(context), layout)
+        get_aligner.assert_not_called()
+
+
+class OCRScreenshotsCommandTests(SimpleTestCase):
+    """The batch OCR command writes one JSON Lines record per screenshot"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = temp_dir.name
+        os.makedirs(os.path.join(self.root, 'power'))
+
+        with open(os.path.join(EXAMPLE_DIR, 'transmission_example.jpg'), 'rb') as f:
+            data = f.read()
+        self.write('capture.JPG', data)
+        self.write(os.path.join('power', 'capture_2.jpg'), b'not a jpeg')
+        self.write('notes.txt', b'not a screenshot')
+
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), 'wb') as f:
+            f.write(data)
+
+    def run_command(self, *args):
+        output = os.path.join(self.root, 'results.jsonl')
+        call_command('ocr_screenshots', *args, '--workers', '1', '--output', output, stderr=mock.Mock())
+        with open(output, encoding='utf-8') as f:
+            return {os.path.relpath(record['file'], self.root): record for record in map(json.loads, f)}
+
+    def test_collects_images_from_directories_and_globs(self):
+        collect = OCRScreenshotsCommand.collect_files
+        self.assertEqual(collect([self.root], False), [os.path.join(self.root, 'capture.JPG')])
+        self.assertEqual(collect([self.root], True), [
+            os.path.join(self.root, 'capture.JPG'),
+            os.path.join(self.root, 'power', 'capture_2.jpg'),
+        ])
+        self.assertEqual(collect([os.path.join(self.root, '*', '*.jpg'), os.path.join(self.root, 'notes.txt')], False),
+                         [os.path.join(self.root, 'power', 'capture_2.jpg')])
+
+        with self.assertRaises(CommandError):
+            call_command('ocr_screenshots', os.path.join(self.root, 'missing'), stderr=mock.Mock())
+
+    def test_classify_by_name(self):
+        self.assertEqual(classify_by_name('/shots/Gearbox 1.png'), 'transmission')
+        self.assertEqual(classify_by_name('/shots/power/IMG_0001.jpg'), 'power')
+        self.assertIsNone(classify_by_name('/shots/IMG_0001.jpg'))
+
+    def test_records_results_and_errors_per_file(self):
+        with self.assertLogs(level='ERROR'):
+            records = self.run_command(self.root, '--recursive')
+        self.assertEqual(set(records), {'capture.JPG', os.path.join('power', 'capture_2.jpg')})
+
+        capture = records['capture.JPG']
+        self.assertEqual((capture['type'], capture['status']), ('transmission', 'ok'))
+        self.assertEqual(capture['data']['num_gears'], 6)
+        self.assertEqual(set(capture['timings_ms']), {'classify', 'ocr', 'total'})
+
+        # Unreadable images fall back to the name for their type and are reported, not raised
+        broken = records[os.path.join('power', 'capture_2.jpg')]
+        self.assertEqual((broken['type'], broken['status']), ('power', 'error'))
+        self.assertIn('error', broken)
+
+    def test_type_option_skips_classification(self):
+        with mock.patch('spring_calc.management.commands.ocr_screenshots.classify_screenshot') as classify, \
+                mock.patch('spring_calc.management.commands.ocr_screenshots.extract_context_data',
+                           return_value={'num_gears': 6}) as extract:
+            records = self.run_command(os.path.join(self.root, 'capture.JPG'), '--type', 'transmission')
+        classify.assert_not_called()
+        self.assertEqual(extract.call_args.args[0], 'transmission')
+        self.assertEqual(records['capture.JPG']['data'], {'num_gears': 6})
+
+
+class UploadDecodingTests(SimpleTestCase):
+    """Uploads are decoded from memory and only touch the disk for debug output"""
+
+    def setUp(self):
+        with open(os.path.join(EXAMPLE_DIR, 'transmission_example.jpg'), 'rb') as f:
+            self.data = f.read()
+        self.expected = cv2.imread(os.path.join(EXAMPLE_DIR, 'transmission_example.jpg'))
+
+    def test_in_memory_upload_decoded_without_copy(self):
+        upload = SimpleUploadedFile('transmission.jpg', self.data, content_type='image/jpeg')
+        context = ScreenshotContext.from_upload(upload)
+        self.assertEqual(context.name, 'transmission.jpg')
+        self.assertIsNone(context.image_path)
+        self.assertTrue(np.shares_memory(np.frombuffer(context._buffer, dtype=np.uint8),
+                                         np.frombuffer(upload.file.getbuffer(), dtype=np.uint8)))
+        self.assertTrue(np.array_equal(context.bgr, self.expected))
+
+    def test_spooled_upload_read_once(self):
+        upload = TemporaryUploadedFile('transmission.jpg', 'image/jpeg', len(self.data), None)
+        self.addCleanup(upload.close)
+        upload.write(self.data)
+
+        context = ScreenshotContext.from_upload(upload)
+        self.assertEqual(bytes(context._buffer), self.data)
+        self.assertTrue(np.array_equal(context.bgr, self.expected))
+
+    def test_load_screenshot_writes_nothing_unless_debugging(self):
+        upload = SimpleUploadedFile('transmission.jpg', self.data, content_type='image/jpeg')
+        with mock.patch('services.debug_writer.get_debug_writer') as get_writer:
+            context = load_screenshot(upload, output_dir='/tmp/debug', debug_mode=False)
+            self.assertIsNone(context.debug_dir)
+            get_writer.assert_not_called()
+
+            context = load_screenshot(upload, output_dir='/tmp/debug', debug_mode=True)
+            self.assertEqual(context.debug_dir, '/tmp/debug')
+            get_writer.return_value.write_bytes.assert_called_once_with(
+                '/tmp/debug/processed_transmission.jpg', context._buffer)
+
+    def test_corrupt_upload_rejected_before_ocr(self):
+        upload = SimpleUploadedFile('transmission.jpg', self.data[:200], content_type='image/jpeg')
+        with self.assertLogs('services.image_processing', 'ERROR'):
+            with self.assertRaises(ImageProcessingError):
+                load_screenshot(upload)
+
+
+class DetectionPlaneTests(SimpleTestCase):
+    """Layout detection decodes large screenshots at reduced resolution, never below 1920 px"""
+
+    def test_reduction_factor_keeps_detection_width(self):
+        self.assertEqual(get_reduction_factor(1280), 1)
+        self.assertEqual(get_reduction_factor(1920), 1)
+        self.assertEqual(get_reduction_factor(2560), 1)
+        self.assertEqual(get_reduction_factor(3840), 2)
+        self.assertEqual(get_reduction_factor(7680), 4)
+        self.assertEqual(get_reduction_factor(20000), 8)
+        self.assertEqual(get_reduction_factor(3840, min_width=960), 4)
+
+    def test_4k_capture_decoded_reduced_from_disk(self):
+        context = ScreenshotContext(image_path=os.path.join(EXAMPLE_DIR, 'power_example.jpg'))
+        detection = context.detection
+
+        self.assertEqual(detection.factor, 2)
+        self.assertEqual(detection.size, (DETECTION_MIN_WIDTH, 1080))
+        self.assertIs(context.detection, detection)
+        # The full resolution image is never decoded for detection alone
+        self.assertNotIn('bgr', context._planes)
+        self.assertEqual(context.size, (3840, 2160))
+
+        detection.edges
+        self.assertNotIn('edges', context._planes)
+
+    def test_decoded_capture_downscaled_instead_of_decoded_again(self):
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, 'power_example.jpg'))
+        context = ScreenshotContext(image=image)
+        with mock.patch('services.screenshot_context.cv2.imread') as imread:
+            self.assertEqual(context.detection.size, (DETECTION_MIN_WIDTH, 1080))
+        imread.assert_not_called()
+
+        small = ScreenshotContext(image=cv2.resize(image, (1920, 1080), interpolation=cv2.INTER_AREA))
+        self.assertIs(small.detection, small)
+
+
+class PerspectiveCorrectionTests(SimpleTestCase):
+    """Phone photos of the TV are warped back into the canonical frame before OCR"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        image = cv2.imread(os.path.join(EXAMPLE_DIR, 'suspension_example.JPG'))
+        # Black UI still glows on a backlit panel, so the picture is lighter than the bezel
+        cls.screen = cv2.convertScaleAbs(cv2.resize(image, (1920, 1080), interpolation=cv2.INTER_AREA), alpha=0.85, beta=22)
+        tv = cv2.copyMakeBorder(cls.screen, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=(8, 8, 8))
+
+        # Photograph the TV from below and to the left
+        tv_corners = np.float32([[0, 0], [2000, 0], [2000, 1160], [0, 1160]])
+        photo_corners = np.float32([[420, 310], [2560, 420], [2480, 1690], [380, 1580]])
+        cls.homography = cv2.getPerspectiveTransform(tv_corners, photo_corners)
+        cls.photo = cv2.warpPerspective(tv, cls.homography, (3000, 2000), borderValue=(90, 100, 110))
+
+    def test_finds_screen_inside_bezel(self):
+        gray = cv2.resize(cv2.cvtColor(self.photo, cv2.COLOR_BGR2GRAY), (960, 640), interpolation=cv2.INTER_AREA)
+        picture = np.float32([[40, 40], [1960, 40], [1960, 1120], [40, 1120]]).reshape(4, 1, 2)
+        expected = cv2.perspectiveTransform(picture, self.homography).reshape(4, 2) / [3000, 2000]
+        self.assertLess(np.abs(find_screen_quad(gray) - expected).max(), 0.005)
+
+    def test_rectifies_photo_once(self):
+        context = ScreenshotContext(image=self.photo)
+        rectified = context.rectified
+        self.assertIsNot(rectified, context)
+        self.assertIs(context.rectified, rectified)
+        self.assertIs(rectified.rectified, rectified)
+        self.assertEqual(rectified.size, (1920, 1080))
+
+        difference = np.abs(rectified.gray.astype(int) - cv2.cvtColor(self.screen, cv2.COLOR_BGR2GRAY).astype(int))
+        self.assertLess(difference.mean(), 8)
+        self.assertEqual(SuspensionOCRProcessor().extract_tire_types(rectified), {'front_tires': 'SH', 'rear_tires': 'SH'})
+
+    def test_console_capture_left_unchanged(self):
+        context = ScreenshotContext(image=self.screen)
+        self.assertIs(context.rectified, context)
+
+    def test_orders_quad_corners(self):
+        corners = np.array([[[90, 95]], [[10, 5]], [[5, 90]], [[95, 10]]])
+        self.assertEqual(order_quad_points(corners).tolist(), [[10, 5], [95, 10], [90, 95], [5, 90]])
+
+
+class FieldConfidenceTests(SimpleTestCase):
+    """Every field carries a confidence, and only empty or doubtful fields are read twice"""
+
+    REGIONS = {
+        'sure': (0.1, 0.1, 0.2, 0.2),
+        'doubtful': (0.3, 0.3, 0.4, 0.4),
+        'empty': (0.5, 0.5, 0.6, 0.6),
+    }
+
+    def setUp(self):
+        self.context = ScreenshotContext(image=np.zeros((1080, 1920, 3), dtype=np.uint8))
+        self.context.memoize('layout', CalibratedLayout)
+
+    def process(self, processor, first_pass, second_pass):
+        with mock.patch.object(processor, '_read_region', side_effect=lambda context, name, *args: first_pass[name]), \
+                mock.patch.object(processor, '_reread_region', side_effect=lambda context, name, region: second_pass[name]) as reread:
+            results = processor.process_image(self.context, self.REGIONS)
+        return results, [call.args[1] for call in reread.call_args_list]
+
+    def test_only_doubtful_and_empty_fields_are_reread(self):
+        processor = OCRProcessor()
+        first_pass = {'sure': ('12.5', 0.97), 'doubtful': ('7', REREAD_CONFIDENCE - 0.1), 'empty': ('', 0.0)}
+        second_pass = {'doubtful': ('1.7', 0.9), 'empty': ('42', 0.8)}
+
+        results, reread = self.process(processor, first_pass, second_pass)
+        self.assertEqual(reread, ['doubtful', 'empty'])
+        self.assertEqual(results, {'sure': '12.5', 'doubtful': '1.7', 'empty': '42'})
+        self.assertEqual(processor.confidences, {'sure': 0.97, 'doubtful': 0.9, 'empty': 0.8})
+
+    def test_less_confident_reread_is_discarded(self):
+        processor = OCRProcessor()
+        first_pass = {'sure': ('12.5', 0.97), 'doubtful': ('7', 0.5), 'empty': ('', 0.0)}
+        second_pass = {'doubtful': ('1', 0.3), 'empty': ('', 0.0)}
+
+        results, _ = self.process(processor, first_pass, second_pass)
+        self.assertEqual(results, {'sure': '12.5', 'doubtful': '7'})
+        self.assertEqual(processor.confidences, {'sure': 0.97, 'doubtful': 0.5})
+
+        # A processor reused for the next screenshot starts from scratch
+        first_pass = {'sure': ('', 0.0), 'doubtful': ('3', 0.99), 'empty': ('', 0.0)}
+        second_pass = {'sure': ('', 0.0), 'empty': ('', 0.0)}
+        results, reread = self.process(processor, first_pass, second_pass)
+        self.assertEqual(reread, ['sure', 'empty'])
+        self.assertEqual(processor.confidences, {'doubtful': 0.99})
+
+    def test_tesseract_confidence_is_mean_word_confidence(self):
+        data = {
+            'text': ['', 'Front', 'Rear', '', '2.50'],
+            'conf': ['-1', '90', '70', '-1', '95.5'],
+            'block_num': [1, 1, 1, 1, 1],
+            'par_num': [1, 1, 1, 1, 1],
+            'line_num': [0, 1, 1, 2, 2],
+        }
+        with mock.patch('services.ocr_service.pytesseract.image_to_data', return_value=data):
+            text, confidence = OCRProcessor()._read_tesseract(mock.Mock(), '--psm 6', 'test')
+        self.assertEqual(text, 'Front Rear\n2.50')
+        self.assertAlmostEqual(confidence, (90 + 70 + 95.5) / 300)
+
+        with mock.patch('services.ocr_service.pytesseract.image_to_data', side_effect=RuntimeError('no tesseract')):
+            with self.assertLogs('services.ocr_service', 'WARNING'):
+                self.assertEqual(OCRProcessor()._read_tesseract(mock.Mock(), '--psm 6', 'test'), ('', 0.0))
+
+
+class PowerScreenshotTests(SimpleTestCase):
+    """The max power RPM comes from the screenshot text when it was read, else from the graph"""
+
+    # Text fields as read from power_example.jpg
+    TEXT_RESULTS = {'power_hp': 498, 'torque_kgfm': 50.1, 'min_rpm': 1300, 'max_rpm': 8755}
+
+    def process(self, text_results):
+        processor = PowerOCRProcessor()
+        with mock.patch.object(PowerOCRProcessor, 'process_image', return_value=dict(text_results)):
+            return processor.process_screenshot(os.path.join(EXAMPLE_DIR, 'power_example.jpg'))
+
+    def test_graph_gives_max_power_rpm(self):
+        results = self.process(self.TEXT_RESULTS)
+
+        # Power peaks just before the rev limit
+        self.assertGreater(results['max_power_rpm'], 7500)
+        self.assertLessEqual(results['max_power_rpm'], 8755)
+        self.assertTrue(results['engine_data_table'])
+
+    def test_glyph_classifier_reads_power_fields(self):
+        processor = PowerOCRProcessor()
+        with mock.patch.object(PowerOCRProcessor, '_read_tesseract', return_value=("", 0.0)) as read_tesseract:
+            results = processor.process_screenshot(os.path.join(EXAMPLE_DIR, 'power_example.jpg'))
+
+        for param_name, value in self.TEXT_RESULTS.items():
+            self.assertEqual(results[param_name], value, param_name)
+            self.assertGreaterEqual(results['field_confidence'][param_name], GLYPH_MIN_CONFIDENCE, param_name)
+
+        # Only the max power RPM text, which isn't a glyph field, went to Tesseract
+        tesseract_params = {call.args[2] for call in read_tesseract.call_args_list}
+        self.assertEqual(tesseract_params, {'max_power_rpm_region'})
+
+    def test_text_max_power_rpm_wins_over_graph(self):
+        graph_rpm = self.process(self.TEXT_RESULTS)['max_power_rpm']
+        results = self.process({**self.TEXT_RESULTS, 'max_power_rpm_region': 7000})
+
+        self.assertNotEqual(graph_rpm, 7000)
+        self.assertEqual(results['max_power_rpm'], 7000)
+        self.assertNotIn('max_power_rpm_region', results)
+
+
+class GearTableTests(SimpleTestCase):
+    """The gear table pass must label each ratio with the gear of its row"""
+
+    def test_reads_transmission_example_table(self):
+        processor = TransmissionOCRProcessor()
+        context = ScreenshotContext.from_source(os.path.join(EXAMPLE_DIR, 'transmission_example.jpg'))
+        table = processor.extract_gear_table(context)
+
+        self.assertEqual(table['gear_ratios'], {
+            '1st': 3.209, '2nd': 2.487, '3rd': 1.928, '4th': 1.494, '5th': 1.158, '6th': 0.897
+        })
+        self.assertEqual(table['num_gears'], 6)
+        self.assertEqual(table['final_drive'], 3.651)
+        for gear, speed in {'3rd': 153, '4th': 198, '5th': 255, '6th': 338}.items():
+            self.assertEqual(table['gear_speeds'].get(gear, speed), speed)
+
+    def test_discards_table_with_missing_row(self):
+        processor = TransmissionOCRProcessor()
+        layout = CalibratedLayout()
+        height = 1080
+
+        def row(gear_number, text):
+            center = (processor.first_gear_row + (gear_number - 1) * processor.gear_row_pitch) * height
+            return ((170, int(center) - 9, 66, 18), text, 0.95)
+
+        words = [row(1, '3.209'), row(3, '1.928'), row(4, '1.494'), row(5, '1.158'), row(6, '0.897')]
+        self.assertNotIn('gear_ratios', processor._parse_gear_table(words, 0, 0, height, layout))
+
+        # A ratio longer than the gear before it is a misread too
+        words.insert(1, row(2, '4.487'))
+        self.assertNotIn('gear_ratios', processor._parse_gear_table(words, 0, 0, height, layout))
+
+
+class BatchCalculationValidationTests(TestCase):
+    """The batch API rejects what the calculator forms' clean() rejects"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(
+            name='Test Car', drivetrain='FR', car_type='ROAD',
+            base_weight=1300, base_power=400, base_pp=500,
+            lever_ratio_front=0.8, lever_ratio_rear=0.8
+        )
+
+    def calculate(self, setups):
+        return [json.loads(line) for line in stream_batch_results(setups)]
+
+    def test_gearing_rules(self):
+        base = {
+            'type': 'gearing', 'vehicle': self.vehicle.id,
+            'top_speed_mph': 180, 'min_corner_speed_mph': 60, 'tire_diameter_inches': 26,
+            'power_hp': 500, 'min_rpm': 1000, 'max_rpm': 8000, 'max_power_rpm': 7000,
+            'torque_kgfm': 50, 'num_gears': 6, 'min_corner_gear': 1
+        }
+        lines = self.calculate([
+            base,
+            {**base, 'top_speed_mph': 80, 'min_corner_speed_mph': 100, 'max_rpm': 6000, 'max_power_rpm': 7000},
+            {**base, 'min_rpm': 3000, 'max_rpm': 3000, 'max_power_rpm': 3000},
+            {**base, 'min_rpm': 2000, 'max_power_rpm': 3000, 'max_rpm': 4000, 'min_corner_speed_mph': 100, 'top_speed_mph': 90},
+        ])
+
+        self.assertTrue(lines[0]['success'])
+        self.assertFalse(lines[1]['success'])
+        self.assertEqual(list(lines[1]['errors']), ['max_power_rpm'])
+        self.assertEqual(lines[2]['errors'], {'min_rpm': ["Minimum RPM must be less than maximum RPM."]})
+        self.assertEqual(lines[3]['errors'], {'min_corner_speed_mph': ["Corner speed must be less than top speed."]})
+
+    def test_suspension_ride_height_rule(self):
+        base = {'type': 'suspension', 'vehicle': self.vehicle.id, 'front_ride_height': 60, 'rear_ride_height': 150}
+        lines = self.calculate([base, {**base, 'rear_ride_height': 161}])
+
+        self.assertTrue(lines[0]['success'])
+        self.assertFalse(lines[1]['success'])
+        self.assertIn('__all__', lines[1]['errors'])
+
+    def test_endpoint_caps_request_body(self):
+        body = json.dumps({'type': 'suspension', 'setups': [{'vehicle': self.vehicle.id}] * 3})
+        response = self.client.post(reverse('calculate_batch'), body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+
+        with override_settings(BATCH_CALCULATION_MAX_BODY_SIZE=len(body) - 1):
+            response = self.client.post(reverse('calculate_batch'), body, content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+
+        # A body longer than its Content-Length claims is rejected after reading just past the limit
+        request = RequestFactory().post(reverse('calculate_batch'), body, content_type='application/json')
+        request.META['CONTENT_LENGTH'] = '10'
+        with override_settings(BATCH_CALCULATION_MAX_BODY_SIZE=20), \
+                mock.patch.object(request, 'read', wraps=request.read) as read:
+            self.assertEqual(calculate_batch(request).status_code, 413)
+        read.assert_called_once_with(21)
+
+
+class OCRVehicleSelectionTests(TestCase):
+    """Uploads whose car name matched no vehicle confidently ask for one instead of dropping the OCR result"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicles = [
+            Vehicle.objects.create(
+                name=name, drivetrain='FR', car_type='ROAD',
+                base_weight=1300, base_power=400, base_pp=500,
+                lever_ratio_front=0.8, lever_ratio_rear=0.8
+            )
+            for name in ('Test Car Coupe', 'Test Car Cabrio')
+        ]
+
+    def setUp(self):
+        # The catalog is rebuilt on commit, which never happens inside a test case
+        get_vehicle_catalog().invalidate()
+
+    def finished_upload(self):
+        job = OCRJob.objects.create(
+            screenshot_type='suspension', status='done',
+            result={'vehicle_name': 'Test Car', 'front_ride_height': 90}
+        )
+        session = self.client.session
+        session['ocr_jobs'] = {str(job.job_id): 'suspension'}
+        session['ocr_jobs_base'] = {}
+        session['ocr_screenshot_types'] = ['suspension']
+        session.save()
+        return job
+
+    def test_finished_upload_without_vehicle_asks_for_one(self):
+        self.finished_upload()
+        result = self.client.get(reverse('ocr_upload_status')).json()
+
+        self.assertNotIn('redirect_url', result)
+        self.assertEqual(result['select_vehicle_url'], reverse('select_ocr_vehicle'))
+        self.assertEqual(
+            sorted(candidate['id'] for candidate in result['vehicle_candidates']),
+            sorted(vehicle.id for vehicle in self.vehicles)
+        )
+        self.assertEqual(self.client.session['ocr_data']['front_ride_height'], 90)
+
+    def test_selected_vehicle_fills_in_ocr_data(self):
+        self.finished_upload()
+        self.client.get(reverse('ocr_upload_status'))
+        vehicle = self.vehicles[1]
+
+        response = self.client.post(
+            reverse('select_ocr_vehicle'), {'vehicle': vehicle.id},
+            headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+        result = response.json()
+
+        self.assertTrue(result['success'])
+        query = parse_qs(urlsplit(result['redirect_url']).query)
+        self.assertEqual(query['vehicle'], [str(vehicle.id)])
+        self.assertEqual(query['front_ride_height'], ['90'])
+        self.assertEqual(self.client.session['ocr_data']['vehicle'], vehicle.id)
+
+        # Later polls keep the chosen vehicle
+        result = self.client.get(reverse('ocr_upload_status')).json()
+        self.assertEqual(result['vehicle'], vehicle.id)
+        self.assertIn('redirect_url', result)
+
+    def test_unknown_vehicle_is_rejected(self):
+        self.finished_upload()
+        self.client.get(reverse('ocr_upload_status'))
+
+        response = self.client.post(
+            reverse('select_ocr_vehicle'), {'vehicle': 0},
+            headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('vehicle', self.client.session['ocr_data'])
+
+
+class ImmediateExecutor:
+    """Runs submitted OCR jobs on the calling thread"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@override_settings(DEBUG_OCR=False)
+class OCRJobTests(TransactionTestCase):
+    """Background OCR jobs, run synchronously; the worker closes its connections, so no test transaction"""
+
+    def enqueue(self, screenshot_type, filename):
+        with open(os.path.join(EXAMPLE_DIR, filename), 'rb') as f:
+            upload = SimpleUploadedFile(filename, f.read(), content_type='image/jpeg')
+        with mock.patch('spring_calc.ocr_jobs.get_executor', return_value=ImmediateExecutor()):
+            return enqueue_screenshot(screenshot_type, upload)
+
+    def test_finished_job_is_merged(self):
+        job = self.enqueue('transmission', 'transmission_example.jpg')
+        job.refresh_from_db()
+
+        self.assertEqual(get_job_status(job), 'done')
+        ocr_data = merge_job_results({'vehicle': 7, 'field_confidence': {'power_hp': 0.9}}, [job])
+        self.assertEqual(ocr_data['vehicle'], 7)
+        self.assertEqual(ocr_data['num_gears'], 6)
+        self.assertEqual(ocr_data['final_drive'], 3.651)
+        # Confidences of earlier screenshots are kept alongside the new ones
+        self.assertEqual(ocr_data['field_confidence']['power_hp'], 0.9)
+        self.assertIn('final_drive', ocr_data['field_confidence'])
+
+    def test_unreadable_screenshot_fails_job(self):
+        upload = SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg')
+        with mock.patch('spring_calc.ocr_jobs.get_executor', return_value=ImmediateExecutor()), \
+                self.assertLogs('spring_calc.ocr_jobs', 'ERROR'):
+            job = enqueue_screenshot('suspension', upload)
+        job.refresh_from_db()
+
+        self.assertEqual(get_job_status(job), 'failed')
+        self.assertTrue(job.error)
+        self.assertEqual(merge_job_results({}, [job]), {})
+
+    @override_settings(OCR_JOB_TIMEOUT_SECONDS=300)
+    def test_timeout_only_applies_to_running_jobs(self):
+        long_ago = timezone.now() - timedelta(seconds=600)
+        queued = OCRJob.objects.create(screenshot_type='power')
+        running = OCRJob.objects.create(screenshot_type='power', status='running')
+        OCRJob.objects.update(updated_at=long_ago)
+        queued.refresh_from_db()
+        running.refresh_from_db()
+
+        # A queued job is waiting for a free worker, however long that takes
+        self.assertEqual(get_job_status(queued), 'queued')
+        self.assertEqual(get_job_status(running), 'failed')
+
+        running.updated_at = timezone.now()
+        self.assertEqual(get_job_status(running), 'running')
+
+    @override_settings(MEDIA_ROOT='')
+    def test_debug_captures_stay_out_of_working_directory(self):
+        self.assertTrue(get_ocr_debug_root().startswith(tempfile.gettempdir()))
+
+        with self.settings(DEBUG_OCR_ROOT='/var/tmp/ocr'):
+            self.assertEqual(get_ocr_debug_root(), '/var/tmp/ocr')
+
+    def test_status_endpoints_report_session_jobs(self):
+        job = self.enqueue('transmission', 'transmission_example.jpg')
+        session = self.client.session
+        session['ocr_jobs'] = {str(job.job_id): 'transmission'}
+        session['ocr_jobs_base'] = {'vehicle': 7}
+        session['ocr_screenshot_types'] = ['transmission']
+        session.save()
+
+        result = self.client.get(reverse('ocr_job_status', args=[job.job_id])).json()
+        self.assertEqual(result['status'], 'done')
+        self.assertIn('redirect_url', result)
+
+        result = self.client.get(reverse('ocr_upload_status')).json()
+        self.assertEqual(result['jobs'][str(job.job_id)]['status'], 'done')
+        self.assertEqual(self.client.session['ocr_data']['num_gears'], 6)
+
+        # Jobs queued by another session aren't reported
+        other = OCRJob.objects.create(screenshot_type='power')
+        response = self.client.get(reverse('ocr_job_status', args=[other.job_id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class HistoryCompactorTests(TestCase):
+    """Deduplication and expiry of the calculation history"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(
+            name='Test Car', drivetrain='FR', car_type='ROAD',
+            base_weight=1300, base_power=400, base_pp=500,
+            lever_ratio_front=0.8, lever_ratio_rear=0.8
+        )
+
+    def spring(self, age, **values):
+        """Create a spring calculation created `age` ago"""
+        calculation = SpringCalculation.objects.create(
+            vehicle=self.vehicle, **{'front_spring_rate': 5.0, 'rear_spring_rate': 6.0, **values}
+        )
+        SpringCalculation.objects.filter(pk=calculation.pk).update(created_at=timezone.now() - age)
+        return calculation
+
+    def compact(self, retention_days=90, dry_run=False):
+        return HistoryCompactor(retention_days=retention_days, batch_size=2, dry_run=dry_run).run()
+
+    def test_saved_setup_repointed_to_kept_duplicate(self):
+        kept = self.spring(timedelta(days=10))
+        duplicate = self.spring(timedelta(days=10))
+        setup = SavedSetup.objects.create(name='Race', vehicle=self.vehicle, spring_calculation=duplicate)
+
+        report = self.compact()
+
+        self.assertEqual(report['SpringCalculation'], {'duplicates': 1, 'repointed': 1, 'expired': 0})
+        self.assertFalse(SpringCalculation.objects.filter(pk=duplicate.pk).exists())
+        setup.refresh_from_db()
+        self.assertEqual(setup.spring_calculation_id, kept.pk)
+
+    def test_rows_in_live_sessions_are_kept(self):
+        self.spring(timedelta(days=10))
+        duplicate = self.spring(timedelta(days=10))
+        expired = self.spring(timedelta(days=200), front_spring_rate=4.0)
+        for calculation in (duplicate, expired):
+            session = SessionStore()
+            session['spring_calculation_id'] = calculation.pk
+            session.create()
+
+        report = self.compact()
+
+        self.assertEqual(report['SpringCalculation'], {'duplicates': 0, 'repointed': 0, 'expired': 0})
+        self.assertEqual(SpringCalculation.objects.count(), 3)
+
+    def test_recent_duplicates_are_kept(self):
+        self.spring(DUPLICATE_GRACE_PERIOD / 2)
+        self.spring(DUPLICATE_GRACE_PERIOD / 2)
+
+        report = self.compact()
+
+        self.assertEqual(report['SpringCalculation']['duplicates'], 0)
+        self.assertEqual(SpringCalculation.objects.count(), 2)
+
+    def test_expiry_honours_retention_days(self):
+        self.spring(timedelta(days=10), front_spring_rate=1.0)
+        old = self.spring(timedelta(days=40), front_spring_rate=2.0)
+        referenced = self.spring(timedelta(days=40), front_spring_rate=3.0)
+        SavedSetup.objects.create(name='Keep', vehicle=self.vehicle, spring_calculation=referenced)
+
+        self.assertEqual(self.compact(retention_days=60)['SpringCalculation']['expired'], 0)
+        self.assertEqual(self.compact(retention_days=30)['SpringCalculation']['expired'], 1)
+        self.assertFalse(SpringCalculation.objects.filter(pk=old.pk).exists())
+        self.assertTrue(SpringCalculation.objects.filter(pk=referenced.pk).exists())
+
+    def test_dry_run_counts_match_real_run(self):
+        # Duplicate groups, one with a saved setup on a duplicate, some of them also expired
+        for age in (timedelta(days=10), timedelta(days=200)):
+            for rate in (1.0, 2.0):
+                for _ in range(3):
+                    self.spring(age, front_spring_rate=rate + age.days)
+        duplicate = SpringCalculation.objects.filter(front_spring_rate=202.0).order_by('-id').first()
+        SavedSetup.objects.create(name='Race', vehicle=self.vehicle, spring_calculation=duplicate)
+        GearCalculation.objects.create(vehicle=self.vehicle, tire_diameter_inches=26)
+
+        rows = SpringCalculation.objects.count()
+        dry_run = self.compact(dry_run=True)
+        self.assertEqual(SpringCalculation.objects.count(), rows)
+
+        self.assertEqual(dry_run['SpringCalculation'], {'duplicates': 8, 'repointed': 1, 'expired': 1})
+        self.assertEqual(self.compact(), dry_run)
+        self.assertEqual(SpringCalculation.objects.count(), rows - dry_run['SpringCalculation']['duplicates']
+                         - dry_run['SpringCalculation']['expired'])
+
+    def test_setup_stats_rebuilt_for_vehicles_that_lost_rows(self):
+        self.spring(timedelta(days=10))
+        self.spring(timedelta(days=10))
+        self.spring(timedelta(days=200), front_spring_rate=9.0)
+        rebuild_setup_stats()
+        self.assertEqual(VehicleSetupStats.objects.get(vehicle=self.vehicle).spring_count, 3)
+
+        report = compact_calculation_history(retention_days=90, vacuum=False)
+
+        self.assertEqual(report['stats_rebuilt'], 1)
+        stats = VehicleSetupStats.objects.get(vehicle=self.vehicle)
+        self.assertEqual(stats.spring_count, 1)
+        self.assertEqual(stats.metrics['front_spring_rate']['count'], 1)
+
+
+class ConditionalPageTests(TestCase):
+    """Pages built from the session answer repeat GETs with 304 until their inputs change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(
+            name='Test Car', drivetrain='FR', car_type='ROAD',
+            base_weight=1300, base_power=400, base_pp=500,
+            lever_ratio_front=0.8, lever_ratio_rear=0.8
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.calculate()
+        # The ETags include the CSRF cookie, which the first page view sets
+        self.get()
+
+    def calculate(self, **values):
+        """Make a new spring calculation the session's current one"""
+        calculation = SpringCalculation.objects.create(
+            vehicle=self.vehicle, **{'front_spring_rate': 5.0, 'rear_spring_rate': 6.0, **values}
+        )
+        session = self.client.session
+        session['spring_calculation_id'] = calculation.id
+        session.save()
+        return calculation
+
+    def get(self, url_name='complete_setup', etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse(url_name), headers=headers)
+
+    def test_repeat_get_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.get(etag=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_calculation_or_vehicle_change_changes_etag(self):
+        etag = self.get()['ETag']
+
+        self.calculate(front_spring_rate=7.0)
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_no_etag_while_messages_are_pending(self):
+        etag = self.get()['ETag']
+
+        # A failed vehicle selection leaves an error message to show
+        self.client.post(reverse('select_ocr_vehicle'), {'vehicle': 0})
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+        # Once shown, the page can be revalidated again
+        self.assertEqual(self.get(etag=etag).status_code, 304)
+
+    def test_make_etag_skips_requests_with_messages(self):
+        request = RequestFactory().get('/')
+        self.assertIsNotNone(make_etag(request, 'page', 1))
+        self.assertNotEqual(make_etag(request, 'page', 1), make_etag(request, 'page', 2))
+
+        request._messages = ['Setup saved']
+        self.assertIsNone(make_etag(request, 'page', 1))
+
+    def test_results_fragment_key_follows_derived_results_version(self):
+        calculation = self.calculate(front_spring_rate=8.0)
+
+        def fragment_key(version):
+            return make_template_fragment_key('complete_setup_results', [
+                # No gear calculation, so its id renders empty
+                calculation.id, '', self.vehicle.id, Vehicle.objects.get(pk=self.vehicle.pk).updated_at,
+                version, timezone.localdate().strftime('%Y%m%d')
+            ])
+
+        self.get()
+        self.assertIsNotNone(cache.get(fragment_key(DERIVED_RESULTS_VERSION)))
+
+        with mock.patch('spring_calc.views.setup_views.DERIVED_RESULTS_VERSION', DERIVED_RESULTS_VERSION + 1):
+            self.get()
+        self.assertIsNotNone(cache.get(fragment_key(DERIVED_RESULTS_VERSION + 1)))
+
+    def test_saved_setups_page_revalidates(self):
+        SavedSetup.objects.create(name='Race', vehicle=self.vehicle)
+        etag = self.get('saved_setups')['ETag']
+        self.assertEqual(self.get('saved_setups', etag=etag).status_code, 304)
+
+        SavedSetup.objects.create(name='Drift', vehicle=self.vehicle)
+        response = self.get('saved_setups', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SavedSetupListingTests(TestCase):
+    """Keyset pages of saved setups, newest first"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(
+            name='Test Car', drivetrain='FR', car_type='ROAD',
+            base_weight=1300, base_power=400, base_pp=500,
+            lever_ratio_front=0.8, lever_ratio_rear=0.8
+        )
+        cls.setups = [SavedSetup.objects.create(name=f'Setup {index}', vehicle=cls.vehicle) for index in range(7)]
+
+        # Two setups saved later, five sharing the same instant
+        now = timezone.now()
+        SavedSetup.objects.filter(pk__in=[setup.pk for setup in cls.setups[:5]]).update(date_saved=now - timedelta(hours=1))
+        SavedSetup.objects.filter(pk__in=[setup.pk for setup in cls.setups[5:]]).update(date_saved=now)
+
+    def walk(self, page_size):
+        """Collect the setup ids of every page, and the pages' sizes"""
+        ids, sizes, cursor = [], [], None
+        while True:
+            page = get_saved_setups_page(cursor=cursor, page_size=page_size)
+            ids += [setup.id for setup in page['setups']]
+            sizes.append(len(page['setups']))
+            if not page['has_more']:
+                self.assertIsNone(page['next_cursor'])
+                return ids, sizes
+            cursor = page['next_cursor']
+
+    def test_ties_on_date_saved_span_pages(self):
+        expected = [setup.id for setup in SavedSetup.objects.order_by('-date_saved', '-id')]
+
+        for page_size in (1, 2, 3, 4):
+            ids, _ = self.walk(page_size)
+            self.assertEqual(ids, expected, page_size)
+
+    def test_last_full_page_has_no_cursor(self):
+        ids, sizes = self.walk(7)
+        self.assertEqual(sizes, [7])
+
+        page = get_saved_setups_page(page_size=6)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(decode_cursor(page['next_cursor'])[1], page['setups'][-1].id)
+
+        page = get_saved_setups_page(cursor=page['next_cursor'], page_size=6)
+        self.assertEqual(len(page['setups']), 1)
+        self.assertFalse(page['has_more'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_cursor_round_trip_and_invalid_cursors(self):
+        setup = SavedSetup.objects.get(pk=self.setups[0].pk)
+        self.assertEqual(decode_cursor(encode_cursor(setup)), (setup.date_saved, setup.id))
+
+        for cursor in ('garbage', 'bm8tc2VwYXJhdG9y', encode_cursor(setup)[:-3]):
+            with self.assertRaises(InvalidCursor):
+                get_saved_setups_page(cursor=cursor)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('saved_setups'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [setup.id for setup in response.context['setups']],
+            [setup.id for setup in get_saved_setups_page()['setups']]
+        )
+
+        response = self.client.get(reverse('saved_setups_api'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.json()['errors'])
+
+    @override_settings(SAVED_SETUPS_PAGE_SIZE=3, SAVED_SETUPS_MAX_PAGE_SIZE=5)
+    def test_page_size_is_clamped(self):
+        self.assertEqual(get_page_size(), 3)
+        self.assertEqual(get_page_size(''), 3)
+        self.assertEqual(get_page_size('many'), 3)
+        self.assertEqual(get_page_size('0'), 1)
+        self.assertEqual(get_page_size(-4), 1)
+        self.assertEqual(get_page_size('50'), 5)
+
+        result = self.client.get(reverse('saved_setups_api'), {'page_size': 50}).json()
+        self.assertEqual(len(result['setups']), 5)
+        self.assertTrue(result['has_more'])
+
+    def test_load_form_posts_to_saved_setups(self):
+        calculation = SpringCalculation.objects.create(vehicle=self.vehicle)
+        setup = SavedSetup.objects.create(name='Race', vehicle=self.vehicle, spring_calculation=calculation)
+
+        response = self.client.get(reverse('saved_setups'))
+        self.assertContains(response, f'action="{reverse("saved_setups")}"')
+
+        response = self.client.post(reverse('saved_setups'), {'setup_id': setup.id})
+        self.assertRedirects(response, reverse('complete_setup'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['spring_calculation_id'], calculation.id)
+
+
+class DerivedResultsTests(TestCase):
+    """Derived results are stored with each calculation and brought up to date once on read"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(
+            name='Test Car', drivetrain='FR', car_type='ROAD',
+            base_weight=1300, base_power=400, base_pp=500,
+            lever_ratio_front=0.8, lever_ratio_rear=0.8
+        )
+
+    def gear_calculation(self, **values):
+        """Build a gear calculation the way calculate_gears does, returning it with its live gear speeds"""
+        calculation = GearCalculation(vehicle=self.vehicle, tire_diameter_inches=26.5, **values)
+        calculation.gear_ratios, calculation.final_drive = calculate_optimal_gear_ratios(
+            num_gears=calculation.num_gears,
+            top_speed_mph=calculation.top_speed_mph,
+            min_corner_speed_mph=calculation.min_corner_speed_mph,
+            max_rpm=calculation.max_rpm,
+            min_rpm=calculation.min_rpm,
+            tire_diameter_inches=calculation.tire_diameter_inches,
+            power_hp=calculation.power_hp,
+            max_power_rpm=calculation.max_power_rpm,
+            min_corner_gear=calculation.min_corner_gear
+        )
+        gear_speeds = generate_gear_speeds(
+            gear_ratios=calculation.gear_ratios,
+            final_drive=calculation.final_drive,
+            max_power_rpm=calculation.max_power_rpm,
+            tire_diameter_inches=calculation.tire_diameter_inches
+        )
+        return calculation, gear_speeds
+
+    def test_stale_spring_calculation_is_recomputed_once(self):
+        calculation = SpringCalculation.objects.create(
+            vehicle=self.vehicle, front_spring_rate=5.0, rear_spring_rate=6.0, derived_version=0
+        )
+
+        with self.assertNumQueries(1):
+            ensure_derived_results(calculation)
+        with self.assertNumQueries(0):
+            ensure_derived_results(calculation)
+
+        calculation.refresh_from_db()
+        self.assertEqual(calculation.derived_version, DERIVED_RESULTS_VERSION)
+        self.assertIsNotNone(calculation.front_compression)
+        self.assertIsNotNone(calculation.rear_extension)
+
+    def test_complete_setup_stores_stale_results_on_first_view(self):
+        gear, gear_speeds = self.gear_calculation()
+        gear.save()
+        GearCalculation.objects.filter(pk=gear.pk).update(gear_speeds={}, engine_data=[], derived_version=0)
+        session = self.client.session
+        session['gear_calculation_id'] = gear.id
+        session.save()
+
+        self.client.get(reverse('complete_setup'))
+
+        gear.refresh_from_db()
+        self.assertEqual(gear.derived_version, DERIVED_RESULTS_VERSION)
+        self.assertEqual(gear.gear_speeds, gear_speeds)
+        self.assertTrue(gear.engine_data)
+
+    def test_stored_gear_speeds_match_live_calculation(self):
+        for values in ({}, {'num_gears': 7, 'max_power_rpm': 7200}, {'top_speed_mph': 150, 'min_corner_gear': 2}):
+            calculation, gear_speeds = self.gear_calculation(**values)
+
+            # Recomputed on read, and passed in by the calculator view
+            set_gear_derived_results(calculation)
+            recomputed = calculation.gear_speeds
+            set_gear_derived_results(calculation, gear_speeds)
+            calculation.save()
+            calculation.refresh_from_db()
+
+            self.assertEqual(recomputed, gear_speeds, values)
+            self.assertEqual(calculation.gear_speeds, gear_speeds, values)
+
+    def test_digitized_engine_table_replaces_estimate(self):
+        calculation, gear_speeds = self.gear_calculation()
+        table = [{'RPM': 1000, 'Torque_kgfm': 30.0, 'Torque_ftlb': 216.99, 'Power_hp': 41.9}]
+
+        set_gear_derived_results(calculation, gear_speeds, table)
+        self.assertEqual(calculation.engine_data, table)
+
+        set_gear_derived_results(calculation, gear_speeds)
+        self.assertNotEqual(calculation.engine_data, table)
+        self.assertTrue(calculation.engine_data)
+
+
+@mock.patch.object(HistoryRecorder, '_ensure_worker')
+class HistoryRecorderTests(TestCase):
+    """Write-behind history rows, flushed on the test thread instead of the worker"""
+
+    def tire_size(self, speed=100.0):
+        return TireSizeCalculation(speed=speed, rpm=7000, gear_ratio=1.2, final_drive=3.7, tire_size=26.0)
+
+    def test_flush_writes_one_bulk_insert_per_model(self, ensure_worker):
+        recorder = HistoryRecorder(flush_rows=100)
+        for speed in (100.0, 110.0, 120.0):
+            self.assertTrue(recorder.record(self.tire_size(speed)))
+        recorder.record(OCRJob(screenshot_type='power'))
+
+        self.assertEqual(recorder.pending, 4)
+        self.assertEqual(TireSizeCalculation.objects.count(), 0)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(recorder.flush(), 4)
+
+        self.assertEqual(recorder.pending, 0)
+        self.assertEqual(recorder.written, 4)
+        self.assertEqual(list(TireSizeCalculation.objects.order_by('id').values_list('speed', flat=True)),
+                         [100.0, 110.0, 120.0])
+        self.assertEqual(recorder.flush(), 0)
+
+    def test_row_threshold_wakes_the_worker(self, ensure_worker):
+        recorder = HistoryRecorder(flush_rows=2)
+        recorder.record(self.tire_size())
+        self.assertFalse(recorder._wake.is_set())
+
+        recorder.record(self.tire_size())
+        self.assertTrue(recorder._wake.is_set())
+
+    def test_full_queue_drops_rows(self, ensure_worker):
+        recorder = HistoryRecorder(max_pending_rows=2)
+        results = [recorder.record(self.tire_size()) for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(recorder.dropped, 1)
+        self.assertEqual(recorder.flush(), 2)
+
+    def test_disabled_recorder_saves_immediately(self, ensure_worker):
+        recorder = HistoryRecorder(enabled=False)
+        row = self.tire_size()
+
+        self.assertTrue(recorder.record(row))
+        self.assertIsNotNone(row.pk)
+        self.assertEqual(recorder.pending, 0)
+        ensure_worker.assert_not_called()
+
+
+class WorkspaceTests(TestCase):
+    """The session's vehicle and calculations are loaded at most once per request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle, cls.other_vehicle = [
+            Vehicle.objects.create(
+                name=name, drivetrain='FR', car_type='ROAD',
+                base_weight=1300, base_power=400, base_pp=500,
+                lever_ratio_front=0.8, lever_ratio_rear=0.8
+            )
+            for name in ('Test Car', 'Other Car')
+        ]
+        cls.spring = SpringCalculation.objects.create(vehicle=cls.vehicle, front_spring_rate=5.0, rear_spring_rate=6.0)
+        cls.gear = GearCalculation.objects.create(vehicle=cls.vehicle, tire_diameter_inches=26)
+
+    def workspace(self, **session):
+        return Workspace({'spring_calculation_id': self.spring.id, 'gear_calculation_id': self.gear.id, **session})
+
+    def test_each_object_is_loaded_once(self):
+        workspace = self.workspace(ocr_data={'vehicle': self.vehicle.id})
+
+        with self.assertNumQueries(2):
+            for _ in range(3):
+                self.assertEqual(workspace.spring_calculation, self.spring)
+                self.assertEqual(workspace.gear_calculation, self.gear)
+                # The vehicle comes with the calculations
+                self.assertEqual(workspace.vehicle, self.vehicle)
+                self.assertEqual(workspace.vehicle_name, 'Test Car')
+
+    def test_vehicle_falls_back_to_calculations(self):
+        workspace = self.workspace()
+        with self.assertNumQueries(1):
+            self.assertEqual(workspace.vehicle, self.vehicle)
+            self.assertEqual(workspace.vehicle_id, self.vehicle.id)
+
+        workspace = self.workspace(ocr_data={'vehicle': self.other_vehicle.id})
+        with self.assertNumQueries(1):
+            self.assertEqual(workspace.vehicle, self.other_vehicle)
+            self.assertEqual(workspace.vehicle, self.other_vehicle)
+
+    def test_missing_calculation_is_looked_up_once(self):
+        workspace = Workspace({'spring_calculation_id': self.spring.id + 1000})
+        with self.assertNumQueries(1):
+            self.assertIsNone(workspace.spring_calculation)
+            self.assertIsNone(workspace.spring_calculation)
+            self.assertIsNone(workspace.gear_calculation)
+            self.assertEqual(workspace.vehicle_name, 'Unknown Vehicle')
+
+    def test_new_calculation_replaces_the_loaded_one(self):
+        workspace = self.workspace()
+        self.assertEqual(workspace.vehicle, self.vehicle)
+
+        calculation = SpringCalculation.objects.create(vehicle=self.other_vehicle)
+        workspace.set_spring_calculation(calculation)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(workspace.spring_calculation, calculation)
+            self.assertEqual(workspace.vehicle, self.other_vehicle)
+        self.assertEqual(workspace.session['spring_calculation_id'], calculation.id)
+
+    def test_request_shares_one_workspace(self):
+        request = RequestFactory().get('/')
+        request.session = {}
+        self.assertIs(get_workspace(request), get_workspace(request))
+
+    def test_complete_setup_reads_each_calculation_once(self):
+        session = self.client.session
+        session.update({'spring_calculation_id': self.spring.id, 'gear_calculation_id': self.gear.id})
+        session.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('complete_setup'))
+
+        for model in (SpringCalculation, GearCalculation, Vehicle):
+            table = model._meta.db_table
+            selects = [query for query in queries if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']]
+            self.assertLessEqual(len(selects), 1, table)
+
+
+class SetupStatsTests(TestCase):
+    """Per-vehicle setup statistics kept up to date on insert match a full rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicles = [
+            Vehicle.objects.create(
+                name=name, drivetrain='FR', car_type='ROAD',
+                base_weight=1300, base_power=400, base_pp=500,
+                lever_ratio_front=0.8, lever_ratio_rear=0.8
+            )
+            for name in ('Test Car', 'Other Car')
+        ]
+
+    def record_calculations(self):
+        """Save a mix of spring and gear calculations, committing so the incremental statistics run"""
+        rng = np.random.default_rng(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(40):
+                SpringCalculation.objects.create(
+                    vehicle=self.vehicles[index % 2],
+                    front_spring_rate=round(rng.uniform(2, 8), 2),
+                    rear_spring_rate=round(rng.uniform(2, 8), 2),
+                    # Some setups have no roll bars, which must not count
+                    front_roll_bar=float(rng.integers(1, 10)) if index % 3 else None,
+                    rear_roll_bar=float(rng.integers(1, 10)),
+                    front_camber=round(rng.uniform(0, 3), 1),
+                    rear_camber=round(rng.uniform(0, 3), 1)
+                )
+            for index in range(15):
+                GearCalculation.objects.create(
+                    vehicle=self.vehicles[index % 2], tire_diameter_inches=26, final_drive=round(rng.uniform(3, 5), 3)
+                )
+
+    def stats_by_vehicle(self):
+        return {stats.vehicle_id: stats for stats in VehicleSetupStats.objects.all()}
+
+    def test_incremental_stats_match_rebuild(self):
+        self.record_calculations()
+        incremental = self.stats_by_vehicle()
+
+        self.assertEqual(rebuild_setup_stats(chunk_size=7), 2)
+        rebuilt = self.stats_by_vehicle()
+
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for vehicle_id, stats in rebuilt.items():
+            self.assertEqual(incremental[vehicle_id].spring_count, stats.spring_count)
+            self.assertEqual(incremental[vehicle_id].gear_count, stats.gear_count)
+            self.assertEqual(incremental[vehicle_id].metrics.keys(), stats.metrics.keys())
+            for metric, accumulator in stats.metrics.items():
+                expected = incremental[vehicle_id].metrics[metric]
+                self.assertEqual(expected['count'], accumulator['count'], metric)
+                self.assertEqual(expected['histogram'], accumulator['histogram'], metric)
+                self.assertEqual((expected['min'], expected['max']), (accumulator['min'], accumulator['max']), metric)
+                self.assertAlmostEqual(expected['sum'], accumulator['sum'], places=6)
+                self.assertAlmostEqual(expected['sum_sq'], accumulator['sum_sq'], places=6)
+
+        stats = rebuilt[self.vehicles[0].id]
+        self.assertEqual((stats.spring_count, stats.gear_count), (20, 8))
+        self.assertLess(stats.metrics['front_roll_bar']['count'], 20)
+
+    def test_summary_endpoint(self):
+        self.record_calculations()
+        summary = get_vehicle_setup_stats(self.vehicles[1].id)
+
+        self.assertEqual(summary['spring_count'], 20)
+        self.assertEqual(summary['metrics']['final_drive']['count'], 7)
+        camber = summary['metrics']['front_camber']
+        self.assertLessEqual(camber['min'], camber['p50'])
+        self.assertLessEqual(camber['p50'], camber['max'])
+
+        response = self.client.get(reverse('vehicle_setup_stats', args=[self.vehicles[1].id]))
+        self.assertEqual(response.json()['spring_count'], 20)
+
+        response = self.client.get(reverse('vehicle_setup_stats', args=[self.vehicles[1].id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SETUP_STATS_ON_INSERT=False)
+    def test_inserts_can_skip_incremental_stats(self):
+        self.record_calculations()
+        self.assertFalse(VehicleSetupStats.objects.exists())
+
+        rebuild_setup_stats(vehicle_ids=[self.vehicles[0].id])
+        self.assertEqual(list(VehicleSetupStats.objects.values_list('vehicle_id', flat=True)), [self.vehicles[0].id])
@@ -1,11 +1,15 @@
 from django.urls import path
 from .views.setup_views import dashboard
-from .views.upload_views import home, upload_screenshot
-from .views.calculation_views import calculate_springs, calculate_tire_diameter
+from .views.upload_views import (
+    home, upload_screenshot, upload_screenshot_async, ocr_upload_status, ocr_job_status, select_ocr_vehicle
+)
+from .views.calculation_views import calculate_springs, calculate_tire_diameter, calculate_batch
 from .views.gear_views import calculate_gears
 from .views.setup_views import (
     complete_setup, 
     saved_setups, 
+    saved_setups_api, 
+    vehicle_setup_stats, 
     delete_setup, 
     save_setup, 
     reset_calculations, 
@@ -16,16 +20,23 @@ urlpatterns = [
     # Home and upload views
     path('', home, name='home'),
     path('upload-screenshot/', upload_screenshot, name='upload_screenshot'),
+    path('upload-screenshot/async/', upload_screenshot_async, name='upload_screenshot_async'),
+    path('ocr-jobs/', ocr_upload_status, name='ocr_upload_status'),
+    path('ocr-jobs/<uuid:job_id>/', ocr_job_status, name='ocr_job_status'),
+    path('ocr-vehicle/', select_ocr_vehicle, name='select_ocr_vehicle'),
     path('dashboard/', dashboard, name='dashboard'),
 
     # Calculator views
     path('spring-calculator/', calculate_springs, name='calculate_springs'),
     path('gear-calculator/', calculate_gears, name='calculate_gears'),
     path('tire-calculator/', calculate_tire_diameter, name='calculate_tire_diameter'),
+    path('api/calculate/batch/', calculate_batch, name='calculate_batch'),
     
     # Setup management views
     path('complete-setup/', complete_setup, name='complete_setup'),
     path('saved-setups/', saved_setups, name='saved_setups'),
+    path('api/saved-setups/', saved_setups_api, name='saved_setups_api'),
+    path('api/vehicles/<int:vehicle_id>/setup-stats/', vehicle_setup_stats, name='vehicle_setup_stats'),
     path('delete-setup/', delete_setup, name='delete_setup'),
     path('save-setup/', save_setup, name='save_setup'),
     path('reset-calculations/', reset_calculations, name='reset_calculations'),
@@ -1,27 +1,43 @@
 # spring_calc/views/__init__.py
 
-from .calculation_views import calculate_springs, calculate_tire_diameter
+from .calculation_views import calculate_springs, calculate_tire_diameter, calculate_batch
 from .gear_views import calculate_gears
 from .setup_views import (
     complete_setup, 
     saved_setups, 
+    saved_setups_api, 
+    vehicle_setup_stats, 
     delete_setup, 
     save_setup, 
     reset_calculations,  # This is missing in setup_views.py
     reset_all_data
 )
-from .upload_views import upload_screenshot, home
+from .upload_views import (
+    upload_screenshot,
+    upload_screenshot_async,
+    ocr_upload_status,
+    ocr_job_status,
+    select_ocr_vehicle,
+    home
+)
 
 __all__ = [
     'calculate_springs',
     'calculate_gears',
     'calculate_tire_diameter',
+    'calculate_batch',
     'complete_setup',
     'saved_setups',
+    'saved_setups_api',
+    'vehicle_setup_stats',
     'delete_setup',
     'save_setup',
     'reset_calculations',
     'reset_all_data',
     'upload_screenshot',
+    'upload_screenshot_async',
+    'ocr_upload_status',
+    'ocr_job_status',
+    'select_ocr_vehicle',
     'home',
 ]
\ No newline at end of file
@@ -3,13 +3,19 @@ import logging
 import json
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 
 from ..models import SpringCalculation, TireSizeCalculation, Vehicle
 from ..forms import SpringCalculatorForm, TireSizeCalculatorForm
 from ..decorators import handle_view_exceptions, require_vehicle_selection, log_view_access
+from ..batch_calculations import BATCH_TYPES, DEFAULT_BATCH_MAX_BODY_SIZE, DEFAULT_BATCH_MAX_SETUPS, stream_batch_results
+from ..history import get_history_recorder
+from ..workspace import get_workspace
+from ..derived import set_spring_derived_results
+from ..conditional import conditional_page, workspace_etag
 
 from services.calculation_service import (
     calculate_spring_rates, 
@@ -17,24 +23,21 @@ from services.calculation_service import (
     calculate_damper_settings,
     calculate_roll_bar_stiffness,
     calculate_alignment_settings,
-    calculate_tire_diameter
+    calculate_tire_diameter as compute_tire_diameter
 )
 
 logger = logging.getLogger(__name__)
 
 @handle_view_exceptions
 @log_view_access
+@conditional_page(workspace_etag('ocr_data', 'suspension_form_data', include_catalog=True))
 def calculate_springs(request):
     """
     View to calculate optimal suspension settings
     """
     # Check if we have a previous calculation in the session
-    previous_calculation = None
-    if 'spring_calculation_id' in request.session:
-        try:
-            previous_calculation = SpringCalculation.objects.get(id=request.session['spring_calculation_id'])
-        except SpringCalculation.DoesNotExist:
-            pass
+    workspace = get_workspace(request)
+    previous_calculation = workspace.spring_calculation
             
     # Check if we have GET parameters (high priority)
     if request.method == 'GET' and request.GET:
@@ -55,11 +58,8 @@ def calculate_springs(request):
         
         # Special handling for vehicle ID if needed
         if 'vehicle' in ocr_data and isinstance(ocr_data['vehicle'], int):
-            try:
-                vehicle = Vehicle.objects.get(id=ocr_data['vehicle'])
-                initial_data['vehicle'] = vehicle
-            except Vehicle.DoesNotExist:
-                pass
+            if workspace.vehicle and workspace.vehicle.id == ocr_data['vehicle']:
+                initial_data['vehicle'] = workspace.vehicle
         
         # Create form with initial data
         form = SpringCalculatorForm(initial=initial_data)
@@ -174,11 +174,14 @@ def calculate_springs(request):
                 calculation.front_toe = alignment_settings['front_toe']
                 calculation.rear_toe = alignment_settings['rear_toe']
                 
+                # Store the damper settings so the summary page doesn't recompute them
+                set_spring_derived_results(calculation, damper_settings)
+                
                 # Save the calculation
                 calculation.save()
                 
                 # Store ID in session for persistence
-                request.session['spring_calculation_id'] = calculation.id
+                workspace.set_spring_calculation(calculation)
                 
                 # Save form data to session for persistence
                 form_data = {}
@@ -271,9 +274,9 @@ def calculate_tire_diameter(request):
             final_drive = form.cleaned_data['final_drive']
             
             # Calculate tire diameter
-            tire_diameter = calculate_tire_diameter(gear_ratio, rpm, speed, final_drive)
+            tire_diameter = compute_tire_diameter(gear_ratio, rpm, speed, final_drive)
             
-            # Save calculation to database
+            # Queue the calculation for the history table (nothing reads it back here)
             calculation = TireSizeCalculation(
                 speed=speed,
                 rpm=rpm,
@@ -281,7 +284,7 @@ def calculate_tire_diameter(request):
                 final_drive=final_drive,
                 tire_size=tire_diameter
             )
-            calculation.save()
+            get_history_recorder().record(calculation)
             
             # Return JSON response
             return JsonResponse({
@@ -307,4 +310,72 @@ def calculate_tire_diameter(request):
             'success': False,
             'error': str(e),
             'message': "An error occurred during calculation"
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+@handle_view_exceptions
+@csrf_exempt  # Called by scripts and tooling, not the calculator pages
+@require_http_methods(["POST"])
+def calculate_batch(request):
+    """
+    API endpoint to calculate many suspension and/or gearing setups in one request
+    
+    Accepts a JSON array of setups, or {"type": ..., "setups": [...]}, and
+    streams one NDJSON result line per setup as each chunk is calculated.
+    """
+    try:
+        # Large batches exceed DATA_UPLOAD_MAX_MEMORY_SIZE, so the body is read directly,
+        # capped at the batch limit whatever Content-Length claims
+        max_body_size = getattr(settings, 'BATCH_CALCULATION_MAX_BODY_SIZE', DEFAULT_BATCH_MAX_BODY_SIZE)
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        body = request.read(max_body_size + 1) if content_length <= max_body_size else b''
+        if content_length > max_body_size or len(body) > max_body_size:
+            return JsonResponse({
+                'success': False,
+                'message': f"Request body too large (limit {max_body_size} bytes)"
+            }, status=413)
+        
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': "Request body must be JSON"
+            }, status=400)
+        
+        default_type = 'suspension'
+        if isinstance(payload, dict):
+            default_type = payload.get('type', default_type)
+            payload = payload.get('setups')
+        
+        if not isinstance(payload, list) or default_type not in BATCH_TYPES:
+            return JsonResponse({
+                'success': False,
+                'message': "Expected a list of setups (type 'suspension' or 'gearing')"
+            }, status=400)
+        
+        max_setups = getattr(settings, 'BATCH_CALCULATION_MAX_SETUPS', DEFAULT_BATCH_MAX_SETUPS)
+        if len(payload) > max_setups:
+            return JsonResponse({
+                'success': False,
+                'message': f"Too many setups: {len(payload)} (limit {max_setups})"
+            }, status=413)
+        
+        logger.debug(f"Calculating batch of {len(payload)} setups")
+        
+        response = StreamingHttpResponse(
+            stream_batch_results(payload, default_type),
+            content_type='application/x-ndjson'
+        )
+        response['X-Batch-Size'] = str(len(payload))
+        return response
+            
+    except Exception as e:
+        logger.error(f"Error calculating batch: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'message': "An error occurred during calculation"
+        }, status=500)
@@ -9,6 +9,9 @@ from django.views.decorators.http import require_http_methods
 from ..models import GearCalculation, Vehicle
 from ..forms import GearCalculatorForm
 from ..decorators import handle_view_exceptions, require_vehicle_selection, log_view_access
+from ..workspace import get_workspace
+from ..derived import set_gear_derived_results
+from ..conditional import conditional_page, workspace_etag
 
 from services.gear_service import (
     calculate_optimal_gear_ratios,
@@ -21,6 +24,7 @@ logger = logging.getLogger(__name__)
 
 @handle_view_exceptions
 @log_view_access
+@conditional_page(workspace_etag('ocr_data', include_catalog=True))
 def calculate_gears(request):
     """
     View to calculate optimal gear ratios
@@ -31,45 +35,15 @@ def calculate_gears(request):
         print(f"DEBUG: GET parameters: {dict(request.GET)}")
     print("="*50)
 
-    # Get vehicle from session if available
-    vehicle_id = None
-    vehicle_name = "Unknown Vehicle"
-    vehicle = None
-
-    if 'ocr_data' in request.session:
-        gear_ratio = request.session['ocr_data'].get('gear_ratio')
-        rpm = request.session['ocr_data'].get('rpm')  
-        speed = request.session['ocr_data'].get('speed')
-        final_drive = request.session['ocr_data'].get('final_drive')
-        
-        if 'vehicle' in request.session['ocr_data']:
-            vehicle_id = request.session['ocr_data']['vehicle']
-            try:
-                vehicle = Vehicle.objects.get(id=vehicle_id)
-                vehicle_name = vehicle.name
-            except Vehicle.DoesNotExist:
-                pass
-    
-    # Also check spring_calculation_id and retrieve vehicle
-    elif 'spring_calculation_id' in request.session:
-        from ..models import SpringCalculation
-        try:
-            spring_calculation = SpringCalculation.objects.get(id=request.session['spring_calculation_id'])
-            vehicle = spring_calculation.vehicle
-            vehicle_id = vehicle.id
-            vehicle_name = vehicle.name
-        except SpringCalculation.DoesNotExist:
-            pass
-
-    
     # Check if we're coming back to this page from another page
-    # In that case, try to load the previous calculation from session
-    previous_calculation = None
-    if 'gear_calculation_id' in request.session:
-        try:
-            previous_calculation = GearCalculation.objects.get(id=request.session['gear_calculation_id'])
-        except GearCalculation.DoesNotExist:
-            pass
+    # In that case, reuse the previous calculation from session
+    workspace = get_workspace(request)
+    previous_calculation = workspace.gear_calculation
+    
+    # Get vehicle from session if available (the previous calculation's vehicle is already loaded)
+    vehicle = workspace.vehicle
+    vehicle_id = workspace.vehicle_id
+    vehicle_name = workspace.vehicle_name
     
     # Get OCR data from session if available
     ocr_data = request.session.get('ocr_data', {})
@@ -83,6 +57,10 @@ def calculate_gears(request):
     for field in ['power_hp', 'torque_kgfm', 'min_rpm', 'max_rpm', 'max_power_rpm', 'num_gears']:
         if field in ocr_data:
             initial_data[field] = ocr_data[field]
+    
+    # The transmission table's top gear speed is the current top speed setting
+    if 'top_speed' in ocr_data:
+        initial_data['top_speed_mph'] = ocr_data['top_speed']
 
     if request.method == 'GET' and 'ocr_data' in request.session:
         ocr_data = request.session['ocr_data']
@@ -200,11 +178,14 @@ def calculate_gears(request):
             calculation.acceleration_estimate = acceleration_estimate
             calculation.top_speed_calculated = top_speed_mph
             
+            # Store the gear speeds and engine table so the summary page doesn't recompute them
+            set_gear_derived_results(calculation, gear_speeds, engine_data_table)
+            
             # Save calculation to database
             calculation.save()
             
             # Store the calculation id in session
-            request.session['gear_calculation_id'] = calculation.id
+            workspace.set_gear_calculation(calculation)
             
             # Success message
             messages.success(request, "Gear ratio calculation successful!")
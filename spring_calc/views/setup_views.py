@@ -10,8 +10,19 @@ from django.views.decorators.csrf import csrf_exempt
 from ..models import SavedSetup, SpringCalculation, GearCalculation, Vehicle
 from ..forms import SavedSetupForm
 from ..decorators import handle_view_exceptions, require_vehicle_selection, log_view_access
-
-from services.calculation_service import calculate_damper_settings
+from ..workspace import get_workspace
+from ..derived import ensure_derived_results, DERIVED_RESULTS_VERSION
+from ..setup_stats import get_vehicle_setup_stats
+from ..setup_listing import get_saved_setups_page, serialize_setup, InvalidCursor
+from ..conditional import (
+    conditional_page,
+    workspace_etag,
+    workspace_last_modified,
+    make_etag,
+    not_modified_response,
+    set_page_validators,
+    get_fragment_cache_seconds
+)
 
 logger = logging.getLogger(__name__)
 
@@ -59,93 +70,42 @@ def reset_calculations(request):
 
 @handle_view_exceptions
 @log_view_access
+@conditional_page(workspace_etag(), workspace_last_modified)
 def complete_setup(request):
     """
     View to display a combined view of suspension and gear calculator results
     """
-    spring_calculation = None
-    gear_calculation = None
     damper_settings = None
     torque_curve_data = None
     engine_data = None
     gear_speeds = None
     
-    # Get vehicle information
-    vehicle_id = None
-    vehicle_name = "Unknown Vehicle"
-    vehicle = None
-    
-    if 'ocr_data' in request.session and 'vehicle' in request.session['ocr_data']:
-        vehicle_id = request.session['ocr_data']['vehicle']
-        try:
-            vehicle = Vehicle.objects.get(id=vehicle_id)
-            vehicle_name = vehicle.name
-        except Vehicle.DoesNotExist:
-            pass
+    # Get vehicle information and the current calculations from the request's workspace
+    workspace = get_workspace(request)
+    spring_calculation = workspace.spring_calculation
+    gear_calculation = workspace.gear_calculation
+    vehicle = workspace.vehicle
+    vehicle_name = workspace.vehicle_name
     
-    # Retrieve spring calculation if available
-    if 'spring_calculation_id' in request.session:
-        try:
-            spring_calculation = SpringCalculation.objects.get(id=request.session['spring_calculation_id'])
-            
-            # Initialize vehicle from spring calculation if not already set
-            if not vehicle and spring_calculation.vehicle:
-                vehicle = spring_calculation.vehicle
-                vehicle_name = vehicle.name
-            
-            # Calculate damper values (these were not stored in the model)
-            if spring_calculation:
-                # Use vehicle_weight from spring_calculation
-                vehicle_weight = spring_calculation.vehicle_weight
-                front_weight_distribution = spring_calculation.front_weight_distribution
-                
-                # Calculate damper settings
-                damper_settings = calculate_damper_settings(
-                    spring_rates=(spring_calculation.front_spring_rate, spring_calculation.rear_spring_rate),
-                    vehicle_weight=vehicle_weight,
-                    front_weight_distribution=front_weight_distribution,
-                    corner_entry_adjustment=spring_calculation.corner_entry_adjustment,
-                    corner_exit_adjustment=spring_calculation.corner_exit_adjustment,
-                    front_tire_type=spring_calculation.front_tires,
-                    rear_tire_type=spring_calculation.rear_tires
-                )
-        except SpringCalculation.DoesNotExist:
-            pass
+    # Derived results are stored with each calculation; older rows are filled in once here
+    if spring_calculation:
+        ensure_derived_results(spring_calculation)
+        damper_settings = {
+            'front_compression': spring_calculation.front_compression,
+            'front_extension': spring_calculation.front_extension,
+            'rear_compression': spring_calculation.rear_compression,
+            'rear_extension': spring_calculation.rear_extension,
+        }
     
-    # Retrieve gear calculation if available
-    if 'gear_calculation_id' in request.session:
-        try:
-            gear_calculation = GearCalculation.objects.get(id=request.session['gear_calculation_id'])
-            
-            # Initialize vehicle from gear calculation if not already set
-            if not vehicle and gear_calculation.vehicle:
-                vehicle = gear_calculation.vehicle
-                vehicle_name = vehicle.name
-            
-            # Prepare torque curve data for the graph
-            if gear_calculation.torque_curve:
-                torque_curve_data = gear_calculation.torque_curve
-            
-            # Calculate gear speeds
-            if gear_calculation.gear_ratios and gear_calculation.final_drive:
-                from services.gear_service import generate_gear_speeds
-                gear_speeds = generate_gear_speeds(
-                    gear_ratios=gear_calculation.gear_ratios,
-                    final_drive=gear_calculation.final_drive,
-                    max_power_rpm=gear_calculation.max_power_rpm,
-                    tire_diameter_inches=gear_calculation.tire_diameter_inches
-                )
-                
-                # Generate engine performance data for table
-                engine_data = generate_engine_data(
-                    min_rpm=gear_calculation.min_rpm,
-                    max_rpm=gear_calculation.max_rpm,
-                    max_power_rpm=gear_calculation.max_power_rpm,
-                    torque_kgfm=gear_calculation.torque_kgfm,
-                    power_hp=gear_calculation.power_hp
-                )
-        except GearCalculation.DoesNotExist:
-            pass
+    if gear_calculation:
+        ensure_derived_results(gear_calculation)
+        
+        # Prepare torque curve data for the graph
+        if gear_calculation.torque_curve:
+            torque_curve_data = gear_calculation.torque_curve
+        
+        gear_speeds = gear_calculation.gear_speeds or None
+        engine_data = gear_calculation.engine_data or None
     
     context = {
         'spring_calculation': spring_calculation,
@@ -182,6 +142,8 @@ def complete_setup(request):
         'gear_speeds': gear_speeds,
         'gear_graph_data': json.dumps(gear_graph_data) if gear_graph_data else None,
         'debug': False,  # Set to True to show debug information
+        'fragment_cache_seconds': get_fragment_cache_seconds(),
+        'derived_results_version': DERIVED_RESULTS_VERSION,
     }
     
     # Add damper settings to context if available
@@ -294,8 +256,6 @@ def saved_setups(request):
     """
     View to display and load saved setups
     """
-    setups = SavedSetup.objects.all().order_by('-date_saved')
-    
     if request.method == 'POST':
         # Handle loading a setup
         setup_id = request.POST.get('setup_id')
@@ -329,7 +289,106 @@ def saved_setups(request):
             except SavedSetup.DoesNotExist:
                 messages.error(request, "Setup not found.")
     
-    return render(request, 'spring_calc/saved_setups.html', {'setups': setups})
+    # Unusable filters or cursors fall back to the first, unfiltered page
+    filters, errors = get_listing_filters(request)
+    if errors:
+        filters = {}
+    try:
+        page = get_saved_setups_page(cursor=request.GET.get('cursor'), **filters)
+    except InvalidCursor:
+        page = get_saved_setups_page(**filters)
+    
+    # Setups aren't edited once saved, so the page's rows and their vehicles identify its content
+    etag = make_etag(
+        request,
+        'saved_setups',
+        [[setup.id, setup.vehicle.updated_at] for setup in page['setups']],
+        page['next_cursor'],
+        filters
+    )
+    response = not_modified_response(request, etag)
+    if response is None:
+        response = render(request, 'spring_calc/saved_setups.html', {
+            'setups': page['setups'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more'],
+            'is_first_page': not request.GET.get('cursor'),
+            'filters': filters,
+        })
+    return set_page_validators(response, etag)
+
+@handle_view_exceptions
+@require_http_methods(["GET"])
+def saved_setups_api(request):
+    """
+    JSON endpoint listing saved setups a page at a time
+    
+    Query parameters: vehicle, user, page_size and cursor (the previous
+    page's next_cursor).
+    """
+    filters, errors = get_listing_filters(request)
+    if errors:
+        return JsonResponse({
+            'success': False,
+            'errors': errors,
+            'message': "Invalid filter"
+        }, status=400)
+    
+    try:
+        page = get_saved_setups_page(
+            cursor=request.GET.get('cursor'),
+            page_size=request.GET.get('page_size'),
+            **filters
+        )
+    except InvalidCursor:
+        return JsonResponse({
+            'success': False,
+            'errors': {'cursor': ["Invalid cursor."]},
+            'message': "Invalid cursor"
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'setups': [serialize_setup(setup) for setup in page['setups']],
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more'],
+    })
+
+@handle_view_exceptions
+@require_http_methods(["GET"])
+def vehicle_setup_stats(request, vehicle_id):
+    """
+    JSON endpoint with the precomputed setup statistics for a vehicle
+    """
+    stats = get_vehicle_setup_stats(vehicle_id)
+    if stats is None:
+        return JsonResponse({
+            'success': False,
+            'message': "No setup statistics for this vehicle"
+        }, status=404)
+    
+    return JsonResponse({'success': True, **stats})
+
+def get_listing_filters(request):
+    """
+    Read the vehicle and user filters from the query string
+    
+    Returns:
+        tuple: (filters for get_saved_setups_page, errors keyed by parameter)
+    """
+    filters = {}
+    errors = {}
+    
+    for param, key in (('vehicle', 'vehicle_id'), ('user', 'user_id')):
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            filters[key] = int(value)
+        except ValueError:
+            errors[param] = ["Enter a whole number."]
+    
+    return filters, errors
 
 @handle_view_exceptions
 @log_view_access
@@ -530,43 +589,3 @@ def clear_session_calculation_data(request):
     request.session.save()
     
     return True
-
-def generate_engine_data(min_rpm, max_rpm, max_power_rpm, torque_kgfm, power_hp, num_points=10):
-    """
-    Generate engine performance data for display in the table
-    
-    Returns:
-        list of dicts with RPM, Torque, and Power values
-    """
-    from services.gear_service import generate_torque_curve
-    
-    # Generate torque curve data
-    torque_curve = generate_torque_curve(
-        min_rpm=min_rpm,
-        max_rpm=max_rpm,
-        max_power_rpm=max_power_rpm,
-        torque_kgfm=torque_kgfm,
-        power_hp=power_hp,
-        num_points=num_points
-    )
-    
-    # Calculate power values
-    engine_data = []
-    
-    for rpm, torque in torque_curve:
-        # Calculate power (HP) at this RPM point
-        # Power (HP) = Torque (kg·m) × RPM / 5252 × 7.124
-        # 7.124 is the conversion factor from kg·m to lb·ft
-        power = (torque * rpm / 5252) * 7.124
-        
-        # Convert torque from kg·m to ft·lb
-        torque_ftlb = torque * 7.233
-        
-        engine_data.append({
-            'RPM': int(rpm),
-            'Torque_kgfm': float(torque),
-            'Torque_ftlb': float(torque_ftlb),
-            'Power_hp': float(power)
-        })
-    
-    return engine_data
\ No newline at end of file
@@ -7,23 +7,36 @@ from datetime import datetime
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse
+from django.urls import reverse as reverse_url
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
 
-from ..models import Vehicle
+from ..models import OCRJob
 from ..decorators import handle_view_exceptions, log_view_access
 
-from services.calculation_service import calculate_tire_diameter
-from services.ocr_service import (
-    process_uploaded_screenshot,
-    extract_power_data_from_screenshot,
-    process_transmission_screenshot,
-    OCRError
+from ..ocr_jobs import (
+    SCREENSHOT_FIELDS,
+    extract_screenshot_data,
+    merge_ocr_data,
+    match_ocr_vehicle,
+    merge_job_results,
+    prune_ocr_jobs,
+    enqueue_screenshot,
+    get_job_status,
+    classify_uploaded_screenshots,
+    get_configured_debug_writer,
+    get_ocr_debug_root
 )
-from services.image_processing import process_screenshot, ImageProcessingError
+
+from cars.catalog import get_vehicle_catalog
+from services.ocr_service import OCRError
+from services.image_processing import ImageProcessingError
 
 logger = logging.getLogger(__name__)
 
+# Multi-file field of the single drop zone (screenshots of any type)
+DROP_ZONE_FIELD = 'screenshots'
+
 @handle_view_exceptions
 @log_view_access
 def home(request):
@@ -38,168 +51,70 @@ def upload_screenshot(request):
     """
     View for uploading and processing screenshots
     """
-    vehicles = Vehicle.objects.all().order_by('name')
+    # Served from the in-process catalog rather than queried per request
+    vehicles = get_vehicle_catalog().vehicles
     
     if request.method == 'POST':
         # Clear previous session data first
         clear_session_calculation_data(request)
         
-        # Track uploaded screenshot types
-        uploaded_screenshots = {
-            'suspension': 'suspension_screenshot' in request.FILES,
-            'power': 'power_screenshot' in request.FILES,
-            'transmission': 'transmission_screenshot' in request.FILES
-        }
-        
-        # Validate vehicle selection
+        # Without a vehicle selection, the suspension screenshot's vehicle name has to identify it
         vehicle_id = request.POST.get('vehicle')
-        if not vehicle_id:
+        
+        # Gather uploads from the per-type fields and the single drop zone
+        uploads, rejected = collect_uploaded_screenshots(request)
+        if not vehicle_id and 'suspension' not in uploads:
             messages.error(request, "Please select a vehicle.")
             return render(request, 'spring_calc/upload_screenshot.html', {'vehicles': vehicles})
+        for file_name in rejected:
+            messages.warning(request, f"Could not tell what kind of screenshot {file_name} is, so it was skipped.")
+        
+        # Track uploaded screenshot types
+        uploaded_screenshots = {screenshot_type: screenshot_type in uploads for screenshot_type in SCREENSHOT_FIELDS}
         
         # Initialize combined data dict with vehicle ID
-        combined_data = {'vehicle': vehicle_id}
+        combined_data = {'vehicle': vehicle_id} if vehicle_id else {}
         
         try:
-            # Process suspension screenshot if uploaded
-            if uploaded_screenshots['suspension']:
+            # Process each uploaded screenshot in turn
+            for screenshot_type, uploaded_file in uploads.items():
                 try:
-                    suspension_screenshot = request.FILES['suspension_screenshot']
-                    
-                    # Create debug directory if in debug mode
-                    debug_dir = None
-                    if hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR:
-                        debug_dir = os.path.join(settings.MEDIA_ROOT, 'debug_ocr', datetime.now().strftime('%Y%m%d_%H%M%S'))
-                        os.makedirs(debug_dir, exist_ok=True)
-                    
-                    # Process the screenshot
-                    processed_image_path = process_screenshot(
-                        suspension_screenshot, 
-                        output_dir=debug_dir,
-                        debug_mode=(hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR)
-                    )
+                    screenshot_data = extract_screenshot_data(screenshot_type, uploaded_file)
+                    merge_ocr_data(combined_data, screenshot_data)
                     
-                    # Extract data using OCR
-                    suspension_data = process_uploaded_screenshot(
-                        processed_image_path,
-                        debug_mode=(hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR)
-                    )
-                    
-                    # Update combined data with suspension details
-                    suspension_keys = [
-                        'vehicle_weight', 'front_weight_distribution', 
-                        'front_ride_height', 'rear_ride_height',
-                        'front_downforce', 'rear_downforce',
-                        'low_speed_stability', 'high_speed_stability',
-                        'rotational_g_40mph', 'rotational_g_75mph', 'rotational_g_150mph',
-                        'performance_points', 'front_tires', 'rear_tires'
-                    ]
-                    for key in suspension_keys:
-                        if key in suspension_data:
-                            combined_data[key] = suspension_data[key]
-                    
-                    messages.success(request, "Suspension screenshot processed successfully!")
+                    messages.success(request, f"{screenshot_type.capitalize()} screenshot processed successfully!")
                 except (OCRError, ImageProcessingError) as e:
-                    messages.warning(request, f"Problem processing suspension screenshot: {str(e)}")
+                    messages.warning(request, f"Problem processing {screenshot_type} screenshot: {str(e)}")
                 except Exception as e:
-                    logger.error(f"Error processing suspension screenshot: {str(e)}", exc_info=True)
-                    messages.error(request, f"Error processing suspension screenshot: {str(e)}")
+                    logger.error(f"Error processing {screenshot_type} screenshot: {str(e)}", exc_info=True)
+                    messages.error(request, f"Error processing {screenshot_type} screenshot: {str(e)}")
             
-            # Process power screenshot if uploaded
-            if uploaded_screenshots['power']:
-                try:
-                    power_screenshot = request.FILES['power_screenshot']
-                    
-                    # Create debug directory if in debug mode
-                    debug_dir = None
-                    if hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR:
-                        debug_dir = os.path.join(settings.MEDIA_ROOT, 'debug_ocr', datetime.now().strftime('%Y%m%d_%H%M%S'))
-                        os.makedirs(debug_dir, exist_ok=True)
-                    
-                    # Process the screenshot
-                    processed_image_path = process_screenshot(
-                        power_screenshot, 
-                        output_dir=debug_dir,
-                        debug_mode=(hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR)
-                    )
-                    
-                    # Extract data using OCR
-                    power_data = extract_power_data_from_screenshot(
-                        processed_image_path,
-                        debug_mode=(hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR)
-                    )
-                    # Force update the combined data with ALL extracted fields
-                    # Don't skip any fields - even if they're None
-                    for key, value in power_data.items():
-                        combined_data[key] = value
-                    
-                    messages.success(request, "Power screenshot processed successfully!")
-                except (OCRError, ImageProcessingError) as e:
-                    messages.warning(request, f"Problem processing power screenshot: {str(e)}")
-                except Exception as e:
-                    logger.error(f"Error processing power screenshot: {str(e)}", exc_info=True)
-                    messages.error(request, f"Error processing power screenshot: {str(e)}")
+            # Rank vehicles against the OCR'd name, selecting the best if none was picked
+            matched_vehicle = match_ocr_vehicle(combined_data)
+            if matched_vehicle:
+                messages.info(request, f"Selected {matched_vehicle['name']} from the screenshot.")
             
-            # Process transmission screenshot if uploaded
-            if uploaded_screenshots['transmission']:
-                try:
-                    transmission_screenshot = request.FILES['transmission_screenshot']
-        
-                    # Create debug directory if in debug mode
-                    debug_dir = None
-                    if hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR:
-                        debug_dir = os.path.join(settings.MEDIA_ROOT, 'debug_ocr', datetime.now().strftime('%Y%m%d_%H%M%S'))
-                        os.makedirs(debug_dir, exist_ok=True)
-        
-                    # Process the screenshot with inverted colors for better OCR
-                    processed_image_path = process_screenshot(
-                        transmission_screenshot, 
-                        output_dir=debug_dir,
-                        debug_mode=(hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR),
-                        invert_colors=True  # Add this parameter
-                    )
-        
-                    # Extract data using OCR
-                    transmission_data = process_transmission_screenshot(
-                        processed_image_path,
-                        debug_mode=(hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR)
-                    )
-        
-                    # Update combined data with transmission details
-                    transmission_keys = [
-                        'gear_ratio', 'rpm', 'speed', 'final_drive', 
-                        'num_gears', 'tire_diameter_inches'
-                    ]
-                    for key in transmission_keys:
-                        if key in transmission_data:
-                            combined_data[key] = transmission_data[key]
-        
-                    # Calculate tire diameter if we have all the required data
-                    gear_ratio = transmission_data.get('gear_ratio')
-                    rpm = transmission_data.get('rpm')
-                    speed = transmission_data.get('speed')
-                    final_drive = transmission_data.get('final_drive')
-        
-                    if gear_ratio and rpm and speed and final_drive:
-                        tire_diameter = calculate_tire_diameter(gear_ratio, rpm, speed, final_drive)
-                        combined_data['tire_diameter_inches'] = tire_diameter
-                        logger.info(f"Calculated tire diameter: {tire_diameter} inches")
-        
-                    messages.success(request, "Transmission screenshot processed successfully!")
-                except (OCRError, ImageProcessingError) as e:
-                    messages.warning(request, f"Problem processing transmission screenshot: {str(e)}")
-                except Exception as e:
-                    logger.error(f"Error processing transmission screenshot: {str(e)}", exc_info=True)
-                    messages.error(request, f"Error processing transmission screenshot: {str(e)}")
+            # Keep the OCR result, so picking the vehicle doesn't mean uploading again
+            request.session['ocr_screenshot_types'] = list(uploads)
+            
+            if not combined_data.get('vehicle'):
+                request.session['ocr_data'] = combined_data
+                messages.error(request, "Please select a vehicle.")
+                candidates = combined_data.get('vehicle_candidates', [])
+                return render(request, 'spring_calc/upload_screenshot.html', {
+                    'vehicles': vehicles,
+                    'vehicle_candidates': candidates,
+                    'selected_vehicle': candidates[0]['id'] if candidates else None,
+                    'select_vehicle_url': reverse_url('select_ocr_vehicle')
+                })
             
             # Add debug info if enabled
             if hasattr(settings, 'DEBUG_OCR') and settings.DEBUG_OCR:
-                # Log the full OCR data in the debug directory
-                debug_dir = os.path.join(settings.MEDIA_ROOT, 'debug_ocr')
-                os.makedirs(debug_dir, exist_ok=True)
-                
-                with open(os.path.join(debug_dir, 'ocr_data_session.json'), 'w') as f:
-                    json.dump(combined_data, f, indent=2)
+                # Log the full OCR data in the debug directory (written by the background writer)
+                get_configured_debug_writer().write_json(
+                    os.path.join(get_ocr_debug_root(), 'ocr_data_session.json'),
+                    dict(combined_data)
+                )
                 
                 # Add debug info to session for display
                 request.session['debug_info'] = {
@@ -212,22 +127,10 @@ def upload_screenshot(request):
 
             logger.debug(f"Storing in session: {combined_data}")
             
-            # Prepare URL parameters for redirecting
-            url_params = urllib.parse.urlencode({
-                k: v for k, v in combined_data.items() 
-                if isinstance(v, (int, float, str))
-            })
-            
             # Routing logic based on uploaded screenshots
-            if uploaded_screenshots['suspension'] and (uploaded_screenshots['power'] or uploaded_screenshots['transmission']):
-                # Both suspension and power/transmission - go to suspension calculator first
-                return redirect(f"{reverse('calculate_springs')}?{url_params}")
-            elif uploaded_screenshots['suspension']:
-                # Only suspension - go to suspension calculator
-                return redirect(f"{reverse('calculate_springs')}?{url_params}")
-            elif uploaded_screenshots['power'] or uploaded_screenshots['transmission']:
-                # Only power or transmission - go to gear calculator
-                return redirect(f"{reverse('calculate_gears')}?{url_params}")
+            redirect_url = get_calculator_redirect_url(uploaded_screenshots, combined_data)
+            if redirect_url:
+                return redirect(redirect_url)
             
             # No valid screenshots uploaded
             messages.warning(request, "No valid calculations could be performed from the uploaded screenshots.")
@@ -241,7 +144,246 @@ def upload_screenshot(request):
     
     return render(request, 'spring_calc/upload_screenshot.html', {'vehicles': vehicles})
 
-# Helper function
+@handle_view_exceptions
+@require_http_methods(["POST"])
+def upload_screenshot_async(request):
+    """
+    Queue uploaded screenshots for background OCR and return job ids immediately
+    """
+    vehicle_id = request.POST.get('vehicle')
+    
+    uploads, rejected = collect_uploaded_screenshots(request)
+    if not uploads:
+        return JsonResponse({
+            'success': False,
+            'message': "Please upload at least one screenshot.",
+            'rejected': rejected
+        }, status=400)
+    
+    # Without a vehicle selection, the suspension screenshot's vehicle name has to identify it
+    if not vehicle_id and 'suspension' not in uploads:
+        return JsonResponse({
+            'success': False,
+            'message': "Please select a vehicle."
+        }, status=400)
+    
+    # Clear previous session data first
+    clear_session_calculation_data(request)
+    request.session['ocr_jobs_base'] = {'vehicle': vehicle_id} if vehicle_id else {}
+    request.session['ocr_data'] = dict(request.session['ocr_jobs_base'])
+    
+    # Queue a job per screenshot and remember them in the session for polling
+    prune_ocr_jobs()
+    jobs = {}
+    for screenshot_type, uploaded_file in uploads.items():
+        job = enqueue_screenshot(screenshot_type, uploaded_file)
+        jobs[str(job.job_id)] = screenshot_type
+    
+    request.session['ocr_jobs'] = jobs
+    request.session['ocr_screenshot_types'] = list(uploads)
+    request.session.modified = True
+    
+    return JsonResponse({
+        'success': True,
+        'jobs': jobs,
+        'rejected': rejected,
+        'status_url': reverse_url('ocr_upload_status'),
+        'status_urls': {job_id: reverse_url('ocr_job_status', args=[job_id]) for job_id in jobs}
+    }, status=202)
+
+@handle_view_exceptions
+@require_http_methods(["GET"])
+def ocr_upload_status(request):
+    """
+    Report the status of every background OCR job of the session's upload
+    
+    This is the endpoint the upload page polls: one request merges all
+    finished jobs into ocr_data, and the redirect URL is only returned once
+    every job is finished.
+    """
+    session_jobs = request.session.get('ocr_jobs', {})
+    if not session_jobs:
+        return JsonResponse({'success': False, 'message': "No screenshots are being processed"}, status=404)
+    
+    jobs, ocr_data, redirect_url = refresh_ocr_upload(request, session_jobs)
+    
+    response = {
+        'success': True,
+        'jobs': {
+            str(job.job_id): {
+                'screenshot_type': job.screenshot_type,
+                'status': status,
+                'error': (job.error or "OCR job did not finish") if status == 'failed' else None
+            }
+            for job, status in jobs
+        }
+    }
+    
+    add_vehicle_choice(response, jobs, ocr_data, redirect_url)
+    return JsonResponse(response)
+
+@handle_view_exceptions
+@require_http_methods(["GET"])
+def ocr_job_status(request, job_id):
+    """
+    Report the status of a single background OCR job
+    
+    Finished results are merged the same way as ocr_upload_status, from
+    every job of the upload, so polling jobs in parallel is safe.
+    """
+    session_jobs = request.session.get('ocr_jobs', {})
+    job_key = str(job_id)
+    
+    # Only report on jobs queued by this session
+    if job_key not in session_jobs:
+        return JsonResponse({'success': False, 'message': "Job not found"}, status=404)
+    
+    jobs, ocr_data, redirect_url = refresh_ocr_upload(request, session_jobs)
+    job, status = next(((job, status) for job, status in jobs if str(job.job_id) == job_key), (None, None))
+    if job is None:
+        return JsonResponse({'success': False, 'message': "Job not found"}, status=404)
+    
+    response = {
+        'success': status != 'failed',
+        'job_id': job_key,
+        'screenshot_type': job.screenshot_type,
+        'status': status,
+    }
+    if status == 'failed':
+        response['error'] = job.error or "OCR job did not finish"
+    
+    add_vehicle_choice(response, jobs, ocr_data, redirect_url)
+    return JsonResponse(response)
+
+@handle_view_exceptions
+@require_http_methods(["POST"])
+def select_ocr_vehicle(request):
+    """
+    Set the vehicle of an upload whose screenshot name matched no vehicle confidently
+    
+    The OCR result stays in the session, so the chosen vehicle (usually one
+    of the candidates matched from the screenshot) is filled in and the user
+    continues to the calculator without uploading again.
+    """
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    ocr_data = request.session.get('ocr_data')
+    screenshot_types = request.session.get('ocr_screenshot_types')
+    vehicle = get_vehicle_catalog().get(request.POST.get('vehicle'))
+    
+    if not ocr_data or not screenshot_types:
+        message = "No screenshot results to continue with, please upload again."
+    elif vehicle is None:
+        message = "Please select a vehicle."
+    else:
+        message = None
+    
+    if message:
+        if is_ajax:
+            return JsonResponse({'success': False, 'message': message}, status=400)
+        messages.error(request, message)
+        return redirect('upload_screenshot')
+    
+    ocr_data['vehicle'] = vehicle['id']
+    request.session['ocr_data'] = ocr_data
+    
+    # Background uploads rebuild ocr_data from this base on every status poll
+    if 'ocr_jobs_base' in request.session:
+        request.session['ocr_jobs_base'] = dict(request.session['ocr_jobs_base'], vehicle=vehicle['id'])
+    
+    uploaded_screenshots = {screenshot_type: screenshot_type in screenshot_types for screenshot_type in SCREENSHOT_FIELDS}
+    redirect_url = get_calculator_redirect_url(uploaded_screenshots, ocr_data)
+    
+    if is_ajax:
+        return JsonResponse({'success': True, 'redirect_url': redirect_url})
+    return redirect(redirect_url)
+
+# Helper functions
+def add_vehicle_choice(response, jobs, ocr_data, redirect_url):
+    """
+    Helper function to add the next step to an OCR status response
+    
+    Once every job is finished the client is sent on to the calculator, or,
+    if no vehicle was selected or matched confidently, asked to pick one
+    from the candidates matched from the screenshot.
+    """
+    if 'vehicle_candidates' in ocr_data:
+        response['vehicle'] = ocr_data.get('vehicle')
+        response['vehicle_candidates'] = ocr_data['vehicle_candidates']
+    
+    if redirect_url is not None:
+        response['redirect_url'] = redirect_url
+    elif all(status in ('done', 'failed') for _, status in jobs):
+        response['vehicle_candidates'] = ocr_data.get('vehicle_candidates', [])
+        response['select_vehicle_url'] = reverse_url('select_ocr_vehicle')
+
+def refresh_ocr_upload(request, session_jobs):
+    """
+    Helper function to rebuild the session's ocr_data from its upload's OCR jobs
+    
+    All of the upload's jobs are read in one query and ocr_data is rebuilt
+    from the vehicle selected at upload time plus every finished job, so the
+    session ends up with the same data whichever request writes it last.
+    
+    Returns:
+        Tuple of ((job, status) pairs, ocr_data, redirect URL or None while jobs are running
+        or no vehicle is selected)
+    """
+    upload_jobs = list(OCRJob.objects.filter(job_id__in=list(session_jobs.keys())))
+    jobs = [(job, get_job_status(job)) for job in upload_jobs]
+    
+    ocr_data = merge_job_results(request.session.get('ocr_jobs_base', {}), upload_jobs)
+    if ocr_data != request.session.get('ocr_data'):
+        request.session['ocr_data'] = ocr_data
+    
+    # Without a vehicle there's nowhere to go yet; the client asks for one
+    redirect_url = None
+    if all(status in ('done', 'failed') for _, status in jobs) and ocr_data.get('vehicle'):
+        uploaded_screenshots = {screenshot_type: screenshot_type in session_jobs.values() for screenshot_type in SCREENSHOT_FIELDS}
+        redirect_url = get_calculator_redirect_url(uploaded_screenshots, ocr_data)
+    
+    return jobs, ocr_data, redirect_url
+
+def collect_uploaded_screenshots(request):
+    """
+    Helper function to gather uploaded screenshots by type
+    
+    Files in the per-type fields are used as-is. Files dropped into the single
+    'screenshots' field are classified; a per-type field wins over a dropped
+    file of the same type.
+    
+    Returns:
+        Tuple of (dict of screenshot type to upload or ScreenshotContext, names of skipped files)
+    """
+    uploads, rejected = classify_uploaded_screenshots(request.FILES.getlist(DROP_ZONE_FIELD))
+    
+    for screenshot_type, field_name in SCREENSHOT_FIELDS.items():
+        if field_name in request.FILES:
+            uploads[screenshot_type] = request.FILES[field_name]
+    
+    return uploads, rejected
+
+def get_calculator_redirect_url(uploaded_screenshots, combined_data):
+    """
+    Helper function to pick the calculator to continue with after OCR
+    
+    Returns:
+        URL with the OCR data as query parameters, or None if nothing was uploaded
+    """
+    # Prepare URL parameters for redirecting
+    url_params = urllib.parse.urlencode({
+        k: v for k, v in combined_data.items() 
+        if isinstance(v, (int, float, str))
+    })
+    
+    if uploaded_screenshots['suspension']:
+        # Suspension (with or without power/transmission) - go to suspension calculator first
+        return f"{reverse('calculate_springs')}?{url_params}"
+    elif uploaded_screenshots['power'] or uploaded_screenshots['transmission']:
+        # Only power or transmission - go to gear calculator
+        return f"{reverse('calculate_gears')}?{url_params}"
+    
+    return None
+
 def clear_session_calculation_data(request):
     """
     Helper function to clear all calculation-related session data
@@ -251,6 +393,9 @@ def clear_session_calculation_data(request):
         'gear_calculation_id',
         'suspension_form_data',
         'ocr_data',
+        'ocr_jobs',
+        'ocr_jobs_base',
+        'ocr_screenshot_types',
         'complete_setup'
     ]
     
@@ -0,0 +1,117 @@
+# spring_calc/workspace.py
+import logging
+from typing import Optional
+
+from cars.models import Vehicle
+from .models import SpringCalculation, GearCalculation
+
+logger = logging.getLogger(__name__)
+
+# Attribute the workspace is memoized under on the request
+REQUEST_ATTRIBUTE = '_spring_calc_workspace'
+
+_UNSET = object()
+
+
+class Workspace:
+    """The vehicle and calculations a session is working on
+
+    Decorators and views all ask the same questions of the session (which
+    vehicle, which spring and gear calculation). The workspace answers
+    each one with at most one query - calculations are loaded with their
+    vehicle via select_related - and is shared for the whole request
+    through get_workspace().
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._vehicle = _UNSET
+        self._spring_calculation = _UNSET
+        self._gear_calculation = _UNSET
+
+    @property
+    def ocr_vehicle_id(self) -> Optional[int]:
+        """Vehicle id selected on the upload page, if any"""
+        return self.session.get('ocr_data', {}).get('vehicle')
+
+    @property
+    def spring_calculation(self) -> Optional[SpringCalculation]:
+        """The session's current spring calculation, with its vehicle"""
+        if self._spring_calculation is _UNSET:
+            self._spring_calculation = self._load(SpringCalculation, 'spring_calculation_id')
+        return self._spring_calculation
+
+    @property
+    def gear_calculation(self) -> Optional[GearCalculation]:
+        """The session's current gear calculation, with its vehicle"""
+        if self._gear_calculation is _UNSET:
+            self._gear_calculation = self._load(GearCalculation, 'gear_calculation_id')
+        return self._gear_calculation
+
+    @property
+    def vehicle(self) -> Optional[Vehicle]:
+        """The selected vehicle, falling back to the spring then gear calculation's vehicle"""
+        if self._vehicle is _UNSET:
+            self._vehicle = self._resolve_vehicle()
+        return self._vehicle
+
+    @property
+    def vehicle_id(self) -> Optional[int]:
+        """Id of the selected vehicle (the OCR selection even if the vehicle no longer exists)"""
+        if self.ocr_vehicle_id:
+            return self.ocr_vehicle_id
+        return self.vehicle.id if self.vehicle else None
+
+    @property
+    def vehicle_name(self) -> str:
+        """Display name of the selected vehicle"""
+        return self.vehicle.name if self.vehicle else "Unknown Vehicle"
+
+    def set_spring_calculation(self, calculation: SpringCalculation) -> None:
+        """Make a newly saved spring calculation the session's current one"""
+        self.session['spring_calculation_id'] = calculation.id
+        self._spring_calculation = calculation
+        self._vehicle = _UNSET
+
+    def set_gear_calculation(self, calculation: GearCalculation) -> None:
+        """Make a newly saved gear calculation the session's current one"""
+        self.session['gear_calculation_id'] = calculation.id
+        self._gear_calculation = calculation
+        self._vehicle = _UNSET
+
+    def _load(self, model, session_key: str):
+        """Load the calculation whose id is stored under session_key, or None"""
+        calculation_id = self.session.get(session_key)
+        if not calculation_id:
+            return None
+        calculation = model.objects.select_related('vehicle').filter(id=calculation_id).first()
+        if calculation is None:
+            logger.debug(f"{model.__name__} {calculation_id} from the session no longer exists")
+        return calculation
+
+    def _resolve_vehicle(self) -> Optional[Vehicle]:
+        """Find the vehicle without querying for one a loaded calculation already carries"""
+        vehicle_id = self.ocr_vehicle_id
+        if vehicle_id:
+            for calculation in (self._spring_calculation, self._gear_calculation):
+                if calculation not in (_UNSET, None) and calculation.vehicle_id == vehicle_id:
+                    return calculation.vehicle
+            vehicle = Vehicle.objects.filter(id=vehicle_id).first()
+            if vehicle:
+                return vehicle
+
+        # Only load the gear calculation if there's no spring calculation to take the vehicle from
+        if self.spring_calculation is not None:
+            return self.spring_calculation.vehicle
+        if self.gear_calculation is not None:
+            return self.gear_calculation.vehicle
+        return None
+
+
+def get_workspace(request) -> Workspace:
+    """Get the request's workspace, creating it on first use"""
+    workspace = getattr(request, REQUEST_ATTRIBUTE, None)
+    if workspace is None:
+        workspace = Workspace(request.session)
+        setattr(request, REQUEST_ATTRIBUTE, workspace)
+    return workspace
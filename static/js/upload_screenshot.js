@@ -14,22 +14,20 @@ document.addEventListener('DOMContentLoaded', function() {
     setupFileUpload('powerScreenshot', 'powerDropArea', 'powerPreview');
     setupFileUpload('transmissionScreenshot', 'transmissionDropArea', 'transmissionPreview');
     
+    // Single drop zone for any number of screenshots of any type
+    setupMultiFileUpload('screenshotsInput', 'screenshotsDropArea', 'screenshotsList');
+    
     // Handle form submission
     if (form) {
         form.addEventListener('submit', function(e) {
-            // Check if at least one file and vehicle is selected
-            const vehicle = document.getElementById('vehicle').value;
+            // Check if at least one file is selected; the vehicle can be read from the suspension screenshot
             const suspensionFile = document.getElementById('suspensionScreenshot').files[0];
             const powerFile = document.getElementById('powerScreenshot').files[0];
             const transmissionFile = document.getElementById('transmissionScreenshot').files[0];
+            const dropZoneInput = document.getElementById('screenshotsInput');
+            const droppedFiles = dropZoneInput ? dropZoneInput.files.length : 0;
             
-            if (!vehicle) {
-                e.preventDefault();
-                alert('Please select a vehicle before proceeding.');
-                return;
-            }
-            
-            if (!suspensionFile && !powerFile && !transmissionFile) {
+            if (!suspensionFile && !powerFile && !transmissionFile && !droppedFiles) {
                 e.preventDefault();
                 alert('Please upload at least one screenshot.');
                 return;
@@ -42,6 +40,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 processBtn.textContent = ' Processing...';
                 processBtn.prepend(processSpinner);
             }
+            
+            // Queue the screenshots for background OCR and poll for the results
+            if (window.fetch) {
+                e.preventDefault();
+                submitForBackgroundProcessing(form);
+            }
         });
     }
     
@@ -140,4 +144,204 @@ function setupFileUpload(inputId, dropAreaId, previewId) {
         };
         reader.readAsDataURL(file);
     }
-}
\ No newline at end of file
+}
+
+/**
+ * Set up a drop zone that accepts several screenshots at once
+ * The server works out which kind of screenshot each file is
+ * @param {string} inputId - ID of the multiple file input
+ * @param {string} dropAreaId - ID of the drop area
+ * @param {string} listId - ID of the element listing the selected files
+ */
+function setupMultiFileUpload(inputId, dropAreaId, listId) {
+    const fileInput = document.getElementById(inputId);
+    const dropArea = document.getElementById(dropAreaId);
+    const fileList = document.getElementById(listId);
+    
+    if (!fileInput || !dropArea) {
+        return;
+    }
+    
+    dropArea.addEventListener('click', function() {
+        fileInput.click();
+    });
+    
+    ['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
+        dropArea.addEventListener(eventName, function(e) {
+            e.preventDefault();
+            e.stopPropagation();
+        }, false);
+    });
+    
+    ['dragenter', 'dragover'].forEach(eventName => {
+        dropArea.addEventListener(eventName, () => dropArea.classList.add('highlight'), false);
+    });
+    
+    ['dragleave', 'drop'].forEach(eventName => {
+        dropArea.addEventListener(eventName, () => dropArea.classList.remove('highlight'), false);
+    });
+    
+    dropArea.addEventListener('drop', function(e) {
+        const images = Array.from(e.dataTransfer.files).filter(file => file.type.match('image.*'));
+        const transfer = new DataTransfer();
+        images.forEach(file => transfer.items.add(file));
+        fileInput.files = transfer.files;
+        listFiles(fileInput.files);
+    }, false);
+    
+    fileInput.addEventListener('change', function() {
+        listFiles(this.files);
+    });
+    
+    // Show the names of the selected files
+    function listFiles(files) {
+        if (!fileList) {
+            return;
+        }
+        fileList.innerHTML = '';
+        Array.from(files).forEach(file => {
+            const item = document.createElement('li');
+            item.textContent = file.name;
+            fileList.appendChild(item);
+        });
+        fileList.classList.toggle('d-none', files.length === 0);
+    }
+}
+
+/**
+ * Upload screenshots to the background OCR queue and poll until every job finishes
+ * Falls back to a regular form submission if the queue can't be reached
+ * @param {HTMLFormElement} form - The screenshot upload form
+ */
+function submitForBackgroundProcessing(form) {
+    const asyncUrl = form.action.replace(/\/?$/, '/') + 'async/';
+    
+    fetch(asyncUrl, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error('Upload failed with status ' + response.status);
+        }
+        return response.json();
+    })
+    .then(data => {
+        (data.rejected || []).forEach(name => console.warn(`Could not tell what kind of screenshot ${name} is, skipped`));
+        pollOcrJobs(data.status_url, form);
+    })
+    .catch(error => {
+        console.error('Background OCR unavailable, submitting normally:', error);
+        form.submit();
+    });
+}
+
+/**
+ * Poll the upload's OCR status until a redirect URL is returned
+ * One request reports (and merges) every job, so results from different screenshots can't overwrite each other
+ * @param {string} statusUrl - Status endpoint for the session's upload
+ * @param {HTMLFormElement} form - The screenshot upload form
+ */
+function pollOcrJobs(statusUrl, form) {
+    const pollInterval = 1000;
+    
+    fetch(statusUrl)
+        .then(response => response.json())
+        .then(result => {
+            Object.values(result.jobs || {})
+                .filter(job => job.status === 'failed')
+                .forEach(job => console.warn(`Problem processing ${job.screenshot_type} screenshot: ${job.error}`));
+            
+            if (result.redirect_url) {
+                window.location.href = result.redirect_url;
+            } else if (result.select_vehicle_url) {
+                showVehiclePicker(result.vehicle_candidates || [], result.select_vehicle_url, form);
+            } else if (result.success === false) {
+                console.error('Error polling OCR jobs:', result.message);
+            } else {
+                setTimeout(() => pollOcrJobs(statusUrl, form), pollInterval);
+            }
+        })
+        .catch(error => {
+            console.error('Error polling OCR jobs:', error);
+            setTimeout(() => pollOcrJobs(statusUrl, form), pollInterval);
+        });
+}
+
+/**
+ * Ask for the vehicle when the screenshot's car name didn't match one confidently
+ * Lists the candidates matched from the screenshot, or every vehicle if there are none
+ * @param {Array} candidates - Matched vehicles as {id, name, score}, best first
+ * @param {string} selectUrl - Endpoint that sets the vehicle of the processed upload
+ * @param {HTMLFormElement} form - The screenshot upload form
+ */
+function showVehiclePicker(candidates, selectUrl, form) {
+    const vehicleSelect = document.getElementById('vehicle');
+    const processBtn = document.getElementById('processBtn');
+    const processSpinner = document.getElementById('processSpinner');
+    
+    // Stop the spinner, the upload is processed
+    if (processBtn) {
+        processBtn.disabled = false;
+        processBtn.textContent = 'Process Screenshots';
+    }
+    if (processSpinner) {
+        processSpinner.classList.add('d-none');
+    }
+    
+    const picker = document.createElement('div');
+    picker.className = 'alert alert-warning mt-3';
+    
+    const label = document.createElement('label');
+    label.className = 'form-label';
+    label.htmlFor = 'ocrVehicleChoice';
+    label.textContent = candidates.length
+        ? 'The car in the screenshot could not be matched exactly. Which one is it?'
+        : 'The car in the screenshot could not be read. Please select it.';
+    picker.appendChild(label);
+    
+    const select = document.createElement('select');
+    select.id = 'ocrVehicleChoice';
+    select.className = 'form-select mb-2';
+    const options = candidates.length
+        ? candidates.map(candidate => [candidate.id, candidate.name])
+        : Array.from(vehicleSelect ? vehicleSelect.options : []).filter(option => option.value).map(option => [option.value, option.textContent]);
+    options.forEach(([id, name]) => select.add(new Option(name, id)));
+    picker.appendChild(select);
+    
+    const confirmBtn = document.createElement('button');
+    confirmBtn.type = 'button';
+    confirmBtn.className = 'btn btn-primary';
+    confirmBtn.textContent = 'Continue';
+    picker.appendChild(confirmBtn);
+    
+    confirmBtn.addEventListener('click', function() {
+        // Reuse the form's CSRF token
+        const body = new FormData();
+        body.append('csrfmiddlewaretoken', new FormData(form).get('csrfmiddlewaretoken'));
+        body.append('vehicle', select.value);
+        confirmBtn.disabled = true;
+        
+        fetch(selectUrl, {
+            method: 'POST',
+            body: body,
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+        .then(response => response.json())
+        .then(result => {
+            if (result.redirect_url) {
+                window.location.href = result.redirect_url;
+            } else {
+                confirmBtn.disabled = false;
+                alert(result.message || 'Please select a vehicle.');
+            }
+        })
+        .catch(error => {
+            console.error('Error selecting vehicle:', error);
+            confirmBtn.disabled = false;
+        });
+    });
+    
+    form.appendChild(picker);
+}